@@ -0,0 +1,175 @@
+# Planificador central de detección YOLO-Pose
+# Reúne el último frame de cada sesión activa y los procesa en un solo lote
+
+import asyncio
+import collections
+import threading
+import time
+
+import cv2
+
+from app.metrics import STAGE_SECONDS, BATCH_SIZE
+from app.utils.processing import WINDOW_SIZE, extract_pose
+
+RESIZE_SECONDS = STAGE_SECONDS.labels("resize")
+YOLO_SECONDS = STAGE_SECONDS.labels("yolo")
+SELECT_SECONDS = STAGE_SECONDS.labels("keypoint_select")
+YOLO_BATCH = BATCH_SIZE.labels("yolo")
+
+# Resultado para un frame reemplazado por otro más reciente de la misma sesión
+STALE = object()
+
+
+def _fit(frame):
+    """Frame al tamaño de entrada de YOLO; si ya lo tiene se usa sin copiar"""
+    if frame.shape[1] == WINDOW_SIZE[0] and frame.shape[0] == WINDOW_SIZE[1]:
+        return frame
+    return cv2.resize(frame, WINDOW_SIZE)
+
+
+def _resolve(future, value=None, error=None):
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(value)
+
+
+class DetectionScheduler:
+    """
+    Planificador de detección multi-sesión.
+
+    Cada sesión deja su frame más reciente con `detect()`; si aún había uno
+    pendiente, el anterior se descarta y su llamada recibe `STALE`. Un número
+    fijo de hilos toma hasta `max_batch` frames (esperando como mucho
+    `max_wait` segundos a que lleguen más) y los pasa juntos a YOLO-Pose.
+    """
+
+    def __init__(self, engine, max_batch=8, max_wait=0.01, workers=1, render=True):
+        self.engine = engine
+        self.render = render
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait = max(0.0, float(max_wait))
+        self.workers = max(1, int(workers))
+        self._slots = collections.OrderedDict()
+        self._cond = threading.Condition()
+        self._threads = []
+        self._stats = {
+            "batches": 0,
+            "frames": 0,
+            "stale": 0,
+            "errors": 0,
+            "inference_seconds_total": 0.0,
+            "batch_size_histogram": collections.Counter(),
+        }
+
+    async def detect(self, session_id, frame, tracker=None):
+        """
+        Detecta la pose en `frame` para la sesión indicada.
+        Devuelve (kps_flat, kps_orig, vis), None si no hay persona, o STALE.
+        Con render=False `vis` es None.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._ensure_started()
+        with self._cond:
+            previous = self._slots.pop(session_id, None)
+            self._slots[session_id] = (frame, tracker, future, loop)
+            if previous is not None:
+                self._stats["stale"] += 1
+            self._cond.notify()
+        if previous is not None:
+            _, _, old_future, old_loop = previous
+            old_loop.call_soon_threadsafe(_resolve, old_future, STALE)
+        return await future
+
+    def discard(self, session_id):
+        """Elimina el frame pendiente de una sesión que terminó"""
+        with self._cond:
+            previous = self._slots.pop(session_id, None)
+        if previous is not None:
+            _, _, future, loop = previous
+            loop.call_soon_threadsafe(_resolve, future, STALE)
+
+    def pending(self):
+        with self._cond:
+            return len(self._slots)
+
+    def _ensure_started(self):
+        if self._threads:
+            return
+        with self._cond:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._worker, name=f"pose-detect-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _next_batch(self):
+        with self._cond:
+            while not self._slots:
+                self._cond.wait()
+            # Esperar a que más sesiones aporten su frame, sin superar max_wait
+            deadline = time.monotonic() + self.max_wait
+            while len(self._slots) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            size = min(len(self._slots), self.max_batch)
+            return [self._slots.popitem(last=False)[1] for _ in range(size)]
+
+    def _worker(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                start = time.perf_counter()
+                images = [_fit(frame) for frame, _, _, _ in batch]
+                resized = time.perf_counter()
+                results = self.engine.predict(images)
+                elapsed = time.perf_counter() - resized
+                RESIZE_SECONDS.observe((resized - start) / len(batch))
+                YOLO_SECONDS.observe(elapsed)
+                YOLO_BATCH.observe(len(batch))
+            except Exception as e:
+                with self._cond:
+                    self._stats["errors"] += 1
+                for _, _, future, loop in batch:
+                    loop.call_soon_threadsafe(_resolve, future, None, e)
+                continue
+
+            with self._cond:
+                self._stats["batches"] += 1
+                self._stats["frames"] += len(batch)
+                self._stats["inference_seconds_total"] += elapsed
+                self._stats["batch_size_histogram"][len(batch)] += 1
+
+            for (_, tracker, future, loop), result in zip(batch, results):
+                try:
+                    start = time.perf_counter()
+                    proc = extract_pose(result, tracker, render=self.render)
+                    SELECT_SECONDS.observe(time.perf_counter() - start)
+                except Exception as e:
+                    loop.call_soon_threadsafe(_resolve, future, None, e)
+                else:
+                    loop.call_soon_threadsafe(_resolve, future, proc)
+
+    def snapshot(self):
+        """Estadísticas del planificador para ajustar max_batch / max_wait"""
+        with self._cond:
+            batches = self._stats["batches"]
+            return {
+                "max_batch": self.max_batch,
+                "max_wait_ms": self.max_wait * 1000,
+                "workers": self.workers,
+                "pending": len(self._slots),
+                "batches": batches,
+                "frames": self._stats["frames"],
+                "stale": self._stats["stale"],
+                "errors": self._stats["errors"],
+                "avg_batch_size": self._stats["frames"] / batches if batches else 0.0,
+                "avg_inference_ms": self._stats["inference_seconds_total"] * 1000 / batches if batches else 0.0,
+                "batch_size_histogram": {str(k): v for k, v in sorted(self._stats["batch_size_histogram"].items())},
+            }
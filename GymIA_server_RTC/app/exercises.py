@@ -0,0 +1,99 @@
+# Configuración de ejercicios y lógica de estados compartida
+# La usan el servidor en tiempo real y el análisis offline de videos
+
+from app.utils.processing import calculate_angle
+
+
+def load_exercise_config():
+    return {
+        "peso_muerto": {
+            "model_path": "models/lstm4-model4pm.h5",
+            "timesteps": 30,
+            "angle_joints": [5, 11, 13],
+            "angle_thresholds": {"abajo": 140, "arriba": 175},
+            "class_labels": [
+                "columna_incorrectos",
+                "columna_correctos",
+                "extension_incorrectas",
+                "extension_correctas"
+            ],
+            "error_msgs": {
+                "columna_incorrectos": (
+                    "error: columna incorrecta",
+                    "correccion: espalda neutra durante el descenso y el levantamiento"
+                ),
+                "columna_correctos": (
+                    "correcto: columna correcta",
+                    "buena postura de la espalda"
+                ),
+                "extension_incorrectas": (
+                    "error: super extension o extension incompleta",
+                    "correccion: hombros alineados al nivel de la cadera"
+                ),
+                "extension_correctas": (
+                    "correcto: extension correcta",
+                    "buena postura en la extension"
+                )
+            }
+        },
+        "sentadilla": {
+            "model_path": "models/lstm5-model5sen.h5",
+            "timesteps": 60,
+            "angle_joints": [5, 11, 13, 6, 12, 14],
+            "angle_thresholds": {"abajo": 90, "arriba": 160},
+            "class_labels": [
+                "caderas_incorrectos",
+                "caderas_correctos",
+                "rodillas_incorrectos",
+                "rodillas_correctos"
+            ],
+            "error_msgs": {
+                "caderas_incorrectos": (
+                    "error: posicion incorrecta de las caderas",
+                    "correccion: baja y sube las caderas en forma recta"
+                ),
+                "caderas_correctos": (
+                    "correcto: posicion correcta de las caderas",
+                    "Buena tecnica"
+                ),
+                "rodillas_incorrectos": (
+                    "error: rodillas hacia adentro",
+                    "correccion: manten las rodillas ligeramente hacia afuera"
+                ),
+                "rodillas_correctos": (
+                    "correcto: rodillas correctas",
+                    "Buena posicion de las rodillas"
+                )
+            }
+        }
+    }
+
+
+def interest_points(exercise, cfg):
+    """Puntos del esqueleto que se resaltan en verde/rojo"""
+    return cfg["angle_joints"] if exercise == "sentadilla" else [5, 11, 13]
+
+
+def calculate_exercise_state(exercise, cfg, kps_orig):
+    """Devuelve "abajo", "arriba" o None según el ángulo hombro-cadera-rodilla"""
+    thr = cfg["angle_thresholds"]
+    try:
+        if exercise == "sentadilla":
+            a, b, c = [kps_orig[i] for i in [5, 11, 13]]  # Hombro izq, cadera izq, rodilla izq
+        else:
+            a, b, c = [kps_orig[i] for i in cfg["angle_joints"]]
+
+        angle = calculate_angle(a, b, c)
+
+        if angle < thr["abajo"]:
+            return "abajo"
+        elif angle > thr["arriba"]:
+            return "arriba"
+        return None
+    except (IndexError, ValueError):
+        return None
+
+
+def is_correct_label(label):
+    """True para las clases correctas (p. ej. "columna_correctos", no "columna_incorrectos")"""
+    return label.endswith(("_correctos", "_correctas"))
@@ -0,0 +1,126 @@
+# Control adaptativo del salto de frames
+# Ajusta el intervalo de detección de cada sesión para sostener TARGET_FPS
+
+import math
+import os
+import threading
+import time
+import weakref
+
+
+class CpuLoadMonitor:
+    """
+    Carga de CPU del proceso como fracción de los núcleos disponibles.
+    Usa tiempo de CPU del proceso (multiplataforma, sin dependencias) y se
+    recalcula como mucho una vez por `period` segundos.
+    """
+
+    def __init__(self, period=1.0):
+        self.period = period
+        self.cpus = os.cpu_count() or 1
+        self._lock = threading.Lock()
+        self._last_wall = time.monotonic()
+        self._last_cpu = time.process_time()
+        self._load = 0.0
+
+    def load(self):
+        with self._lock:
+            now = time.monotonic()
+            elapsed = now - self._last_wall
+            if elapsed >= self.period:
+                cpu = time.process_time()
+                self._load = (cpu - self._last_cpu) / (elapsed * self.cpus)
+                self._last_wall, self._last_cpu = now, cpu
+            return self._load
+
+
+class AdaptiveFrameController:
+    """
+    Decide cada cuántos frames detecta pose una sesión.
+
+    La base es la latencia de detección medida frente al presupuesto por frame
+    (1 / target_fps). Con la CPU saturada se detecta menos; durante una
+    repetición (cambio reciente abajo/arriba) se detecta más seguido y en
+    descanso (sin cambios durante `rest_after` segundos) se saltan más frames.
+    """
+
+    def __init__(self, target_fps=20, initial_interval=3, min_interval=1, max_interval=8,
+                 motion_window=1.0, rest_after=3.0, rest_extra=2, cpu_high=0.85, alpha=0.2):
+        self.target_fps = max(1.0, float(target_fps))
+        self.min_interval = max(1, int(min_interval))
+        self.max_interval = max(self.min_interval, int(max_interval))
+        self.motion_window = motion_window
+        self.rest_after = rest_after
+        self.rest_extra = rest_extra
+        self.cpu_high = cpu_high
+        self.alpha = alpha
+
+        self.interval = min(max(int(initial_interval), self.min_interval), self.max_interval)
+        self.latency_ema = None
+        self.output_fps = 0.0
+        self.mode = "normal"
+        self.cpu_load = 0.0
+        self.last_state = None
+        self.last_state_change = time.monotonic()
+        self._last_frame_time = None
+
+    def record_frame(self):
+        """Registra un frame entregado para estimar los FPS de salida"""
+        now = time.monotonic()
+        if self._last_frame_time is not None:
+            elapsed = now - self._last_frame_time
+            if elapsed > 0:
+                fps = 1.0 / elapsed
+                self.output_fps += self.alpha * (fps - self.output_fps)
+        self._last_frame_time = now
+
+    def record_detection(self, seconds):
+        """Registra la latencia de una detección real (no servida desde cache)"""
+        if self.latency_ema is None:
+            self.latency_ema = seconds
+        else:
+            self.latency_ema += self.alpha * (seconds - self.latency_ema)
+
+    def record_state(self, state):
+        """Registra el estado abajo/arriba; un cambio indica repetición en curso"""
+        if state is not None and state != self.last_state:
+            self.last_state = state
+            self.last_state_change = time.monotonic()
+
+    def update(self, cpu_load=0.0):
+        """Recalcula y devuelve el intervalo de detección"""
+        self.cpu_load = cpu_load
+        if self.latency_ema is None:
+            return self.interval
+
+        budget = 1.0 / self.target_fps
+        interval = math.ceil(self.latency_ema / budget)
+        if cpu_load > self.cpu_high:
+            interval = math.ceil(interval * cpu_load / self.cpu_high)
+
+        since_change = time.monotonic() - self.last_state_change
+        if since_change <= self.motion_window:
+            self.mode = "movimiento"
+            interval -= 1
+        elif since_change >= self.rest_after:
+            self.mode = "descanso"
+            interval += self.rest_extra
+        else:
+            self.mode = "normal"
+
+        self.interval = min(max(interval, self.min_interval), self.max_interval)
+        return self.interval
+
+    def snapshot(self):
+        return {
+            "interval": self.interval,
+            "mode": self.mode,
+            "detection_latency_ms": round(self.latency_ema * 1000, 2) if self.latency_ema is not None else None,
+            "output_fps": round(self.output_fps, 2),
+            "cpu_load": round(self.cpu_load, 3),
+            "last_state": self.last_state,
+        }
+
+
+# Controladores de las sesiones activas (se liberan solos al cerrar la sesión)
+CONTROLLERS = weakref.WeakValueDictionary()
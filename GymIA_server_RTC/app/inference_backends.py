@@ -0,0 +1,361 @@
+# Backends de inferencia intercambiables para YOLO-Pose y los LSTM
+# native = ultralytics/PyTorch + Keras; onnx = ONNX Runtime; openvino = OpenVINO (CPU)
+#
+# Los modelos exportados (ver export_models.py) viven junto a los originales:
+#   models/yolo11n-pose.pt  -> models/yolo11n-pose.onnx / models/yolo11n-pose.xml
+#   models/lstm6-model6pm.h5 -> models/lstm6-model6pm.onnx / models/lstm6-model6pm.xml
+# Las variantes cuantizadas (ver quantize_models.py) son ONNX con sufijo:
+#   models/lstm6-model6pm.int8.onnx, models/yolo11n-pose.fp16.onnx
+
+import hashlib
+import importlib.util
+import json
+import os
+import threading
+
+import cv2
+import numpy as np
+
+DEFAULT_BACKEND = os.environ.get("INFERENCE_BACKEND", "native")  # native | onnx | openvino | auto
+DEFAULT_THREADS = int(os.environ.get("INFERENCE_THREADS", "0"))  # Hilos intra-op (0 = valor del runtime)
+
+EXPORT_SUFFIX = {"onnx": ".onnx", "openvino": ".xml"}
+_MODULES = {"onnx": "onnxruntime", "openvino": "openvino"}
+
+VARIANTS = ("int8", "fp16")
+QUANTIZATION_REPORT = "quantization.json"  # Resultado del control de precisión, en models/
+
+# Umbrales por defecto de ultralytics para YOLO-Pose
+POSE_CONF = 0.25
+POSE_IOU = 0.7
+POSE_MAX_DET = 300
+KEYPOINT_VISIBLE = 0.5  # ultralytics pone en (0, 0) los keypoints con confianza menor
+LETTERBOX_COLOR = (114, 114, 114)
+
+
+def available_backends():
+    return ["native"] + [name for name, module in _MODULES.items() if importlib.util.find_spec(module)]
+
+
+def resolve_backend(name=None):
+    """Nombre de backend efectivo; `auto` prefiere OpenVINO, luego ONNX Runtime"""
+    name = (name or DEFAULT_BACKEND).lower()
+    available = available_backends()
+    if name == "auto":
+        for candidate in ("openvino", "onnx"):
+            if candidate in available:
+                return candidate
+        return "native"
+    if name not in ("native",) + tuple(_MODULES):
+        raise ValueError(f"Backend de inferencia desconocido: {name}")
+    if name not in available:
+        raise ImportError(f"El backend {name} requiere el paquete {_MODULES[name]}")
+    return name
+
+
+def parse_variants(text):
+    """'peso_muerto=int8,sentadilla=fp16' -> {ejercicio: variante}"""
+    variants = {}
+    for item in filter(None, (part.strip() for part in text.split(","))):
+        exercise, _, variant = item.partition("=")
+        variant = variant.strip().lower()
+        if variant not in VARIANTS:
+            raise ValueError(f"Variante desconocida para {exercise.strip()}: {variant!r} (opciones: {', '.join(VARIANTS)})")
+        variants[exercise.strip()] = variant
+    return variants
+
+
+MODEL_VARIANTS = parse_variants(os.environ.get("MODEL_VARIANTS", ""))  # Variante LSTM por ejercicio (vacío = float32)
+POSE_VARIANT = os.environ.get("POSE_VARIANT", "").lower()  # Variante de YOLO-Pose: int8 | fp16 | vacío
+
+
+def exported_path(path, backend):
+    """Archivo exportado que corresponde a un modelo original (.pt / .h5)"""
+    return os.path.splitext(path)[0] + EXPORT_SUFFIX[backend]
+
+
+def variant_path(path, variant):
+    """Variante cuantizada (siempre ONNX) de un modelo original"""
+    return f"{os.path.splitext(path)[0]}.{variant}.onnx"
+
+
+def source_digest(path):
+    """sha256 del ONNX float32 del que salen las variantes de `path`"""
+    digest = hashlib.sha256()
+    with open(exported_path(path, "onnx"), "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def accepted_variant(path, variant):
+    """
+    (aceptada, motivo) según el reporte de quantize_models.py junto al modelo.
+    La aceptación vale para el ONNX evaluado: si se volvió a exportar (p. ej.
+    tras reentrenar con el mismo nombre), la variante queda sin aceptar.
+    """
+    try:
+        with open(os.path.join(os.path.dirname(path), QUANTIZATION_REPORT), encoding="utf-8") as f:
+            report = json.load(f)
+    except (OSError, ValueError):
+        return False, "no hay reporte de cuantización (ejecutar quantize_models.py)"
+    entry = report.get(os.path.basename(path), {}).get(variant)
+    if entry is None:
+        return False, "variante sin evaluar"
+    if not entry.get("accepted"):
+        return False, entry.get("reason", "rechazada por el control de precisión")
+    try:
+        current = source_digest(path)
+    except OSError:
+        return False, f"falta {os.path.basename(exported_path(path, 'onnx'))}"
+    if entry.get("source_sha256") != current:
+        return False, "el modelo cambió desde la evaluación (volver a ejecutar quantize_models.py)"
+    return True, None
+
+
+def _variant_backend(backend):
+    """Las variantes son ONNX: las abre ONNX Runtime u OpenVINO aunque el backend sea native"""
+    if backend in _MODULES:
+        return backend
+    backend = resolve_backend("auto")
+    if backend == "native":
+        raise ImportError("Las variantes cuantizadas requieren onnxruntime u openvino")
+    return backend
+
+
+def load_variant(path, variant, backend, threads=None):
+    """
+    Sesión de la variante si pasó el control de precisión; si no, None y un
+    aviso: el llamador sigue con el modelo float32 en lugar de perder calidad.
+    """
+    accepted, reason = accepted_variant(path, variant)
+    if not accepted:
+        print(f"⚠️ Variante {variant} de {os.path.basename(path)} no aceptada ({reason}); se usa float32")
+        return None
+    return load_session(variant_path(path, variant), _variant_backend(backend), threads)
+
+
+class _OnnxRuntimeSession:
+    def __init__(self, path, threads=0):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.inter_op_num_threads = 1
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.input = self.session.get_inputs()[0]
+        self.input_shape = tuple(d if isinstance(d, int) else None for d in self.input.shape)
+
+    def run(self, x):
+        return self.session.run(None, {self.input.name: x})[0]
+
+
+class _OpenVinoSession:
+    def __init__(self, path, threads=0):
+        import openvino as ov
+
+        core = ov.Core()
+        config = {"PERFORMANCE_HINT": "LATENCY"}
+        if threads:
+            config["INFERENCE_NUM_THREADS"] = threads
+        model = core.read_model(path)
+        self.input_shape = tuple(
+            d.get_length() if d.is_static else None for d in model.input(0).get_partial_shape()
+        )
+        self.compiled = core.compile_model(model, "CPU", config)
+        self.output = self.compiled.output(0)
+
+    def run(self, x):
+        return self.compiled([x])[self.output]
+
+
+def load_session(path, backend, threads=None):
+    if not os.path.isfile(path):
+        raise FileNotFoundError(f"Modelo exportado no encontrado: {path} (ejecutar export_models.py)")
+    threads = DEFAULT_THREADS if threads is None else threads
+    if backend == "onnx":
+        return _OnnxRuntimeSession(path, threads)
+    if backend == "openvino":
+        return _OpenVinoSession(path, threads)
+    raise ValueError(f"Backend sin sesión compilada: {backend}")
+
+
+def _run_batched(session, x):
+    """Ejecuta el lote completo o, si el modelo tiene batch fijo, muestra por muestra"""
+    if session.input_shape and session.input_shape[0] not in (None, len(x)):
+        return np.concatenate([session.run(x[i:i + 1]) for i in range(len(x))])
+    return session.run(x)
+
+
+# --- LSTM ---
+
+class CompiledLSTM:
+    """LSTM exportado con la interfaz de Keras que usan LSTMBatchEngine y ModelRegistry"""
+
+    def __init__(self, session, variant=None):
+        self.session = session
+        self.variant = variant
+        self.input_shape = session.input_shape
+
+    def predict_on_batch(self, x):
+        return _run_batched(self.session, np.ascontiguousarray(x, dtype=np.float32))
+
+    def predict(self, x, verbose=0):
+        return self.predict_on_batch(x)
+
+
+def make_lstm_loader(backend=None, threads=None):
+    """
+    Loader para ModelRegistry: `loader(path, variant=None)` abre el .h5 con Keras
+    o el archivo exportado, o la variante cuantizada si fue aceptada.
+    """
+    from app.model_registry import _keras_loader
+
+    backend = resolve_backend(backend)
+
+    def loader(path, variant=None):
+        if variant:
+            session = load_variant(path, variant, backend, threads)
+            if session is not None:
+                return CompiledLSTM(session, variant)
+        if backend == "native":
+            return _keras_loader(path)
+        return CompiledLSTM(load_session(exported_path(path, backend), backend, threads))
+
+    return loader
+
+
+# --- YOLO-Pose ---
+
+class _Boxes:
+    def __init__(self, xyxy, conf):
+        self.xyxy = xyxy
+        self.conf = conf
+
+    def __len__(self):
+        return len(self.xyxy)
+
+
+class _Keypoints:
+    def __init__(self, xy, xyn, conf):
+        self.xy = xy
+        self.xyn = xyn
+        self.conf = conf
+
+
+class PoseResult:
+    """Resultado de YOLO-Pose en arreglos numpy, con los campos que lee extract_pose"""
+
+    def __init__(self, image, xyxy, conf, keypoints):
+        height, width = image.shape[:2]
+        visible = keypoints[..., 2] >= KEYPOINT_VISIBLE
+        xy = np.where(visible[..., None], keypoints[..., :2], 0).astype(np.float32)
+        self.orig_img = image
+        self.boxes = _Boxes(xyxy.astype(np.float32), conf.astype(np.float32))
+        self.keypoints = _Keypoints(xy, xy / np.array([width, height], dtype=np.float32), keypoints[..., 2])
+
+    def plot(self):
+        from app.utils.rendering import BASE_COLOR, draw_pose_overlay
+
+        vis = self.orig_img.copy()
+        for joints in self.keypoints.xy:
+            draw_pose_overlay(vis, joints, [], BASE_COLOR)
+        return vis
+
+
+def _letterbox(image, size):
+    """Mismo preprocesado que ultralytics: escala sin deformar y rellena con gris"""
+    height, width = image.shape[:2]
+    ratio = min(size / height, size / width)
+    new_w, new_h = round(width * ratio), round(height * ratio)
+    pad_x, pad_y = (size - new_w) / 2, (size - new_h) / 2
+    if (new_w, new_h) != (width, height):
+        image = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    top, left = round(pad_y - 0.1), round(pad_x - 0.1)
+    bottom, right = size - new_h - top, size - new_w - left
+    if top or bottom or left or right:
+        image = cv2.copyMakeBorder(image, top, bottom, left, right, cv2.BORDER_CONSTANT, value=LETTERBOX_COLOR)
+    return image, ratio, (left, top)
+
+
+def _postprocess(prediction, image, ratio, pad, conf=POSE_CONF, iou=POSE_IOU, max_det=POSE_MAX_DET):
+    """Salida cruda (56, anchors) -> PoseResult con NMS, en coordenadas de la imagen original"""
+    rows = prediction.T
+    rows = rows[rows[:, 4] > conf]
+    if len(rows):
+        cx, cy, w, h = rows[:, 0], rows[:, 1], rows[:, 2], rows[:, 3]
+        xyxy = np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1)
+        keep = cv2.dnn.NMSBoxes(np.stack([xyxy[:, 0], xyxy[:, 1], w, h], axis=1).tolist(),
+                                rows[:, 4].tolist(), conf, iou)
+        keep = np.asarray(keep, dtype=np.int64).reshape(-1)[:max_det]
+        rows, xyxy = rows[keep], xyxy[keep]
+    else:
+        xyxy = np.zeros((0, 4), dtype=np.float32)
+
+    # Con 0 filas el -1 del reshape es ambiguo: la cantidad de keypoints sale de las columnas
+    keypoints = rows[:, 5:].reshape(len(rows), (rows.shape[1] - 5) // 3, 3).copy()
+    offset = np.array(pad, dtype=np.float32)
+    height, width = image.shape[:2]
+    xyxy = (xyxy - np.tile(offset, 2)) / ratio
+    xyxy[:, [0, 2]] = xyxy[:, [0, 2]].clip(0, width)
+    xyxy[:, [1, 3]] = xyxy[:, [1, 3]].clip(0, height)
+    keypoints[..., :2] = (keypoints[..., :2] - offset) / ratio
+    return PoseResult(image, xyxy, rows[:, 4], keypoints)
+
+
+class CompiledPoseEngine:
+    """
+    YOLO-Pose exportado (ONNX Runtime u OpenVINO) con la misma interfaz que
+    PoseEngine: `load()` y `predict(imagenes)` -> lista de resultados.
+    """
+
+    def __init__(self, weights, backend, threads=None, imgsz=640, variant=None):
+        self.weights = weights
+        self.backend = backend
+        self.threads = threads
+        self.imgsz = imgsz
+        self.variant = variant
+        self.path = variant_path(weights, variant) if variant else exported_path(weights, backend)
+        self._session = None
+        self._load_lock = threading.Lock()
+        self._predict_lock = threading.Lock()
+
+    @property
+    def session(self):
+        if self._session is None:
+            with self._load_lock:
+                if self._session is None:
+                    self._session = load_session(self.path, self.backend, self.threads)
+        return self._session
+
+    def load(self):
+        return self.session
+
+    def predict(self, source, **kwargs):
+        images = source if isinstance(source, (list, tuple)) else [source]
+        prepared = [_letterbox(image, self.imgsz) for image in images]
+        # BGR -> RGB, HWC -> CHW, [0, 1]
+        batch = np.stack([p[0][..., ::-1].transpose(2, 0, 1) for p in prepared]).astype(np.float32) / 255.0
+        session = self.session
+        with self._predict_lock:
+            output = _run_batched(session, np.ascontiguousarray(batch))
+        return [_postprocess(output[i], image, ratio, pad)
+                for i, (image, (_, ratio, pad)) in enumerate(zip(images, prepared))]
+
+
+def make_pose_engine(weights, backend=None, threads=None, variant=None):
+    """YOLO-Pose del backend indicado; `variant` (por defecto POSE_VARIANT) solo si fue aceptada"""
+    backend = resolve_backend(backend)
+    variant = POSE_VARIANT if variant is None else variant
+    if variant:
+        accepted, reason = accepted_variant(weights, variant)
+        if accepted:
+            return CompiledPoseEngine(weights, _variant_backend(backend), threads, variant=variant)
+        print(f"⚠️ Variante {variant} de {os.path.basename(weights)} no aceptada ({reason}); se usa float32")
+    if backend == "native":
+        from app.pose_engine import PoseEngine
+        return PoseEngine(weights)
+    return CompiledPoseEngine(weights, backend, threads)
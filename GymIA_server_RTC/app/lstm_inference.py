@@ -0,0 +1,182 @@
+# Servicio compartido de inferencia LSTM por lotes
+# Agrupa las ventanas de todas las sesiones del mismo ejercicio en una sola pasada
+
+import asyncio
+import collections
+import threading
+import time
+
+import numpy as np
+
+from app.metrics import STAGE_SECONDS, BATCH_SIZE
+
+LSTM_SECONDS = STAGE_SECONDS.labels("lstm")
+LSTM_BATCH = BATCH_SIZE.labels("lstm")
+
+
+class LSTMBatchEngine:
+    """
+    Motor de inferencia LSTM compartido entre sesiones.
+
+    Cada sesión envía su ventana de keypoints con `predict()`. Las ventanas del
+    mismo ejercicio se acumulan durante `max_wait` segundos (o hasta `max_batch`
+    ventanas) y se evalúan en una sola llamada al modelo, ejecutada en el
+    executor para no bloquear el event loop.
+    """
+
+    def __init__(self, model_provider, executor, max_batch=32, max_wait=0.005):
+        self.model_provider = model_provider  # exercise -> modelo Keras
+        self.executor = executor
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait = max(0.0, float(max_wait))
+        self._queues = {}
+        self._events = {}
+        self._workers = {}
+        self._batches = {}
+        self._stats_lock = threading.Lock()
+        self._stats = {}
+
+    async def predict(self, exercise, window):
+        """
+        Encola una ventana (timesteps, features) y devuelve sus probabilidades.
+        `window` puede ser un arreglo o un KeypointRingBuffer, que se copia
+        directamente en su fila del lote; no debe modificarse mientras se espera.
+        """
+        loop = asyncio.get_running_loop()
+        self._ensure_worker(exercise)
+        future = loop.create_future()
+        queue = self._queues[exercise]
+        queue.append((window, future))
+        self._record_depth(exercise, len(queue))
+        self._events[exercise].set()
+        return await future
+
+    def _ensure_worker(self, exercise):
+        """Crea la cola y la tarea colectora del ejercicio la primera vez"""
+        worker = self._workers.get(exercise)
+        if worker is not None and not worker.done():
+            return
+        self._queues.setdefault(exercise, collections.deque())
+        self._events[exercise] = asyncio.Event()
+        self._workers[exercise] = asyncio.ensure_future(self._run(exercise))
+
+    async def _run(self, exercise):
+        loop = asyncio.get_running_loop()
+        queue = self._queues[exercise]
+        event = self._events[exercise]
+        while True:
+            await event.wait()
+
+            # Ventana de agregación: esperar más ventanas hasta llenar el lote o agotar el tiempo
+            deadline = loop.time() + self.max_wait
+            while len(queue) < self.max_batch:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                event.clear()
+                try:
+                    await asyncio.wait_for(event.wait(), remaining)
+                except asyncio.TimeoutError:
+                    break
+
+            batch = [queue.popleft() for _ in range(min(len(queue), self.max_batch))]
+            if not queue:
+                event.clear()
+            # Descartar peticiones cuya sesión ya dejó de esperar
+            batch = [(window, future) for window, future in batch if not future.done()]
+            if not batch:
+                continue
+
+            try:
+                # También dentro del try: una ventana con otra forma no debe dejar futures sin resolver
+                windows = self._fill_batch(exercise, [window for window, _ in batch])
+                proba = await loop.run_in_executor(self.executor, self._forward, exercise, windows)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for i, (_, future) in enumerate(batch):
+                if not future.done():
+                    future.set_result(proba[i])
+
+    def _fill_batch(self, exercise, windows):
+        """
+        Copia las ventanas en el tensor de lote preasignado del ejercicio.
+        Es seguro reutilizarlo: cada ejercicio procesa un lote a la vez.
+        """
+        shape = windows[0].shape
+        tensor = self._batches.get(exercise)
+        if tensor is None or tensor.shape[1:] != shape:
+            tensor = self._batches[exercise] = np.empty((self.max_batch,) + tuple(shape), dtype=np.float32)
+        for i, window in enumerate(windows):
+            if hasattr(window, "write_to"):
+                window.write_to(tensor[i])
+            else:
+                tensor[i] = window
+        return tensor[:len(windows)]
+
+    def _forward(self, exercise, windows):
+        """Pasada única del modelo sobre el lote (se ejecuta en el executor)"""
+        model = self.model_provider(exercise)
+        start = time.perf_counter()
+        proba = np.asarray(model.predict_on_batch(windows))
+        elapsed = time.perf_counter() - start
+        LSTM_SECONDS.observe(elapsed)
+        LSTM_BATCH.observe(len(windows))
+        self._record_batch(exercise, len(windows), elapsed)
+        return proba
+
+    def _exercise_stats(self, exercise):
+        stats = self._stats.get(exercise)
+        if stats is None:
+            stats = self._stats[exercise] = {
+                "batches": 0,
+                "windows": 0,
+                "max_queue_depth": 0,
+                "queue_depth_histogram": collections.Counter(),
+                "batch_size_histogram": collections.Counter(),
+                "forward_seconds_total": 0.0,
+            }
+        return stats
+
+    def _record_depth(self, exercise, depth):
+        with self._stats_lock:
+            stats = self._exercise_stats(exercise)
+            stats["queue_depth_histogram"][depth] += 1
+            stats["max_queue_depth"] = max(stats["max_queue_depth"], depth)
+
+    def _record_batch(self, exercise, size, seconds):
+        with self._stats_lock:
+            stats = self._exercise_stats(exercise)
+            stats["batches"] += 1
+            stats["windows"] += size
+            stats["batch_size_histogram"][size] += 1
+            stats["forward_seconds_total"] += seconds
+
+    def queue_depths(self):
+        """Ventanas esperando lote, por ejercicio"""
+        return {exercise: len(queue) for exercise, queue in list(self._queues.items())}
+
+    def snapshot(self):
+        """Estadísticas actuales para ajustar max_batch / max_wait"""
+        with self._stats_lock:
+            result = {
+                "max_batch": self.max_batch,
+                "max_wait_ms": self.max_wait * 1000,
+                "exercises": {},
+            }
+            for exercise, stats in self._stats.items():
+                batches = stats["batches"]
+                result["exercises"][exercise] = {
+                    "queue_depth": len(self._queues.get(exercise, ())),
+                    "max_queue_depth": stats["max_queue_depth"],
+                    "batches": batches,
+                    "windows": stats["windows"],
+                    "avg_batch_size": stats["windows"] / batches if batches else 0.0,
+                    "avg_forward_ms": stats["forward_seconds_total"] * 1000 / batches if batches else 0.0,
+                    "queue_depth_histogram": {str(k): v for k, v in sorted(stats["queue_depth_histogram"].items())},
+                    "batch_size_histogram": {str(k): v for k, v in sorted(stats["batch_size_histogram"].items())},
+                }
+            return result
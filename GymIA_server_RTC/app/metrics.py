@@ -0,0 +1,234 @@
+# Métricas en formato de exposición de Prometheus, sin dependencias externas
+# Pensadas para dejarse activas en producción: registrar un valor es un lock y una búsqueda binaria
+
+import bisect
+import threading
+
+# Límites de los histogramas de tiempo (segundos): de 0.1 ms a 1 s
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra is not None:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    body = ",".join('{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"')) for k, v in pairs)
+    return "{" + body + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children = {}
+
+    def labels(self, *values):
+        """Hijo para una combinación de etiquetas; conviene guardarlo y reutilizarlo"""
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} espera las etiquetas {self.labelnames}")
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def remove(self, *values):
+        """Elimina una combinación de etiquetas (p. ej. una sesión que terminó)"""
+        with self._lock:
+            self._children.pop(tuple(str(v) for v in values), None)
+
+    def _default(self):
+        if self.labelnames:
+            raise ValueError(f"{self.name} requiere etiquetas {self.labelnames}")
+        return self.labels()
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            children = sorted(self._children.items())
+        for values, child in children:
+            lines.extend(child.render(self.name, self.labelnames, values))
+        return lines
+
+
+class _Value:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def render(self, name, labelnames, values):
+        return [f"{name}{_format_labels(labelnames, values)} {_format_value(self.value)}"]
+
+
+class _GaugeValue(_Value):
+    def set(self, value):
+        self.value = value
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+
+class _HistogramValue:
+    def __init__(self, buckets):
+        self._lock = threading.Lock()
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def render(self, name, labelnames, values):
+        with self._lock:
+            counts, total = list(self.counts), self.sum
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            labels = _format_labels(labelnames, values, ("le", _format_value(bound)))
+            lines.append(f"{name}_bucket{labels} {cumulative}")
+        labels = _format_labels(labelnames, values)
+        lines.append(f"{name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{name}_count{labels} {cumulative}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount=1):
+        self._default().inc(amount)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeValue()
+
+    def set(self, value):
+        self._default().set(value)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value):
+        self._default().observe(value)
+
+
+class CallbackGauge:
+    """Gauge calculado al momento del scrape: `callback()` devuelve {etiquetas: valor}"""
+    kind = "gauge"
+
+    def __init__(self, name, documentation, callback, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.callback = callback
+        self.labelnames = tuple(labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for values, value in sorted(self.callback().items()):
+            values = values if isinstance(values, tuple) else (values,)
+            lines.append(f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(value)}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Métrica duplicada: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge_callback(self, name, documentation, callback, labelnames=()):
+        return self.register(CallbackGauge(name, documentation, callback, labelnames))
+
+    def render(self):
+        """Texto en formato de exposición de Prometheus (text/plain; version=0.0.4)"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            try:
+                lines.extend(metric.render())
+            except Exception as e:  # Un gauge roto no debe tumbar el scrape completo
+                lines.append(f"# ERROR {metric.name}: {e}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+# --- Métricas del pipeline de video ---
+STAGE_SECONDS = REGISTRY.histogram(
+    "gymia_stage_seconds",
+    "Duración de cada etapa del pipeline (yolo y lstm se miden por lote)",
+    ["stage"],
+)
+FRAMES = REGISTRY.counter(
+    "gymia_frames_total",
+    "Frames recibidos según cómo se resolvió la detección (detected, skipped, cached, dropped)",
+    ["outcome"],
+)
+INPUT_DROPPED = REGISTRY.counter(
+    "gymia_input_frames_dropped_total",
+    "Frames de la cámara descartados sin procesar porque llegó uno más reciente",
+)
+FRAME_LATENCY = REGISTRY.histogram(
+    "gymia_frame_latency_seconds",
+    "Tiempo desde que llega el frame de la cámara hasta que sale anotado",
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+BATCH_SIZE = REGISTRY.histogram(
+    "gymia_batch_size",
+    "Tamaño de los lotes enviados a cada modelo",
+    ["model"],
+    buckets=(1, 2, 4, 8, 16, 32, 64),
+)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
@@ -0,0 +1,131 @@
+# Registro de modelos LSTM compartido por todo el proceso
+# Cada modelo se carga una sola vez por ejercicio y se puede reemplazar en caliente
+
+import os
+import threading
+import time
+
+
+def _keras_loader(path):
+    from keras.models import load_model
+    return load_model(path)
+
+
+class ModelRegistry:
+    """
+    Registro de modelos LSTM indexado por ejercicio.
+
+    Los modelos se cargan de forma perezosa en el primer uso (o todos juntos con
+    `preload()`) y se comparten entre sesiones. `swap()` carga un archivo nuevo
+    fuera del lock y reemplaza la referencia de forma atómica: los lotes en curso
+    terminan con el modelo anterior y los siguientes usan el nuevo.
+
+    `variants` ({ejercicio: "int8" | "fp16"}) pide al loader la variante
+    cuantizada del modelo de ese ejercicio, también al reemplazarlo.
+    """
+
+    def __init__(self, exercises, loader=None, models_dir="models", variants=None):
+        self.exercises = exercises
+        self.loader = loader or _keras_loader
+        self.models_dir = os.path.abspath(models_dir)
+        self.variants = dict(variants or {})
+        self._lock = threading.Lock()
+        self._load_locks = {name: threading.Lock() for name in exercises}
+        self._entries = {}
+
+    def get(self, exercise):
+        """Devuelve el modelo del ejercicio, cargándolo si aún no existe"""
+        entry = self._entries.get(exercise)
+        if entry is not None:
+            return entry["model"]
+        if exercise not in self.exercises:
+            raise KeyError(f"Ejercicio desconocido: {exercise}")
+        # Un lock por ejercicio: cargar sentadilla no bloquea a peso_muerto
+        with self._load_locks[exercise]:
+            entry = self._entries.get(exercise)
+            if entry is None:
+                entry = self._load(exercise, self.exercises[exercise]["model_path"])
+                with self._lock:
+                    self._entries[exercise] = entry
+        return entry["model"]
+
+    def preload(self, exercises=None):
+        """Carga de forma anticipada los modelos indicados (todos por defecto)"""
+        for exercise in exercises or list(self.exercises):
+            self.get(exercise)
+
+    def swap(self, exercise, model_path=None):
+        """
+        Reemplaza en caliente el modelo de un ejercicio por otro archivo de `models/`.
+        Sin `model_path` se recarga el archivo actual (p. ej. tras sobrescribirlo).
+        """
+        if exercise not in self.exercises:
+            raise KeyError(f"Ejercicio desconocido: {exercise}")
+        if model_path is None:
+            current = self._entries.get(exercise)
+            model_path = current["path"] if current else self.exercises[exercise]["model_path"]
+        path = self._resolve(model_path)
+
+        with self._load_locks[exercise]:
+            entry = self._load(exercise, path)
+            with self._lock:
+                previous = self._entries.get(exercise)
+                entry["version"] = previous["version"] + 1 if previous else 1
+                self._entries[exercise] = entry
+        return self._describe_entry(entry)
+
+    def _resolve(self, model_path):
+        """Solo se permiten archivos dentro del directorio de modelos"""
+        path = os.path.abspath(model_path)
+        if os.path.dirname(path) != self.models_dir:
+            path = os.path.abspath(os.path.join(self.models_dir, os.path.basename(model_path)))
+        if not os.path.isfile(path):
+            raise FileNotFoundError(f"Modelo no encontrado: {model_path}")
+        return path
+
+    def _load(self, exercise, path):
+        start = time.perf_counter()
+        variant = self.variants.get(exercise)
+        model = self.loader(path, variant) if variant else self.loader(path)
+        self._validate(exercise, model)
+        return {
+            "model": model,
+            "path": path,
+            "variant": getattr(model, "variant", None),  # None = float32 (o variante rechazada)
+            "version": 1,
+            "loaded_at": time.time(),
+            "load_seconds": time.perf_counter() - start,
+        }
+
+    def _validate(self, exercise, model):
+        """Verifica que el modelo acepte ventanas del tamaño configurado"""
+        input_shape = getattr(model, "input_shape", None)
+        if not input_shape or len(input_shape) != 3:
+            return
+        timesteps = self.exercises[exercise]["timesteps"]
+        if input_shape[1] not in (None, timesteps):
+            raise ValueError(
+                f"El modelo espera {input_shape[1]} timesteps y {exercise} usa {timesteps}"
+            )
+
+    def _describe_entry(self, entry):
+        return {
+            "path": os.path.relpath(entry["path"]),
+            "variant": entry["variant"],
+            "version": entry["version"],
+            "loaded_at": entry["loaded_at"],
+            "load_seconds": round(entry["load_seconds"], 3),
+        }
+
+    def describe(self):
+        """Estado de cada ejercicio: archivo cargado, versión y tiempo de carga"""
+        with self._lock:
+            entries = dict(self._entries)
+        result = {}
+        for exercise, cfg in self.exercises.items():
+            entry = entries.get(exercise)
+            if entry is None:
+                result[exercise] = {"path": cfg["model_path"], "loaded": False}
+            else:
+                result[exercise] = dict(self._describe_entry(entry), loaded=True)
+        return result
@@ -0,0 +1,228 @@
+# Análisis offline de series grabadas (MP4 del teléfono, etc.)
+# Misma lógica que VideoTransformTrack, pero con detección y LSTM en lotes grandes
+#
+# Uso:
+#   python -m app.offline_analysis video.mp4 --exercise sentadilla --output timeline.json
+
+import argparse
+import json
+import os
+import time
+
+import cv2
+import numpy as np
+
+from app.exercises import load_exercise_config, calculate_exercise_state, is_correct_label
+from app.utils.pose_tracking import PoseTracker
+from app.utils.processing import WINDOW_SIZE, extract_pose
+from app.utils.ring_buffer import KeypointRingBuffer
+
+POSE_BATCH = int(os.environ.get("OFFLINE_POSE_BATCH", "16"))  # Frames por llamada a YOLO-Pose
+LSTM_BATCH = int(os.environ.get("OFFLINE_LSTM_BATCH", "256"))  # Ventanas por llamada al LSTM
+WINDOW_STRIDE = int(os.environ.get("OFFLINE_WINDOW_STRIDE", "5"))  # Frames entre ventanas evaluadas
+
+
+def iter_frames(path, frame_stride=1):
+    """Decodifica el video en streaming con PyAV: (índice, segundos, frame BGR)"""
+    import av
+
+    with av.open(path) as container:
+        stream = container.streams.video[0]
+        stream.thread_type = "AUTO"
+        for index, frame in enumerate(container.decode(stream)):
+            if index % frame_stride:
+                continue
+            seconds = float(frame.time) if frame.time is not None else None
+            yield index, seconds, frame.to_ndarray(format="bgr24")
+
+
+def iter_batches(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class _WindowPredictor:
+    """Acumula ventanas en un lote preasignado y las evalúa juntas con `predict`"""
+
+    def __init__(self, predict, timesteps, batch_size, features=34):
+        self.predict = predict
+        self.windows = np.empty((batch_size, timesteps, features), dtype=np.float32)
+        self.meta = []
+        self.results = []
+
+    def add(self, buffer, frame_index, seconds):
+        buffer.write_to(self.windows[len(self.meta)])
+        self.meta.append((frame_index, seconds))
+        if len(self.meta) == len(self.windows):
+            self.flush()
+
+    def flush(self):
+        if not self.meta:
+            return
+        proba = np.asarray(self.predict(self.windows[:len(self.meta)]))
+        self.results.extend(zip(self.meta, proba))
+        self.meta = []
+
+
+def _split_reps(events, end_frame, end_time):
+    """Repeticiones a partir de los cambios de estado: arriba -> abajo -> arriba"""
+    reps = []
+    start = None
+    bottom_seen = False
+    for frame_index, seconds, state in events:
+        if state == "abajo" and start is None:
+            start = (frame_index, seconds)
+            bottom_seen = True
+        elif state == "arriba" and start is not None and bottom_seen:
+            reps.append((start, (frame_index, seconds)))
+            start = None
+            bottom_seen = False
+    if start is not None:
+        reps.append((start, (end_frame, end_time)))
+    return reps
+
+
+def analyze_video(path, exercise, pose_engine=None, lstm_model=None, exercises=None,
+                  pose_batch=POSE_BATCH, lstm_batch=LSTM_BATCH, window_stride=WINDOW_STRIDE,
+                  frame_stride=1, detect=None, predict=None):
+    """
+    Analiza un video completo y devuelve una línea de tiempo JSON-serializable.
+    La memoria está acotada por `pose_batch` frames y `lstm_batch` ventanas,
+    independientemente de la duración del video.
+
+    Por defecto usa `pose_engine` y `lstm_model` directamente. El servidor
+    pasa `detect(images, tracker)` (lista de poses de extract_pose) y
+    `predict(windows)` (probabilidades) para compartir la inferencia con las
+    sesiones en vivo sin bloquearlas.
+    """
+    if detect is None:
+        def detect(images, tracker):
+            return [extract_pose(result, tracker, render=False) for result in pose_engine.predict(images)]
+    if predict is None:
+        predict = lstm_model.predict_on_batch
+
+    exercises = exercises or load_exercise_config()
+    if exercise not in exercises:
+        raise KeyError(f"Ejercicio desconocido: {exercise}")
+    cfg = exercises[exercise]
+    labels = list(cfg["error_msgs"].keys())
+
+    started = time.perf_counter()
+    tracker = PoseTracker()
+    buffer = KeypointRingBuffer(cfg["timesteps"])
+    predictor = _WindowPredictor(predict, cfg["timesteps"], max(1, lstm_batch))
+    events = []
+    last_state = None
+    frames = detected = 0
+    last_index, last_seconds = 0, 0.0
+    since_window = 0
+
+    for batch in iter_batches(iter_frames(path, frame_stride), max(1, pose_batch)):
+        images = [cv2.resize(img, WINDOW_SIZE) for _, _, img in batch]
+        for (index, seconds, _), proc in zip(batch, detect(images, tracker)):
+            frames += 1
+            last_index, last_seconds = index, seconds
+            if proc is None:
+                continue
+            detected += 1
+            kps_flat, kps_orig, _ = proc
+            buffer.append(kps_flat)
+
+            state = calculate_exercise_state(exercise, cfg, kps_orig)
+            if state is not None and state != last_state:
+                events.append((index, seconds, state))
+                last_state = state
+
+            since_window += 1
+            if buffer.is_full() and since_window >= window_stride:
+                predictor.add(buffer, index, seconds)
+                since_window = 0
+    predictor.flush()
+
+    timeline = []
+    for (index, seconds), proba in predictor.results:
+        idx = int(np.argmax(proba))
+        timeline.append({
+            "frame": index,
+            "time": seconds,
+            "label": labels[idx] if idx < len(labels) else idx,
+            "confidence": round(float(proba[idx]), 4),
+        })
+
+    reps = []
+    for number, ((start_frame, start_time), (end_frame, end_time)) in enumerate(_split_reps(events, last_index, last_seconds), 1):
+        rep_proba = [proba for (index, _), proba in predictor.results if start_frame <= index <= end_frame]
+        rep = {"rep": number, "start_frame": start_frame, "end_frame": end_frame,
+               "start_time": start_time, "end_time": end_time, "windows": len(rep_proba)}
+        if rep_proba:
+            mean = np.mean(rep_proba, axis=0)
+            idx = int(np.argmax(mean))
+            label = labels[idx]
+            err, sol = cfg["error_msgs"][label]
+            rep.update(label=label, confidence=round(float(mean[idx]), 4),
+                       correct=is_correct_label(label), message=err, correction=sol)
+        reps.append(rep)
+
+    elapsed = time.perf_counter() - started
+    duration = last_seconds or 0.0
+    return {
+        "exercise": exercise,
+        "video": os.path.basename(path),
+        "frames": frames,
+        "frames_with_pose": detected,
+        "duration_seconds": duration,
+        "processing_seconds": round(elapsed, 3),
+        "realtime_factor": round(duration / elapsed, 2) if elapsed > 0 else None,
+        "states": [{"frame": i, "time": t, "state": s} for i, t, s in events],
+        "reps": reps,
+        "timeline": timeline,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Análisis offline de un video de ejercicio")
+    parser.add_argument("video")
+    parser.add_argument("--exercise", default=os.environ.get("GYMIA_EXERCISE", "peso_muerto"))
+    parser.add_argument("--output", help="Archivo JSON de salida (por defecto stdout)")
+    parser.add_argument("--pose-batch", type=int, default=POSE_BATCH)
+    parser.add_argument("--lstm-batch", type=int, default=LSTM_BATCH)
+    parser.add_argument("--window-stride", type=int, default=WINDOW_STRIDE)
+    parser.add_argument("--frame-stride", type=int, default=1)
+    parser.add_argument("--pose-model", default="models/yolo11n-pose.pt")
+    parser.add_argument("--backend", default=None, help="native, onnx, openvino o auto (por defecto INFERENCE_BACKEND)")
+    args = parser.parse_args()
+
+    from app.inference_backends import MODEL_VARIANTS, make_lstm_loader, make_pose_engine
+    from app.model_registry import ModelRegistry
+
+    exercises = load_exercise_config()
+    registry = ModelRegistry(exercises, loader=make_lstm_loader(args.backend), variants=MODEL_VARIANTS)
+    report = analyze_video(
+        args.video,
+        args.exercise,
+        make_pose_engine(args.pose_model, args.backend),
+        registry.get(args.exercise),
+        exercises=exercises,
+        pose_batch=args.pose_batch,
+        lstm_batch=args.lstm_batch,
+        window_stride=args.window_stride,
+        frame_stride=args.frame_stride,
+    )
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+        print(f"✅ {report['frames']} frames en {report['processing_seconds']}s "
+              f"({report['realtime_factor']}x tiempo real), {len(report['reps'])} repeticiones -> {args.output}")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+# Motor YOLO-Pose compartido entre sesiones
+# Los pesos se cargan una sola vez; el seguimiento de personas vive en cada sesión
+
+import threading
+
+
+class PoseEngine:
+    """
+    Envoltorio de YOLO-Pose para uso concurrente.
+
+    Solo expone detección sin estado (`predict`): el tracker interno de
+    ultralytics (`track(persist=True)`) es global al modelo y mezclaría a los
+    usuarios. Cada sesión asocia sus detecciones con su propio `PoseTracker`.
+    """
+
+    def __init__(self, weights):
+        self.weights = weights
+        self._model = None
+        self._load_lock = threading.Lock()
+        # El predictor de ultralytics no es seguro entre hilos
+        self._predict_lock = threading.Lock()
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._load_lock:
+                if self._model is None:
+                    from ultralytics import YOLO
+                    self._model = YOLO(self.weights)
+        return self._model
+
+    def load(self):
+        """Carga los pesos de forma anticipada"""
+        return self.model
+
+    def predict(self, source, **kwargs):
+        kwargs.setdefault("verbose", False)
+        model = self.model
+        with self._predict_lock:
+            return model.predict(source, **kwargs)
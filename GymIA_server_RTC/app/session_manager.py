@@ -0,0 +1,207 @@
+# Ciclo de vida de las sesiones WebRTC: registro, timeouts y liberación determinista
+# Cada conexión de /signaling es una sesión dueña de su RTCPeerConnection, sus tracks y su WebSocket
+
+import asyncio
+import itertools
+import sys
+import threading
+import time
+import uuid
+
+from app.metrics import REGISTRY
+
+SESSIONS_CLOSED = REGISTRY.counter(
+    "gymia_sessions_closed_total",
+    "Sesiones cerradas según el motivo (bye, disconnect, idle_timeout, max_duration, connection_failed, admin, shutdown, error)",
+    ["reason"],
+)
+
+
+def _rss_mb():
+    """RSS actual en MB (Linux); en otros sistemas, el máximo alcanzado"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def process_usage():
+    """Memoria e hilos del proceso, para ver si crecen con el tiempo"""
+    rss = _rss_mb()
+    return {"rss_mb": round(rss, 1) if rss is not None else None, "threads": threading.active_count()}
+
+
+class Session:
+    """Recursos de una conexión de señalización; `close()` los libera en orden y una sola vez"""
+
+    def __init__(self, pc, websocket=None):
+        self.id = uuid.uuid4().hex[:8]
+        self.pc = pc
+        self.websocket = websocket
+        self.tracks = []
+        self._track_numbers = itertools.count()
+        self.exercise = None
+        self.created = time.monotonic()
+        self.last_activity = self.created
+        self.close_reason = None
+        self._closing = None
+
+    def touch(self):
+        """Actividad de señalización (oferta, ICE)"""
+        self.last_activity = time.monotonic()
+
+    def track_id(self):
+        """
+        Id nuevo para un track de la sesión (`<sesión>-<n>`): con una
+        renegociación que agrega otro video, cada track tiene su propio estado
+        en el detector, el cache de frames y el controlador.
+        """
+        return f"{self.id}-{next(self._track_numbers)}"
+
+    def add_track(self, track):
+        self.tracks.append(track)
+
+    def idle_seconds(self, now=None):
+        """Tiempo sin mensajes de señalización ni frames de la cámara"""
+        last = self.last_activity
+        for track in self.tracks:
+            last = max(last, getattr(track, "last_input", None) or last)
+        return (now or time.monotonic()) - last
+
+    @property
+    def closed(self):
+        return self._closing is not None
+
+    async def close(self, reason):
+        """Detiene los tracks, cierra el peer connection y el WebSocket; idempotente"""
+        if self._closing is None:
+            self.close_reason = reason
+            self._closing = asyncio.ensure_future(self._release())
+            SESSIONS_CLOSED.labels(reason).inc()
+        await asyncio.shield(self._closing)
+
+    async def _release(self):
+        # Cada paso por separado: un error al cerrar el WebSocket no deja el track sin detener
+        for track in self.tracks:
+            try:
+                track.stop()
+            except Exception:
+                pass
+        try:
+            await self.pc.close()
+        except Exception:
+            pass
+        if self.websocket is not None:
+            try:
+                await self.websocket.close(code=1000, reason=self.close_reason)
+            except Exception:
+                pass  # El cliente ya cerró o el WebSocket nunca llegó a abrirse
+
+    def snapshot(self, now=None):
+        now = now or time.monotonic()
+        return {
+            "id": self.id,
+            "exercise": self.exercise,
+            "age_seconds": round(now - self.created, 1),
+            "idle_seconds": round(self.idle_seconds(now), 1),
+            "connection_state": getattr(self.pc, "connectionState", None),
+            "closing": self.close_reason,
+            "tracks": [track.resources() for track in self.tracks if hasattr(track, "resources")],
+        }
+
+
+class SessionManager:
+    """
+    Registro de todas las sesiones activas.
+
+    Una tarea de fondo revisa cada `check_interval` segundos y cierra las
+    sesiones sin actividad durante `idle_timeout` (cliente que desapareció sin
+    `bye`) o que superaron `max_duration`. Con 0 se desactiva cada límite.
+    """
+
+    def __init__(self, idle_timeout=60.0, max_duration=0.0, check_interval=5.0):
+        self.idle_timeout = idle_timeout
+        self.max_duration = max_duration
+        self.check_interval = check_interval
+        self._sessions = {}
+        self._reaper = None
+
+    def open(self, pc, websocket=None):
+        session = Session(pc, websocket)
+        self._sessions[session.id] = session
+        return session
+
+    def get(self, session_id):
+        return self._sessions.get(session_id)
+
+    def __len__(self):
+        return len(self._sessions)
+
+    async def close(self, session_id, reason):
+        """Cierra y olvida la sesión; False si no existe"""
+        session = self._sessions.get(session_id)
+        if session is None:
+            return False
+        try:
+            await session.close(reason)
+        finally:
+            self._sessions.pop(session_id, None)
+        return True
+
+    async def close_all(self, reason="shutdown"):
+        await asyncio.gather(*[self.close(sid, reason) for sid in list(self._sessions)], return_exceptions=True)
+
+    def expired(self, session, now=None):
+        """Motivo por el que la sesión debe cerrarse, o None"""
+        now = now or time.monotonic()
+        if self.max_duration > 0 and now - session.created >= self.max_duration:
+            return "max_duration"
+        if self.idle_timeout > 0 and session.idle_seconds(now) >= self.idle_timeout:
+            return "idle_timeout"
+        return None
+
+    async def reap(self):
+        """Cierra las sesiones vencidas; devuelve cuántas cerró"""
+        now = time.monotonic()
+        expired = [(sid, reason) for sid, session in list(self._sessions.items())
+                   if (reason := self.expired(session, now))]
+        for session_id, reason in expired:
+            await self.close(session_id, reason)
+        return len(expired)
+
+    def start(self):
+        if self._reaper is None and (self.idle_timeout > 0 or self.max_duration > 0):
+            self._reaper = asyncio.ensure_future(self._reap_forever())
+
+    async def stop(self):
+        if self._reaper is not None:
+            self._reaper.cancel()
+            self._reaper = None
+        await self.close_all("shutdown")
+
+    async def _reap_forever(self):
+        while True:
+            await asyncio.sleep(self.check_interval)
+            try:
+                await self.reap()
+            except Exception as e:  # Una sesión rota no debe detener la revisión de las demás
+                print(f"[SESSIONS] Error al revisar sesiones: {e}")
+
+    def snapshot(self):
+        now = time.monotonic()
+        return {
+            "active": len(self._sessions),
+            "idle_timeout": self.idle_timeout,
+            "max_duration": self.max_duration,
+            "process": process_usage(),
+            "sessions": [session.snapshot(now) for session in list(self._sessions.values())],
+        }
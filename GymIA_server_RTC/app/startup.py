@@ -0,0 +1,131 @@
+# Arranque del servidor: fases cronometradas y calentamiento de modelos en segundo plano
+# El proceso acepta conexiones de inmediato; /health/ready responde 200 solo con los modelos calientes
+
+import contextlib
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+from app.metrics import REGISTRY
+from app.utils.processing import WINDOW_SIZE
+
+WARMUP_RUNS = int(os.environ.get("WARMUP_RUNS", "2"))  # Pasadas de calentamiento por modelo (trazado + JIT)
+FEATURES = 34  # 17 keypoints (x, y) por registro del buffer LSTM
+
+# Frameworks pesados que no deberían cargarse al importar el servidor
+FRAMEWORKS = ("torch", "ultralytics", "tensorflow", "keras", "onnxruntime", "openvino")
+
+PHASE_SECONDS = REGISTRY.gauge(
+    "gymia_startup_phase_seconds",
+    "Duración de cada fase del arranque (import, carga y calentamiento de cada modelo)",
+    ["phase"],
+)
+
+
+class StartupState:
+    """
+    Estado de arranque del proceso: `starting` -> `warming` -> `ready` | `failed`.
+
+    Cada fase se cronometra con `phase(nombre)` y queda en el log, en
+    `snapshot()` (GET /health/ready) y en `gymia_startup_phase_seconds`.
+    """
+
+    def __init__(self):
+        self.created = time.perf_counter()
+        self.status = "starting"
+        self.error = None
+        self.ready_seconds = None
+        self._phases = {}
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self):
+        return self.status == "ready"
+
+    def record(self, name, seconds, error=None):
+        with self._lock:
+            self._phases[name] = {"seconds": round(seconds, 3), "ok": error is None}
+            if error is not None:
+                self._phases[name]["error"] = error
+        PHASE_SECONDS.labels(name).set(round(seconds, 3))
+        print(f"[STARTUP] {name}: {seconds:.2f}s" + (f" ({error})" if error else ""))
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            self.record(name, time.perf_counter() - start, f"{type(e).__name__}: {e}")
+            raise
+        self.record(name, time.perf_counter() - start)
+
+    def imported(self, started, finished):
+        """Fase de import del módulo del servidor; el arranque se cuenta desde `started`"""
+        self.created = min(self.created, started)
+        self.record("import", finished - started)
+
+    def warming(self):
+        self.status = "warming"
+
+    def mark_ready(self):
+        self.ready_seconds = time.perf_counter() - self.created
+        self.status = "ready"
+        print(f"[STARTUP] Listo para recibir sesiones en {self.ready_seconds:.2f}s")
+
+    def mark_failed(self, error):
+        self.error = f"{type(error).__name__}: {error}"
+        self.status = "failed"
+        print(f"[STARTUP] Falló el arranque: {self.error}")
+
+    def snapshot(self):
+        with self._lock:
+            phases = {name: dict(info) for name, info in self._phases.items()}
+        return {
+            "status": self.status,
+            "ready": self.ready,
+            "error": self.error,
+            "uptime_seconds": round(time.perf_counter() - self.created, 3),
+            "ready_seconds": round(self.ready_seconds, 3) if self.ready_seconds is not None else None,
+            "phases": phases,
+            "frameworks_loaded": [name for name in FRAMEWORKS if name in sys.modules],
+        }
+
+
+def warm_pose(engine, runs=WARMUP_RUNS):
+    """Pasadas de YOLO-Pose sobre un frame negro de 640x640 (el tamaño que usa el servidor)"""
+    frame = np.zeros((WINDOW_SIZE[1], WINDOW_SIZE[0], 3), dtype=np.uint8)
+    for _ in range(runs):
+        engine.predict([frame])
+
+
+def warm_lstm(model, timesteps, runs=WARMUP_RUNS):
+    """Pasadas del LSTM sobre una ventana vacía de (1, timesteps, 34)"""
+    window = np.zeros((1, timesteps, FEATURES), dtype=np.float32)
+    for _ in range(runs):
+        model.predict_on_batch(window)
+
+
+def load_and_warm_pose(state, engine):
+    with state.phase("pose_load"):
+        engine.load()
+    with state.phase("pose_warmup"):
+        warm_pose(engine)
+
+
+def load_and_warm_lstm(state, registry, exercise, timesteps):
+    with state.phase(f"lstm_load:{exercise}"):
+        model = registry.get(exercise)
+    with state.phase(f"lstm_warmup:{exercise}"):
+        warm_lstm(model, timesteps)
+
+
+STARTUP = StartupState()
+
+REGISTRY.gauge_callback(
+    "gymia_ready", "1 cuando los modelos están cargados y calientes",
+    lambda: {(): int(STARTUP.ready)},
+)
@@ -0,0 +1,136 @@
+# Buffers de frame preasignados por sesión
+# Decodificación, redimensionado y frame de salida reutilizan la misma memoria en cada frame
+
+import cv2
+import numpy as np
+from av import VideoFrame
+
+from app.metrics import REGISTRY
+
+ALLOCATIONS = REGISTRY.counter(
+    "gymia_frame_buffer_allocations_total",
+    "Buffers de frame asignados (solo al iniciar la sesión o cambiar la resolución)",
+    ["buffer"],
+)
+FALLBACKS = REGISTRY.counter(
+    "gymia_frame_buffer_fallbacks_total",
+    "Frames que no pudieron usar los buffers preasignados (formato o tamaño no soportado)",
+    ["stage"],
+)
+
+
+def plane_view(plane, width, height, channels=1):
+    """Vista numpy escribible sobre un plano de PyAV, sin el relleno de fin de línea"""
+    data = np.frombuffer(plane, dtype=np.uint8).reshape(-1, plane.line_size)[:height, :width * channels]
+    return data.reshape(height, width, channels) if channels > 1 else data
+
+
+class FrameBuffers:
+    """
+    Memoria de frames de una sesión, asignada una sola vez.
+
+    - `decode()` convierte el frame yuv420p de la cámara a BGR dentro de un
+      buffer reutilizado (o directamente en `dst`).
+    - `output()` entrega el siguiente frame de salida de un anillo de
+      `VideoFrame` preasignados, con una vista numpy sobre su plano: se puede
+      redimensionar y dibujar encima sin copiar después con `from_ndarray`.
+
+    El anillo tiene `ring` frames porque el encoder de aiortc termina con un
+    frame antes de pedir el siguiente; 3 deja margen.
+    """
+
+    def __init__(self, ring=3):
+        self.ring = max(2, int(ring))
+        self._decode_size = None
+        self._i420 = None
+        self._i420_planes = None
+        self._bgr = None
+        self._output_size = None
+        self._outputs = []
+        self._next = 0
+        self._current = None
+        self.zero_copy = self._writable_planes()
+
+    @staticmethod
+    def _writable_planes():
+        """Las versiones antiguas de PyAV exponen los planos como solo lectura"""
+        try:
+            return np.frombuffer(VideoFrame(16, 16, "bgr24").planes[0], dtype=np.uint8).flags.writeable
+        except (TypeError, ValueError):
+            return False
+
+    def _allocate_decode(self, width, height):
+        self._decode_size = (width, height)
+        self._i420 = np.empty((height * 3 // 2, width), dtype=np.uint8)
+        flat = self._i420.reshape(-1)
+        y_size, c_size = width * height, (width // 2) * (height // 2)
+        self._i420_planes = (
+            self._i420[:height],
+            flat[y_size:y_size + c_size].reshape(height // 2, width // 2),
+            flat[y_size + c_size:y_size + 2 * c_size].reshape(height // 2, width // 2),
+        )
+        self._bgr = np.empty((height, width, 3), dtype=np.uint8)
+        ALLOCATIONS.labels("decode").inc()
+
+    @property
+    def nbytes(self):
+        """Memoria reservada por la sesión (buffers de decodificación y anillo de salida)"""
+        total = sum(buf.nbytes for buf in (self._i420, self._bgr) if buf is not None)
+        return total + sum(view.nbytes for _, view in self._outputs)
+
+    def release(self):
+        """Suelta la memoria al cerrar la sesión; se vuelve a asignar si llega otro frame"""
+        self._decode_size = self._i420 = self._i420_planes = self._bgr = None
+        self._output_size = None
+        self._outputs = []
+        self._next = 0
+        self._current = None
+
+    def decode(self, frame, dst=None):
+        """Frame BGR de la cámara en un buffer reutilizado (o en `dst`, del mismo tamaño)"""
+        width, height = frame.width, frame.height
+        if frame.format.name != "yuv420p" or width % 2 or height % 2:
+            FALLBACKS.labels("decode").inc()
+            img = frame.to_ndarray(format="bgr24")
+            if dst is None:
+                return img
+            np.copyto(dst, img)
+            return dst
+
+        if self._decode_size != (width, height):
+            self._allocate_decode(width, height)
+        y, u, v = self._i420_planes
+        np.copyto(y, plane_view(frame.planes[0], width, height))
+        np.copyto(u, plane_view(frame.planes[1], width // 2, height // 2))
+        np.copyto(v, plane_view(frame.planes[2], width // 2, height // 2))
+        out = self._bgr if dst is None else dst
+        cv2.cvtColor(self._i420, cv2.COLOR_YUV2BGR_I420, dst=out)
+        return out
+
+    def output(self, width, height):
+        """Vista BGR (height, width, 3) del próximo frame de salida del anillo"""
+        if self._output_size != (width, height):
+            self._output_size = (width, height)
+            self._outputs = []
+            for _ in range(self.ring):
+                if self.zero_copy:
+                    frame = VideoFrame(width, height, "bgr24")
+                    self._outputs.append((frame, plane_view(frame.planes[0], width, height, 3)))
+                else:
+                    self._outputs.append((None, np.empty((height, width, 3), dtype=np.uint8)))
+            ALLOCATIONS.labels("output").inc()
+        frame, view = self._outputs[self._next]
+        self._next = (self._next + 1) % self.ring
+        self._current = frame
+        return view
+
+    def video_frame(self, view, pts, time_base):
+        """VideoFrame listo para enviar con la imagen de `view` y el pts del frame original"""
+        frame = self._current
+        if frame is None:
+            FALLBACKS.labels("output").inc()
+            frame = VideoFrame.from_ndarray(view, format="bgr24")
+        frame.pts = pts
+        if time_base is not None:
+            frame.time_base = time_base
+        return frame
@@ -0,0 +1,86 @@
+import collections
+import threading
+import time
+
+import cv2
+import numpy as np
+
+SIGNATURE_SIZE = (32, 32)
+MOTION_BLOCK = 4  # Lado en píxeles de la miniatura de cada bloque comparado (8x8 bloques)
+
+
+class FrameCache:
+    """
+    Cache de resultados de detección por sesión.
+
+    Una entrada solo se reutiliza para la misma sesión y si el frame nuevo es
+    casi idéntico al que la generó: se compara una miniatura 32x32 en grises
+    por bloques de 4x4 y la energía de movimiento es la diferencia absoluta
+    media del bloque que más cambió (una persona chica en el cuadro o un
+    movimiento lento no se diluyen en el resto de la escena). `max_age` acota cuánto
+    puede reutilizarse un resultado aunque la escena siga quieta. El número de
+    sesiones es limitado (LRU) y `evict()` libera la entrada al cerrar la sesión.
+    """
+
+    def __init__(self, max_sessions=64, max_age=1.0, motion_threshold=2.0):
+        self.max_sessions = max_sessions
+        self.max_age = max_age
+        self.motion_threshold = motion_threshold
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def signature(self, frame):
+        """Miniatura en grises usada como señal barata de similitud"""
+        # Submuestreo previo para que el costo no dependa de la resolución
+        step = max(1, min(frame.shape[0], frame.shape[1]) // (SIGNATURE_SIZE[0] * 4))
+        small = frame[::step, ::step]
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.resize(small, SIGNATURE_SIZE, interpolation=cv2.INTER_AREA).astype(np.int16)
+
+    def motion(self, a, b):
+        """Diferencia absoluta media del bloque de la miniatura que más cambió"""
+        h, w = a.shape
+        diff = np.abs(a - b).reshape(h // MOTION_BLOCK, MOTION_BLOCK, w // MOTION_BLOCK, MOTION_BLOCK)
+        return float(diff.mean(axis=(1, 3)).max())
+
+    def get(self, session_id, signature):
+        """Devuelve (hit, resultado) para la sesión y el frame indicados"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if (entry is not None and now - entry[0] <= self.max_age
+                    and self.motion(signature, entry[1]) <= self.motion_threshold):
+                self._entries.move_to_end(session_id)
+                self.hits += 1
+                return True, entry[2]
+            self.misses += 1
+            return False, None
+
+    def put(self, session_id, signature, result):
+        with self._lock:
+            self._entries[session_id] = (time.monotonic(), signature, result)
+            self._entries.move_to_end(session_id)
+            while len(self._entries) > self.max_sessions:
+                self._entries.popitem(last=False)
+
+    def evict(self, session_id):
+        with self._lock:
+            self._entries.pop(session_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "sessions": len(self._entries),
+                "max_sessions": self.max_sessions,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
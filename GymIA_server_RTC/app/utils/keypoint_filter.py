@@ -0,0 +1,63 @@
+import numpy as np
+
+from app.utils.processing import WINDOW_SIZE
+
+
+class KeypointExtrapolator:
+    """
+    Estimador de keypoints de velocidad constante para los frames sin detección.
+
+    En cada detección se guarda la posición medida (sin suavizar, igual que en
+    los datos de entrenamiento) y se actualiza la velocidad de cada keypoint con
+    una media exponencial de la diferencia entre detecciones. En los frames
+    saltados `predict(t)` extrapola la posición, limitado a `max_horizon`
+    segundos. Los keypoints no detectados (0,0) se mantienen en cero.
+    """
+
+    def __init__(self, beta=0.5, max_horizon=0.5, window_size=WINDOW_SIZE):
+        self.beta = beta
+        self.max_horizon = max_horizon
+        self.window = np.asarray(window_size, dtype=np.float32)
+        self.reset()
+
+    def reset(self):
+        self.position = None
+        self.velocity = None
+        self.valid = None
+        self.time = None
+
+    def update(self, kps_orig, t):
+        """Registra una detección real tomada en el instante `t` (segundos)"""
+        kps = np.asarray(kps_orig, dtype=np.float32).reshape(-1, 2)
+        valid = np.any(kps != 0, axis=1)
+        if self.position is None or len(kps) != len(self.position) or t <= self.time:
+            self.position = kps.copy()
+            self.velocity = np.zeros_like(kps)
+            self.valid = valid
+            self.time = t
+            return
+
+        dt = t - self.time
+        both = valid & self.valid
+        observed = np.zeros_like(kps)
+        observed[both] = (kps[both] - self.position[both]) / dt
+        self.velocity[both] += self.beta * (observed[both] - self.velocity[both])
+        # Keypoints que aparecen o desaparecen no tienen velocidad fiable
+        self.velocity[~both] = 0.0
+        self.position = kps.copy()
+        self.valid = valid
+        self.time = t
+
+    def predict(self, t):
+        """
+        Estima los keypoints en el instante `t`.
+        Devuelve (kps_flat normalizado, kps_orig en píxeles) o None sin detecciones previas.
+        """
+        if self.position is None:
+            return None
+        dt = min(max(t - self.time, 0.0), self.max_horizon)
+        kps = self.position + self.velocity * dt
+        kps = np.clip(kps, 0, self.window)
+        kps[~self.valid] = 0.0
+        kps_flat = (kps / self.window).flatten()
+        return kps_flat, kps
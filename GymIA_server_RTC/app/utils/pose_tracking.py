@@ -0,0 +1,99 @@
+import numpy as np
+
+
+def box_areas(boxes):
+    """Área de cada caja xyxy"""
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+    return np.clip(boxes[:, 2] - boxes[:, 0], 0, None) * np.clip(boxes[:, 3] - boxes[:, 1], 0, None)
+
+
+def box_iou(box, boxes):
+    """IoU entre una caja xyxy y un arreglo de cajas xyxy"""
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+    x1 = np.maximum(box[0], boxes[:, 0])
+    y1 = np.maximum(box[1], boxes[:, 1])
+    x2 = np.minimum(box[2], boxes[:, 2])
+    y2 = np.minimum(box[3], boxes[:, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    union = box_areas([box])[0] + box_areas(boxes) - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-6), 0.0)
+
+
+def center_distances(box, boxes):
+    """Distancia entre el centro de una caja xyxy y los de un arreglo de cajas, en diagonales de `box`"""
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+    center = (np.asarray(box[:2]) + np.asarray(box[2:4])) / 2
+    centers = (boxes[:, :2] + boxes[:, 2:]) / 2
+    diagonal = max(float(np.hypot(box[2] - box[0], box[3] - box[1])), 1e-6)
+    return np.hypot(*(centers - center).T) / diagonal
+
+
+def largest_box_index(boxes):
+    """Índice de la caja más grande, o None si no hay cajas"""
+    areas = box_areas(boxes)
+    if len(areas) == 0 or areas.max() <= 0:
+        return None
+    return int(np.argmax(areas))
+
+
+class PoseTracker:
+    """
+    Asociación ligera por sesión para la detección sin estado.
+    Sigue a la misma persona entre detecciones por IoU con la última caja
+    elegida. Si el IoU no alcanza (una repetición rápida o frames salteados),
+    una única caja se vuelve a tomar y, con varias, la de centro más cercano
+    dentro de `center_gate` diagonales de la última caja. Si la pierde durante
+    `max_misses` detecciones vuelve a elegir la caja más grande. No comparte
+    estado con otras sesiones.
+    """
+
+    def __init__(self, iou_threshold=0.3, max_misses=10, center_gate=0.5):
+        self.iou_threshold = iou_threshold
+        self.max_misses = max_misses
+        self.center_gate = center_gate
+        self.last_box = None
+        self.misses = 0
+
+    def select(self, boxes):
+        """Devuelve el índice de la persona seguida dentro de `boxes` (xyxy)"""
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        if len(boxes) == 0:
+            self._miss()
+            return None
+
+        idx = None
+        if self.last_box is not None:
+            ious = box_iou(self.last_box, boxes)
+            best = int(np.argmax(ious))
+            if ious[best] >= self.iou_threshold:
+                idx = best
+            elif len(boxes) == 1:
+                idx = 0  # Una sola persona en cuadro: es la misma que se movió rápido
+            else:
+                distances = center_distances(self.last_box, boxes)
+                nearest = int(np.argmin(distances))
+                if distances[nearest] <= self.center_gate:
+                    idx = nearest
+            if idx is None:
+                self._miss()
+                if self.last_box is not None:
+                    # Aún dentro de la tolerancia: no saltar a otra persona
+                    return None
+
+        if idx is None:
+            idx = largest_box_index(boxes)
+            if idx is None:
+                return None
+
+        self.last_box = boxes[idx].copy()
+        self.misses = 0
+        return idx
+
+    def _miss(self):
+        self.misses += 1
+        if self.misses > self.max_misses:
+            self.reset()
+
+    def reset(self):
+        self.last_box = None
+        self.misses = 0
@@ -1,26 +1,47 @@
 import cv2
 import numpy as np
+from app.utils.pose_tracking import largest_box_index
 
 WINDOW_SIZE = (640, 640)
 
-def preprocess_frame(frame, yolo_model):
+def preprocess_frame(frame, yolo_model, tracker=None):
     img = cv2.resize(frame, WINDOW_SIZE)
-    res = yolo_model.track(img, persist=True)
-    if not res or not res[0].boxes:
+    if tracker is None:
+        res = yolo_model.track(img, persist=True)
+    else:
+        # Detección sin estado: la asociación entre frames la hace el tracker de la sesión
+        res = yolo_model.predict(img, verbose=False)
+    if not res:
         return None
+    return extract_pose(res[0], tracker)
 
-    best_idx, best_area = None, 0
-    for i, box in enumerate(res[0].boxes.xyxy):
-        x1, y1, x2, y2 = box.cpu().numpy()
-        area = (x2 - x1) * (y2 - y1)
-        if area > best_area:
-            best_idx, best_area = i, area
+
+def _numpy(x):
+    """Tensor de ultralytics (CPU/GPU) o arreglo numpy de un backend exportado -> numpy"""
+    return x.cpu().numpy() if hasattr(x, "cpu") else np.asarray(x)
+
+
+def extract_pose(result, tracker=None, render=True):
+    """
+    Elige a la persona de un resultado de YOLO-Pose y devuelve (kps_flat, kps_orig, vis).
+    Con render=False no se genera `vis` (None): el llamador dibuja su propio overlay.
+    """
+    if not result.boxes:
+        if tracker is not None:
+            tracker.select([])  # Cuenta la detección perdida
+        return None
+
+    boxes = _numpy(result.boxes.xyxy)
+    if tracker is None:
+        best_idx = largest_box_index(boxes)
+    else:
+        best_idx = tracker.select(boxes)
     if best_idx is None:
         return None
 
-    kps_flat = res[0].keypoints[best_idx].xyn.cpu().numpy().flatten()
-    kps_orig = res[0].keypoints[best_idx].xy.data.cpu().numpy()[0]
-    vis = res[0].plot()
+    kps_flat = _numpy(result.keypoints.xyn)[best_idx].flatten()
+    kps_orig = _numpy(result.keypoints.xy)[best_idx]
+    vis = result.plot() if render else None
     return kps_flat, kps_orig, vis
 
 
@@ -1,51 +1,68 @@
 import cv2
 import numpy as np
-import time
+import os
+from app.utils.frame_cache import FrameCache
+from app.utils.pose_tracking import largest_box_index
+from app.utils.processing import _numpy
 
 WINDOW_SIZE = (640, 640)
 
-# Cache para optimizar rendimiento
-_last_keypoints = None
-_last_vis = None
-_cache_timestamp = 0
-CACHE_DURATION = 0.1  # 100ms cache
+# Cache por sesión: solo se reutiliza un resultado si el frame apenas cambió
+CACHE_MAX_SESSIONS = int(os.environ.get("CACHE_MAX_SESSIONS", "64"))
+CACHE_MAX_AGE = float(os.environ.get("CACHE_MAX_AGE", "1.0"))  # Segundos máximos de reutilización
+CACHE_MOTION_THRESHOLD = float(os.environ.get("CACHE_MOTION_THRESHOLD", "2.0"))  # Diferencia media de grises (0-255) del bloque que más cambió
+FRAME_CACHE = FrameCache(
+    max_sessions=CACHE_MAX_SESSIONS,
+    max_age=CACHE_MAX_AGE,
+    motion_threshold=CACHE_MOTION_THRESHOLD,
+)
 
-def preprocess_frame(frame, yolo_model, use_cache=True):
+def preprocess_frame(frame, yolo_model, use_cache=True, tracker=None, session_id=None):
     """
-    Versión optimizada del preprocesamiento con cache opcional
+    Versión optimizada del preprocesamiento con cache opcional.
+    Con `tracker` (PoseTracker de la sesión) se usa detección sin estado y
+    la persona se asocia por sesión en lugar del tracker global de YOLO.
+    El cache solo se usa con `session_id`: nunca se comparten resultados entre sesiones.
     """
-    global _last_keypoints, _last_vis, _cache_timestamp
-    
-    # Si hay cache válido y está habilitado, usarlo
-    if use_cache and _last_keypoints is not None and time.time() - _cache_timestamp < CACHE_DURATION:
-        return _last_keypoints
-    
+    use_cache = use_cache and session_id is not None
+    if use_cache:
+        signature = FRAME_CACHE.signature(frame)
+        hit, cached = FRAME_CACHE.get(session_id, signature)
+        if hit:
+            return cached
+
     img = cv2.resize(frame, WINDOW_SIZE)
-    res = yolo_model.track(img, persist=True)
+    if tracker is None:
+        res = yolo_model.track(img, persist=True)
+    else:
+        # Detección sin estado: la asociación entre frames la hace el tracker de la sesión
+        res = yolo_model.predict(img, verbose=False)
     
     if not res or not res[0].boxes:
+        if use_cache:
+            FRAME_CACHE.put(session_id, signature, None)
         return None
 
-    best_idx, best_area = None, 0
-    for i, box in enumerate(res[0].boxes.xyxy):
-        x1, y1, x2, y2 = box.cpu().numpy()
-        area = (x2 - x1) * (y2 - y1)
-        if area > best_area:
-            best_idx, best_area = i, area
-            
+    boxes = _numpy(res[0].boxes.xyxy)
+    if tracker is None:
+        best_idx = largest_box_index(boxes)
+    else:
+        best_idx = tracker.select(boxes)
+
     if best_idx is None:
+        if use_cache:
+            FRAME_CACHE.put(session_id, signature, None)
         return None
 
-    kps_flat = res[0].keypoints[best_idx].xyn.cpu().numpy().flatten()
-    kps_orig = res[0].keypoints[best_idx].xy.data.cpu().numpy()[0]
+    kps_flat = _numpy(res[0].keypoints.xyn)[best_idx].flatten()
+    kps_orig = _numpy(res[0].keypoints.xy)[best_idx]
     vis = res[0].plot()
     
     result = (kps_flat, kps_orig, vis)
     
-    # Actualizar cache
+    # Actualizar cache de la sesión
     if use_cache:
-        _last_keypoints = result
-        _cache_timestamp = time.time()
+        FRAME_CACHE.put(session_id, signature, result)
     
     return result
 
@@ -175,9 +192,9 @@ def draw_skeleton_optimized(frame, joints, interest, color, exercise=None):
 
 
 # Función de utilidad para limpiar cache si es necesario
-def clear_cache():
-    """Limpia el cache de preprocessing"""
-    global _last_keypoints, _last_vis, _cache_timestamp
-    _last_keypoints = None
-    _last_vis = None
-    _cache_timestamp = 0
+def clear_cache(session_id=None):
+    """Limpia el cache de preprocessing (de una sesión o completo)"""
+    if session_id is None:
+        FRAME_CACHE.clear()
+    else:
+        FRAME_CACHE.evict(session_id)
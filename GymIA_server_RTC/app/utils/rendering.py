@@ -0,0 +1,52 @@
+import cv2
+import numpy as np
+
+# Conexiones del esqueleto COCO-17 (las mismas que dibuja ultralytics)
+SKELETON_EDGES = np.array([
+    [15, 13], [13, 11], [16, 14], [14, 12], [11, 12],
+    [5, 11], [6, 12], [5, 6], [5, 7], [6, 8], [7, 9],
+    [8, 10], [1, 2], [0, 1], [0, 2], [1, 3], [2, 4],
+    [3, 5], [4, 6],
+], dtype=np.int32)
+
+BASE_COLOR = (255, 0, 255)  # Morado en BGR
+
+
+def valid_keypoints(joints, shape, scale=(1.0, 1.0)):
+    """
+    Escala los keypoints al tamaño del frame y devuelve (puntos int32, máscara de válidos).
+    Un punto es válido si no es (0,0) y cae dentro del frame.
+    """
+    pts = np.asarray(joints, dtype=np.float32).reshape(-1, 2)
+    mask = np.any(pts != 0, axis=1)
+    pts = pts * np.asarray(scale, dtype=np.float32)
+    h, w = shape[:2]
+    mask &= (pts[:, 0] >= 0) & (pts[:, 0] <= w) & (pts[:, 1] >= 0) & (pts[:, 1] <= h)
+    return pts.astype(np.int32), mask
+
+
+def draw_pose_overlay(frame, joints, interest, color, scale=(1.0, 1.0), radius=8, thickness=2):
+    """
+    Dibuja solo el esqueleto sobre el frame actual de la cámara (in-place).
+    Huesos en una sola llamada a cv2.polylines, todos los puntos en morado y
+    los puntos de interés en el color de la predicción (verde/rojo).
+    `scale` convierte coordenadas de la ventana de detección al frame de salida.
+    """
+    if joints is None or len(joints) == 0:
+        return frame
+    pts, mask = valid_keypoints(joints, frame.shape, scale)
+    radius = max(2, int(round(radius * min(scale))))
+
+    edges = SKELETON_EDGES[(SKELETON_EDGES < len(pts)).all(axis=1)]
+    edges = edges[mask[edges[:, 0]] & mask[edges[:, 1]]]
+    if len(edges):
+        cv2.polylines(frame, pts[edges], False, BASE_COLOR, thickness)
+
+    for x, y in pts[mask]:
+        cv2.circle(frame, (int(x), int(y)), radius, BASE_COLOR, -1)
+
+    interest = np.asarray(interest, dtype=np.int32)
+    interest = interest[(interest >= 0) & (interest < len(pts))]
+    for x, y in pts[interest[mask[interest]]]:
+        cv2.circle(frame, (int(x), int(y)), radius, color, -1)
+    return frame
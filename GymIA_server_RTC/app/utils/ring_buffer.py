@@ -0,0 +1,55 @@
+import numpy as np
+
+
+class KeypointRingBuffer:
+    """
+    Buffer circular preasignado (float32) para la ventana de keypoints del LSTM.
+
+    Cada fila se escribe dos veces (posición i e i + timesteps), de modo que las
+    últimas `timesteps` filas siempre forman un bloque contiguo: `window()`
+    devuelve una vista sin copiar y `append()` no reserva memoria.
+    Se usa como la deque que reemplaza: `append()` y `len()`.
+    """
+
+    def __init__(self, timesteps, features=34):
+        self.timesteps = int(timesteps)
+        self.features = int(features)
+        self._data = np.zeros((2 * self.timesteps, self.features), dtype=np.float32)
+        self._pos = 0
+        self._count = 0
+
+    def append(self, values):
+        row = self._pos
+        self._data[row] = values
+        self._data[row + self.timesteps] = values
+        self._pos = (row + 1) % self.timesteps
+        if self._count < self.timesteps:
+            self._count += 1
+
+    def __len__(self):
+        return self._count
+
+    def is_full(self):
+        return self._count == self.timesteps
+
+    def window(self):
+        """Vista contigua (len, features) con las filas de la más antigua a la más reciente"""
+        start = (self._pos - self._count) % self.timesteps
+        return self._data[start:start + self._count]
+
+    def write_to(self, out):
+        """Copia la ventana directamente en `out` (p. ej. una fila de un lote compartido)"""
+        np.copyto(out, self.window())
+        return out
+
+    def clear(self):
+        self._pos = 0
+        self._count = 0
+
+    @property
+    def shape(self):
+        return (self._count, self.features)
+
+    @property
+    def nbytes(self):
+        return self._data.nbytes
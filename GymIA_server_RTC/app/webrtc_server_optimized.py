@@ -1,93 +1,49 @@
 # Servidor WebRTC optimizado con FastAPI y aiortc
 # Procesa video en tiempo real con mejoras de rendimiento
 
+import time
+IMPORT_STARTED = time.perf_counter()  # Fase "import" del arranque (ver app/startup.py)
+
 import asyncio
 import json
 import cv2
 import numpy as np
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
-from fastapi.responses import HTMLResponse
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, UploadFile, File
+from fastapi.responses import HTMLResponse, JSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.websockets import WebSocketState
 from aiortc import RTCPeerConnection, RTCSessionDescription, VideoStreamTrack, RTCIceCandidate
 from aiortc.contrib.media import MediaBlackhole, MediaRecorder
-from av import VideoFrame
 import logging
-from collections import deque
-from ultralytics import YOLO
-from keras.models import load_model
-from app.utils.processing import preprocess_frame, calculate_angle, draw_skeleton
+from app.utils.processing import WINDOW_SIZE
+from app.utils.rendering import draw_pose_overlay
+from app.utils.keypoint_filter import KeypointExtrapolator
+from app.utils.ring_buffer import KeypointRingBuffer
+from app.utils.frame_buffers import FrameBuffers
+from app.exercises import load_exercise_config, calculate_exercise_state
+from app.lstm_inference import LSTMBatchEngine
+from app.offline_analysis import analyze_video
+from app.model_registry import ModelRegistry
+from app.inference_backends import make_pose_engine, make_lstm_loader, resolve_backend, MODEL_VARIANTS
+from app.detection_scheduler import DetectionScheduler, STALE
+from app.worker_pool import WorkerPool, WorkerError
+from app.frame_controller import AdaptiveFrameController, CpuLoadMonitor, CONTROLLERS
+from app.utils.pose_tracking import PoseTracker
+from app.utils.processing_optimized import FRAME_CACHE
+from app.metrics import REGISTRY, STAGE_SECONDS, FRAMES, INPUT_DROPPED, FRAME_LATENCY, CONTENT_TYPE
+from app.startup import STARTUP, load_and_warm_pose, load_and_warm_lstm
+from app.session_manager import SessionManager
 import os
 import concurrent.futures
-import time
+import functools
+import shutil
+import tempfile
+import uuid
+import weakref
 
-# --- Configuración de ejercicios y modelos ---
-def load_exercise_config():
-    return {
-        "peso_muerto": {
-            "model_path": "models/lstm4-model4pm.h5",
-            "timesteps": 30,
-            "angle_joints": [5, 11, 13],
-            "angle_thresholds": {"abajo": 140, "arriba": 175},
-            "class_labels": [
-                "columna_incorrectos",
-                "columna_correctos",
-                "extension_incorrectas",
-                "extension_correctas"
-            ],
-            "error_msgs": {
-                "columna_incorrectos": (
-                    "error: columna incorrecta",
-                    "correccion: espalda neutra durante el descenso y el levantamiento"
-                ),
-                "columna_correctos": (
-                    "correcto: columna correcta",
-                    "buena postura de la espalda"
-                ),
-                "extension_incorrectas": (
-                    "error: super extension o extension incompleta",
-                    "correccion: hombros alineados al nivel de la cadera"
-                ),
-                "extension_correctas": (
-                    "correcto: extension correcta",
-                    "buena postura en la extension"
-                )
-            }
-        },
-        "sentadilla": {
-            "model_path": "models/lstm5-model5sen.h5",
-            "timesteps": 60,
-            "angle_joints": [5, 11, 13, 6, 12, 14],
-            "angle_thresholds": {"abajo": 90, "arriba": 160},
-            "class_labels": [
-                "caderas_incorrectos",
-                "caderas_correctos",
-                "rodillas_incorrectos",
-                "rodillas_correctos"
-            ],
-            "error_msgs": {
-                "caderas_incorrectos": (
-                    "error: posicion incorrecta de las caderas",
-                    "correccion: baja y sube las caderas en forma recta"
-                ),
-                "caderas_correctos": (
-                    "correcto: posicion correcta de las caderas",
-                    "Buena tecnica"
-                ),
-                "rodillas_incorrectos": (
-                    "error: rodillas hacia adentro",
-                    "correccion: manten las rodillas ligeramente hacia afuera"
-                ),
-                "rodillas_correctos": (
-                    "correcto: rodillas correctas",
-                    "Buena posicion de las rodillas"
-                )
-            }
-        }
-    }
-
-# Carga global de YOLO-Pose
-YOLO_MODEL = YOLO("models/yolo11n-pose.pt")
+# YOLO-Pose global: pesos compartidos, seguimiento de personas por sesión
+# INFERENCE_BACKEND elige PyTorch/Keras (native) o los modelos exportados (onnx, openvino)
+POSE_ENGINE = make_pose_engine("models/yolo11n-pose.pt")
 EXERCISES = load_exercise_config()
 DEFAULT_EXERCISE = os.environ.get("GYMIA_EXERCISE", "peso_muerto")
 
@@ -95,6 +51,123 @@ DEFAULT_EXERCISE = os.environ.get("GYMIA_EXERCISE", "peso_muerto")
 DEBUG_MODE = os.environ.get("DEBUG_MODE", "false").lower() == "true"
 DETECTION_INTERVAL = int(os.environ.get("DETECTION_INTERVAL", "3"))  # Procesar 1 de cada 3 frames
 PREDICTION_INTERVAL = int(os.environ.get("PREDICTION_INTERVAL", "5"))  # Predecir cada 5 frames cuando buffer lleno
+LSTM_MAX_BATCH = int(os.environ.get("LSTM_MAX_BATCH", "32"))  # Máximo de ventanas por lote LSTM
+LSTM_MAX_WAIT_MS = float(os.environ.get("LSTM_MAX_WAIT_MS", "5"))  # Espera máxima para completar un lote
+TARGET_FPS = float(os.environ.get("TARGET_FPS", "20"))  # FPS objetivo del track de salida
+ADAPTIVE_INTERVAL = os.environ.get("ADAPTIVE_INTERVAL", "true").lower() == "true"  # Ajustar DETECTION_INTERVAL en runtime
+MIN_DETECTION_INTERVAL = int(os.environ.get("MIN_DETECTION_INTERVAL", "1"))
+MAX_DETECTION_INTERVAL = int(os.environ.get("MAX_DETECTION_INTERVAL", "8"))
+RENDER_NATIVE_RESOLUTION = os.environ.get("RENDER_NATIVE_RESOLUTION", "false").lower() == "true"  # Salida a resolución de la cámara
+INTERPOLATE_KEYPOINTS = os.environ.get("INTERPOLATE_KEYPOINTS", "true").lower() == "true"  # Estimar keypoints en frames saltados
+LSTM_SAMPLE_FPS = float(os.environ.get("LSTM_SAMPLE_FPS", "0"))  # FPS de muestreo del buffer LSTM (0 = todos los frames)
+DETECTION_MAX_BATCH = int(os.environ.get("DETECTION_MAX_BATCH", "8"))  # Máximo de frames por lote YOLO
+DETECTION_MAX_WAIT_MS = float(os.environ.get("DETECTION_MAX_WAIT_MS", "10"))  # Espera máxima para completar un lote
+DETECTION_WORKERS = int(os.environ.get("DETECTION_WORKERS", "1"))  # Hilos fijos de inferencia YOLO
+LATEST_FRAME_ONLY = os.environ.get("LATEST_FRAME_ONLY", "true").lower() == "true"  # Procesar siempre el frame más reciente
+PRELOAD_MODELS = os.environ.get("PRELOAD_MODELS", "true").lower() == "true"  # Cargar LSTMs al arrancar
+WORKER_PROCESSES = int(os.environ.get("WORKER_PROCESSES", "0"))  # Procesos de inferencia (0 = todo en este proceso)
+WORKER_SLOTS = int(os.environ.get("WORKER_SLOTS", "16"))  # Frames en vuelo por worker (memoria compartida)
+WORKER_THREADS = int(os.environ.get("WORKER_THREADS", "0"))  # Hilos de PyTorch por worker (0 = núcleos / workers)
+SESSION_IDLE_TIMEOUT = float(os.environ.get("SESSION_IDLE_TIMEOUT", "60"))  # Segundos sin frames ni señalización antes de cerrar (0 = sin límite)
+SESSION_MAX_DURATION = float(os.environ.get("SESSION_MAX_DURATION", "0"))  # Duración máxima de una sesión en segundos (0 = sin límite)
+SESSION_CHECK_INTERVAL = float(os.environ.get("SESSION_CHECK_INTERVAL", "5"))  # Cada cuántos segundos se revisan los timeouts
+
+# --- Detección YOLO-Pose por lotes entre sesiones ---
+# Un número fijo de hilos de inferencia, en lugar de un pool por conexión
+DETECTION_SCHEDULER = DetectionScheduler(
+    POSE_ENGINE,
+    max_batch=DETECTION_MAX_BATCH,
+    max_wait=DETECTION_MAX_WAIT_MS / 1000.0,
+    workers=DETECTION_WORKERS,
+    render=False,  # El overlay se dibuja en cada frame con draw_pose_overlay
+)
+
+# Los análisis offline se ejecutan de a uno para no quitarle CPU a las sesiones en vivo
+ANALYSIS_EXECUTOR = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="offline")
+# YOLO-Pose propio del análisis offline (se carga en el primer /analyze): un video subido no
+# retiene el lock de detección de las sesiones en vivo. Con WORKER_PROCESSES se usa el pool.
+ANALYSIS_POSE_ENGINE = make_pose_engine(POSE_ENGINE.weights) if WORKER_PROCESSES <= 0 else None
+
+# Carga de CPU compartida por los controladores de salto de frames
+CPU_MONITOR = CpuLoadMonitor()
+
+# --- Inferencia LSTM compartida entre sesiones ---
+# Un único modelo por ejercicio para todo el proceso (no uno por conexión)
+# MODEL_VARIANTS elige la variante cuantizada (int8/fp16) de cada ejercicio
+MODEL_REGISTRY = ModelRegistry(EXERCISES, loader=make_lstm_loader(), variants=MODEL_VARIANTS)
+
+# Un único hilo ejecuta todas las pasadas de Keras fuera del event loop
+LSTM_EXECUTOR = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="lstm")
+LSTM_ENGINE = LSTMBatchEngine(
+    MODEL_REGISTRY.get,
+    LSTM_EXECUTOR,
+    max_batch=LSTM_MAX_BATCH,
+    max_wait=LSTM_MAX_WAIT_MS / 1000.0,
+)
+
+# --- Sesiones WebRTC (GET /sessions) ---
+# Cada conexión de señalización se registra aquí y se cierra siempre por SESSIONS.close()
+SESSIONS = SessionManager(
+    idle_timeout=SESSION_IDLE_TIMEOUT,
+    max_duration=SESSION_MAX_DURATION,
+    check_interval=SESSION_CHECK_INTERVAL,
+)
+
+# --- Métricas (GET /metrics) ---
+# Sesiones activas: se liberan solas si un track se pierde sin llamar a stop()
+ACTIVE_TRACKS = weakref.WeakValueDictionary()
+
+DECODE_SECONDS = STAGE_SECONDS.labels("decode")
+RESIZE_SECONDS = STAGE_SECONDS.labels("resize")
+STATE_SECONDS = STAGE_SECONDS.labels("exercise_state")
+DRAW_SECONDS = STAGE_SECONDS.labels("draw")
+ENCODE_SECONDS = STAGE_SECONDS.labels("encode")
+FRAMES_DETECTED = FRAMES.labels("detected")
+FRAMES_SKIPPED = FRAMES.labels("skipped")
+FRAMES_CACHED = FRAMES.labels("cached")
+FRAMES_DROPPED = FRAMES.labels("dropped")
+
+def _queue_depths():
+    depths = {
+        ("detection", ""): DETECTION_SCHEDULER.pending(),
+        ("lstm_executor", ""): LSTM_EXECUTOR._work_queue.qsize(),
+        ("analysis_executor", ""): ANALYSIS_EXECUTOR._work_queue.qsize(),
+    }
+    for exercise, depth in LSTM_ENGINE.queue_depths().items():
+        depths[("lstm_batch", exercise)] = depth
+    if WORKER_POOL is not None:
+        depths[("worker_pool", "")] = WORKER_POOL.pending()
+    return depths
+
+REGISTRY.gauge_callback(
+    "gymia_active_sessions", "Sesiones de video activas",
+    lambda: {(): len(ACTIVE_TRACKS)},
+)
+REGISTRY.gauge_callback(
+    "gymia_buffer_fill_ratio", "Llenado del buffer LSTM de cada sesión (1 = listo para predecir)",
+    lambda: {(sid, track.exercise): len(track.buffer) / track.cfg["timesteps"] for sid, track in list(ACTIVE_TRACKS.items())},
+    ["session", "exercise"],
+)
+REGISTRY.gauge_callback(
+    "gymia_queue_depth", "Trabajo pendiente en cada cola o executor",
+    _queue_depths,
+    ["queue", "exercise"],
+)
+
+# --- Pool de procesos de inferencia (WORKER_PROCESSES > 0) ---
+# Este proceso queda para señalización, decodificación, dibujo y codificación;
+# cada worker tiene su propio YOLO-Pose y sus LSTM
+WORKER_POOL = None
+if WORKER_PROCESSES > 0:
+    WORKER_POOL = WorkerPool(
+        WORKER_PROCESSES,
+        slots=WORKER_SLOTS,
+        weights=POSE_ENGINE.weights,
+        max_batch=DETECTION_MAX_BATCH,
+        threads_per_worker=WORKER_THREADS or None,
+    )
+DETECTOR = WORKER_POOL or DETECTION_SCHEDULER
+PREDICTOR = WORKER_POOL or LSTM_ENGINE
 
 app = FastAPI()
 
@@ -107,6 +180,180 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Tarea de calentamiento en segundo plano (se guarda la referencia para que no se recolecte)
+WARMUP_TASK = None
+
+async def warm_up_models():
+    """Carga y calienta YOLO-Pose y los LSTM; /health/ready pasa a 200 al terminar"""
+    loop = asyncio.get_running_loop()
+    STARTUP.warming()
+    try:
+        if WORKER_POOL is not None:
+            # Los modelos se cargan y calientan en los workers; este proceso no los necesita
+            with STARTUP.phase("worker_pool"):
+                await loop.run_in_executor(None, WORKER_POOL.start)
+        elif PRELOAD_MODELS:
+            # Cada LSTM se calienta en el hilo de LSTM_EXECUTOR, el mismo que lo usa en las sesiones
+            await asyncio.gather(
+                loop.run_in_executor(None, load_and_warm_pose, STARTUP, POSE_ENGINE),
+                *[
+                    loop.run_in_executor(LSTM_EXECUTOR, load_and_warm_lstm, STARTUP, MODEL_REGISTRY, name, cfg["timesteps"])
+                    for name, cfg in EXERCISES.items()
+                ],
+            )
+    except Exception as e:
+        STARTUP.mark_failed(e)
+        return
+    STARTUP.mark_ready()
+
+@app.on_event("startup")
+async def start_warm_up():
+    """El servidor acepta conexiones enseguida; los modelos se preparan en segundo plano"""
+    global WARMUP_TASK
+    STARTUP.imported(IMPORT_STARTED, MODULE_LOADED)
+    WARMUP_TASK = asyncio.create_task(warm_up_models())
+    SESSIONS.start()
+
+@app.get("/health/live")
+async def liveness():
+    """El proceso responde (no implica que los modelos estén listos)"""
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+async def readiness():
+    """200 con los modelos cargados y calientes; 503 mientras arranca o si falló la carga"""
+    snapshot = STARTUP.snapshot()
+    return JSONResponse(snapshot, status_code=200 if snapshot["ready"] else 503)
+
+@app.on_event("shutdown")
+async def stop_workers():
+    """Cierra las sesiones abiertas, detiene los procesos de inferencia y libera su memoria compartida"""
+    await SESSIONS.stop()
+    if WORKER_POOL is not None:
+        await asyncio.get_running_loop().run_in_executor(None, WORKER_POOL.close)
+
+@app.get("/models")
+async def list_models():
+    """Modelo LSTM activo por ejercicio"""
+    return MODEL_REGISTRY.describe()
+
+@app.post("/models/{exercise}/reload")
+async def reload_model(exercise: str, model_path: str = None):
+    """
+    Reemplaza en caliente el modelo de un ejercicio sin cortar las sesiones activas.
+    Ej: POST /models/peso_muerto/reload?model_path=models/lstm6-model6pm.h5
+    """
+    loop = asyncio.get_running_loop()
+    if WORKER_POOL is not None:
+        if exercise not in EXERCISES:
+            raise HTTPException(status_code=404, detail=f"Ejercicio desconocido: {exercise}")
+        try:
+            # Cada worker carga y valida el archivo por su cuenta
+            infos = await WORKER_POOL.reload(exercise, model_path)
+        except WorkerError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return dict(infos[0], workers=len(infos))
+    try:
+        # Se carga en el executor por defecto para no frenar las predicciones en curso
+        info = await loop.run_in_executor(None, MODEL_REGISTRY.swap, exercise, model_path)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except (FileNotFoundError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if DEBUG_MODE:
+        print(f"[MODELS] {exercise} -> {info['path']} (v{info['version']})")
+    return info
+
+def _analysis_predict(exercise, windows):
+    """Lotes LSTM del análisis en LSTM_EXECUTOR, el único hilo que usa los modelos Keras"""
+    return LSTM_EXECUTOR.submit(lambda: MODEL_REGISTRY.get(exercise).predict_on_batch(windows)).result()
+
+def _run_on_loop(loop, coroutine_function, *args):
+    """Desde el hilo del análisis: ejecuta una corrutina del pool en el event loop y espera el resultado"""
+    return asyncio.run_coroutine_threadsafe(coroutine_function(*args), loop).result()
+
+@app.post("/analyze")
+async def analyze_upload(file: UploadFile = File(...), exercise: str = DEFAULT_EXERCISE):
+    """
+    Analiza un video grabado (p. ej. MP4 del teléfono) y devuelve la línea de
+    tiempo con la clasificación de cada repetición.
+    """
+    if exercise not in EXERCISES:
+        raise HTTPException(status_code=404, detail=f"Ejercicio desconocido: {exercise}")
+    loop = asyncio.get_running_loop()
+    suffix = os.path.splitext(file.filename or "")[1] or ".mp4"
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
+        path = tmp.name
+    try:
+        with open(path, "wb") as out:
+            await loop.run_in_executor(None, shutil.copyfileobj, file.file, out)
+        if WORKER_POOL is not None:
+            # Detección y LSTM en los workers: este proceso no carga YOLO ni Keras
+            session_id = f"offline-{uuid.uuid4().hex[:8]}"
+            detect = functools.partial(_run_on_loop, loop, WORKER_POOL.detect_batch, session_id)
+            predict = functools.partial(_run_on_loop, loop, WORKER_POOL.predict_batch, exercise)
+            analysis = functools.partial(analyze_video, path, exercise, exercises=EXERCISES,
+                                         detect=lambda images, tracker: detect(images), predict=predict)
+        else:
+            analysis = functools.partial(analyze_video, path, exercise, ANALYSIS_POSE_ENGINE, exercises=EXERCISES,
+                                         lstm_batch=LSTM_MAX_BATCH,
+                                         predict=functools.partial(_analysis_predict, exercise))
+        try:
+            report = await loop.run_in_executor(ANALYSIS_EXECUTOR, analysis)
+        finally:
+            if WORKER_POOL is not None:
+                WORKER_POOL.discard(session_id)
+    except (OSError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"No se pudo decodificar el video: {e}")
+    except WorkerError as e:
+        raise HTTPException(status_code=503, detail=f"Procesos de inferencia no disponibles: {e}")
+    finally:
+        os.unlink(path)
+    report["video"] = file.filename
+    return report
+
+@app.get("/stats/detection")
+async def detection_stats():
+    """Tamaños de lote, frames descartados y latencia del planificador YOLO-Pose"""
+    stats = dict(DETECTION_SCHEDULER.snapshot(), cache=FRAME_CACHE.stats(), backend=resolve_backend())
+    if WORKER_POOL is not None:
+        stats["worker_pool"] = WORKER_POOL.snapshot()
+    return stats
+
+@app.get("/controller")
+async def controller_status():
+    """Configuración y decisiones actuales del control adaptativo de frames"""
+    return {
+        "adaptive": ADAPTIVE_INTERVAL,
+        "target_fps": TARGET_FPS,
+        "min_interval": MIN_DETECTION_INTERVAL,
+        "max_interval": MAX_DETECTION_INTERVAL,
+        "cpu_load": round(CPU_MONITOR.load(), 3),
+        "sessions": {session_id: controller.snapshot() for session_id, controller in list(CONTROLLERS.items())},
+    }
+
+@app.get("/metrics")
+async def metrics():
+    """Histogramas por etapa, contadores de frames y gauges en formato Prometheus"""
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+@app.get("/stats/lstm")
+async def lstm_stats():
+    """Profundidad de cola e histogramas de tamaño de lote del motor LSTM"""
+    return LSTM_ENGINE.snapshot()
+
+@app.get("/sessions")
+async def list_sessions():
+    """Sesiones activas con su antigüedad, inactividad y recursos (buffers, frames, reps)"""
+    return SESSIONS.snapshot()
+
+@app.delete("/sessions/{session_id}")
+async def close_session(session_id: str):
+    """Cierra una sesión a pedido (libera su track, peer connection y WebSocket)"""
+    if not await SESSIONS.close(session_id, "admin"):
+        raise HTTPException(status_code=404, detail=f"Sesión desconocida: {session_id}")
+    return {"closed": session_id}
+
 # --- Lógica de señalización WebSocket ---
 
 @app.websocket("/signaling")
@@ -115,6 +362,7 @@ async def websocket_endpoint(websocket: WebSocket):
         print("[SIGNALING] Nueva conexión WebSocket aceptada")
     await websocket.accept()
     pc = RTCPeerConnection()
+    session = SESSIONS.open(pc, websocket)
     video_sender = None
     selected_exercise = DEFAULT_EXERCISE  # Por defecto
     
@@ -123,12 +371,20 @@ async def websocket_endpoint(websocket: WebSocket):
         if DEBUG_MODE:
             print(f"[TRACK] Recibido track: {track.kind}")
         if track.kind == "video":
-            local_video = VideoTransformTrack(track, exercise=selected_exercise, websocket=websocket)
+            local_video = VideoTransformTrack(track, exercise=selected_exercise, websocket=websocket,
+                                             session_id=session.track_id())
             nonlocal video_sender
             video_sender = pc.addTrack(local_video)
+            session.add_track(local_video)
             if DEBUG_MODE:
                 print(f"[TRACK] Track de video procesado agregado al PeerConnection para ejercicio: {selected_exercise}")
 
+    @pc.on("connectionstatechange")
+    async def on_connectionstatechange():
+        # ICE caído sin "bye": no esperar al timeout de inactividad
+        if pc.connectionState in ("failed", "closed"):
+            await SESSIONS.close(session.id, "connection_failed")
+
     @pc.on("icecandidate")
     async def on_icecandidate(candidate):
         if DEBUG_MODE:
@@ -143,13 +399,16 @@ async def websocket_endpoint(websocket: WebSocket):
                 }
             }))
 
+    close_reason = "disconnect"
     try:
         while True:
             data = await websocket.receive_text()
+            session.touch()
             msg = json.loads(data)
             if msg["type"] == "offer":
                 # Leer el ejercicio si viene en el mensaje
                 selected_exercise = msg.get("exercise", DEFAULT_EXERCISE)
+                session.exercise = selected_exercise
                 if DEBUG_MODE:
                     print(f"[SIGNALING] Oferta recibida para ejercicio: {selected_exercise}")
                 offer = RTCSessionDescription(sdp=msg["sdp"], type=msg["type"])
@@ -196,16 +455,19 @@ async def websocket_endpoint(websocket: WebSocket):
             elif msg["type"] == "bye":
                 if DEBUG_MODE:
                     print("[SIGNALING] Conexión cerrada por el cliente")
-                await pc.close()
+                close_reason = "bye"
                 break
     except WebSocketDisconnect:
         if DEBUG_MODE:
             print("[SIGNALING] WebSocket desconectado")
-        await pc.close()
     except Exception as e:
         if DEBUG_MODE:
             print(f"[ERROR] Excepción en signaling: {e}")
-        await pc.close()
+        close_reason = "error"
+    finally:
+        # Tracks, peer connection y WebSocket se liberan juntos, una sola vez
+        # (también si la sesión ya la cerró el timeout o /sessions)
+        await SESSIONS.close(session.id, session.close_reason or close_reason)
 
 # --- Procesamiento de video y anotación optimizado ---
 
@@ -215,14 +477,24 @@ class VideoTransformTrack(VideoStreamTrack):
     """
     kind = "video"
 
-    def __init__(self, track, exercise=DEFAULT_EXERCISE, websocket=None):
+    def __init__(self, track, exercise=DEFAULT_EXERCISE, websocket=None, session_id=None):
         super().__init__()
         self.track = track
+        self.session_id = session_id or uuid.uuid4().hex[:8]
+        self.pose_tracker = PoseTracker()  # Seguimiento de la persona propio de esta sesión
         self.websocket = websocket  # Referencia al WebSocket para enviar feedback
         self.exercise = exercise if exercise in EXERCISES else DEFAULT_EXERCISE
         self.cfg = EXERCISES[self.exercise]
-        self.lstm = load_model(self.cfg["model_path"])
-        self.buffer = deque(maxlen=self.cfg["timesteps"])
+        self.buffer = KeypointRingBuffer(self.cfg["timesteps"])  # Ventana LSTM preasignada, sin copias por frame
+        self.extrapolator = KeypointExtrapolator()  # Keypoints estimados entre detecciones
+        self.frame_buffers = FrameBuffers()  # Decodificación y frames de salida reutilizados
+        self.last_sample_time = None
+        self.latest_frame = None  # (frame, instante de llegada) aún sin procesar
+        self.frame_ready = None
+        self.reader = None
+        self.reader_error = None
+        self.frames_dropped = 0
+        self.last_input = time.monotonic()  # Último frame recibido de la cámara (timeout de inactividad)
         self.thr = self.cfg["angle_thresholds"]
         self.joints = self.cfg["angle_joints"]
         self.state = None
@@ -236,7 +508,14 @@ class VideoTransformTrack(VideoStreamTrack):
         self.last_detection = None
         self.last_prediction_result = None
         self.prediction_count = 0
-        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=2)
+        self.frame_controller = AdaptiveFrameController(
+            target_fps=TARGET_FPS,
+            initial_interval=DETECTION_INTERVAL,
+            min_interval=MIN_DETECTION_INTERVAL,
+            max_interval=MAX_DETECTION_INTERVAL,
+        )
+        CONTROLLERS[self.session_id] = self.frame_controller
+        ACTIVE_TRACKS[self.session_id] = self
         
         # Cache para evitar recálculos
         self.skeleton_color = (0, 0, 255)  # Color por defecto
@@ -245,96 +524,184 @@ class VideoTransformTrack(VideoStreamTrack):
         if DEBUG_MODE:
             print(f"[INIT] VideoTransformTrack inicializado para {self.exercise}")
 
+    def _should_sample(self, frame_time):
+        """Muestrea el buffer LSTM a LSTM_SAMPLE_FPS (frecuencia de los datos de entrenamiento)"""
+        if LSTM_SAMPLE_FPS <= 0:
+            return True
+        if self.last_sample_time is not None and frame_time - self.last_sample_time < 0.999 / LSTM_SAMPLE_FPS:
+            return False
+        self.last_sample_time = frame_time
+        return True
+
     def should_predict(self):
         """Determina si debe ejecutar predicción LSTM basado en intervalos y cambios de estado"""
         return (self.prediction_count % self.prediction_interval == 0 or 
                 self.state != self.last_state)
 
-    def process_frame_cpu_intensive(self, img):
-        """Procesa la parte CPU-intensiva en thread separado"""
-        proc = preprocess_frame(img, YOLO_MODEL)
-        return proc
+    async def _read_frames(self):
+        """Drena el track de entrada sin esperar al procesamiento: solo se conserva el frame más reciente"""
+        try:
+            while True:
+                frame = await self.track.recv()
+                self.last_input = time.monotonic()
+                if self.latest_frame is not None:
+                    self.frames_dropped += 1
+                    INPUT_DROPPED.inc()
+                self.latest_frame = (frame, time.perf_counter())
+                self.frame_ready.set()
+        except Exception as e:  # MediaStreamError cuando el cliente cierra el track
+            self.reader_error = e
+            self.frame_ready.set()
+
+    async def _next_frame(self):
+        """
+        Frame a procesar y su instante de llegada. Si el procesamiento se atrasa,
+        los frames intermedios se descartan en lugar de acumularse en el jitter buffer.
+        """
+        if not LATEST_FRAME_ONLY:
+            frame = await self.track.recv()
+            self.last_input = time.monotonic()
+            return frame, time.perf_counter()
+        if self.reader is None:
+            self.frame_ready = asyncio.Event()
+            self.reader = asyncio.ensure_future(self._read_frames())
+        while self.latest_frame is None:
+            if self.reader_error is not None:
+                raise self.reader_error
+            self.frame_ready.clear()
+            await self.frame_ready.wait()
+        latest, self.latest_frame = self.latest_frame, None
+        return latest
 
     async def recv(self):
-        frame = await self.track.recv()
-        img = frame.to_ndarray(format="bgr24")
+        frame, arrived = await self._next_frame()
+        # Decodificación y redimensionado sobre buffers preasignados de la sesión:
+        # `out` es el plano del frame de salida y el overlay se dibuja directamente en él
+        start = time.perf_counter()
+        if RENDER_NATIVE_RESOLUTION:
+            out = self.frame_buffers.output(frame.width, frame.height)
+            img = self.frame_buffers.decode(frame, dst=out)
+            DECODE_SECONDS.observe(time.perf_counter() - start)
+        else:
+            img = self.frame_buffers.decode(frame)
+            decoded = time.perf_counter()
+            DECODE_SECONDS.observe(decoded - start)
+            out = self.frame_buffers.output(*WINDOW_SIZE)
+            cv2.resize(img, WINDOW_SIZE, dst=out)
+            RESIZE_SECONDS.observe(time.perf_counter() - decoded)
+            img = out  # La detección recibe el frame ya redimensionado (antes de dibujar)
         
         self.frame_count += 1
         
+        # Instante del frame en segundos (pts de la cámara si está disponible)
+        if frame.pts is not None and frame.time_base is not None:
+            frame_time = float(frame.pts * frame.time_base)
+        else:
+            frame_time = time.monotonic()
+        
         # Optimización: Solo procesar YOLO cada N frames
         if self.frame_count % self.detection_interval == 0:
-            # Procesar en thread separado para no bloquear
-            loop = asyncio.get_event_loop()
-            proc = await loop.run_in_executor(
-                self.executor, 
-                self.process_frame_cpu_intensive, 
-                img
-            )
+            # Si el atleta está quieto se reutiliza la última detección de esta sesión
+            signature = FRAME_CACHE.signature(img)
+            hit, proc = FRAME_CACHE.get(self.session_id, signature)
+            fresh = True
+            if hit:
+                FRAMES_CACHED.inc()
+            else:
+                # El planificador central (o el worker de la sesión) agrupa este frame con los de otras sesiones
+                start = time.perf_counter()
+                try:
+                    proc = await DETECTOR.detect(self.session_id, img, self.pose_tracker)
+                except WorkerError as e:
+                    # El worker de la sesión cayó: el pool la reasigna en el próximo frame
+                    if DEBUG_MODE:
+                        print(f"[WORKER] {e}")
+                    proc = STALE
+                if proc is STALE:
+                    FRAMES_DROPPED.inc()
+                    proc = self.last_detection
+                    fresh = False
+                else:
+                    FRAMES_DETECTED.inc()
+                    FRAME_CACHE.put(self.session_id, signature, proc)
+                    self.frame_controller.record_detection(time.perf_counter() - start)
             self.last_detection = proc
+            if proc is None:
+                self.extrapolator.reset()
+            elif fresh:
+                self.extrapolator.update(proc[1], frame_time)
         else:
+            FRAMES_SKIPPED.inc()
             proc = self.last_detection
+            # Frame saltado: estimar dónde están los keypoints ahora en lugar de repetir la última detección
+            if proc is not None and INTERPOLATE_KEYPOINTS:
+                estimate = self.extrapolator.predict(frame_time)
+                if estimate is not None:
+                    proc = (estimate[0], estimate[1], None)
             
+        # El overlay se dibuja siempre sobre el frame actual de la cámara,
+        # aunque la detección venga de un frame anterior
+        scale = (out.shape[1] / WINDOW_SIZE[0], out.shape[0] / WINDOW_SIZE[1])
+
         if proc is None:
-            out = cv2.resize(img, (640, 640))
             if DEBUG_MODE and self.frame_count % 30 == 0:  # Solo cada 30 frames
                 print("[FRAME] No se detectaron poses, frame original reenviado")
         else:
-            kps_flat, kps_orig, vis = proc
-            self.buffer.append(kps_flat)
+            kps_flat, kps_orig, _ = proc
+            if self._should_sample(frame_time):
+                self.buffer.append(kps_flat)
             
             # --- Lógica diferenciada por ejercicio (optimizada) ---
+            start = time.perf_counter()
             state = self._calculate_exercise_state(kps_orig)
+            STATE_SECONDS.observe(time.perf_counter() - start)
             
             # Actualizar estados
             self.last_state = self.state
             self.state = state
+            self.frame_controller.record_state(state)
             
             # Optimización: Solo predecir LSTM cuando sea necesario
             if len(self.buffer) == self.cfg["timesteps"] and self.should_predict():
-                self._process_lstm_prediction()
+                await self._process_lstm_prediction(arrived)
                 self.prediction_count += 1
             # Solo dibujar estado si está disponible y en modo debug
             if state and DEBUG_MODE:
-                cv2.putText(vis, f"State: {state}", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 0, 255), 2)
+                cv2.putText(out, f"State: {state}", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 0, 255), 2)
             
             # Mensajes de predicción ya NO se muestran visualmente (solo audio por WebSocket)
-            # self._draw_prediction_messages(vis)  # ELIMINADO: Solo audio, no visual
+            # self._draw_prediction_messages(out)  # ELIMINADO: Solo audio, no visual
             
             # SIEMPRE dibujar el esqueleto con el color correcto
             interest_points = self.joints if self.exercise == "sentadilla" else [5, 11, 13]
-            draw_skeleton(vis, kps_orig, interest_points, self.skeleton_color, exercise=self.exercise)
+            start = time.perf_counter()
+            draw_pose_overlay(out, kps_orig, interest_points, self.skeleton_color, scale=scale)
+            DRAW_SECONDS.observe(time.perf_counter() - start)
             
-            out = vis
+        # Ajustar el intervalo de detección según latencia, carga y fase del ejercicio
+        self.frame_controller.record_frame()
+        if ADAPTIVE_INTERVAL:
+            self.detection_interval = self.frame_controller.update(CPU_MONITOR.load())
             
-        new_frame = VideoFrame.from_ndarray(out, format="bgr24")
-        new_frame.pts = frame.pts
-        new_frame.time_base = frame.time_base
+        start = time.perf_counter()
+        new_frame = self.frame_buffers.video_frame(out, frame.pts, frame.time_base)
+        ENCODE_SECONDS.observe(time.perf_counter() - start)
+        FRAME_LATENCY.observe(time.perf_counter() - arrived)
         
         return new_frame
 
     def _calculate_exercise_state(self, kps_orig):
         """Calcula el estado del ejercicio de manera optimizada"""
+        return calculate_exercise_state(self.exercise, self.cfg, kps_orig)
+
+    async def _process_lstm_prediction(self, arrived=None):
+        """
+        Procesa la predicción LSTM y actualiza el estado visual. `arrived`
+        (perf_counter) es la llegada del frame que completó la ventana.
+        """
         try:
-            if self.exercise == "sentadilla":
-                a, b, c = [kps_orig[i] for i in [5, 11, 13]]  # Hombro izq, cadera izq, rodilla izq
-            else:
-                a, b, c = [kps_orig[i] for i in self.joints]
-                
-            angle = calculate_angle(a, b, c)
-            
-            if angle < self.thr["abajo"]:
-                return "abajo"
-            elif angle > self.thr["arriba"]:
-                return "arriba"
-            return None
-        except (IndexError, ValueError):
-            return None
-
-    def _process_lstm_prediction(self):
-        """Procesa la predicción LSTM y actualiza el estado visual"""
-        try:
-            seq = np.array(self.buffer).reshape(1, self.cfg["timesteps"], -1)
-            proba = self.lstm.predict(seq, verbose=0)[0]
+            # El buffer se copia directamente en su fila del lote compartido
+            proba = await PREDICTOR.predict(self.exercise, self.buffer)
             idx = int(np.argmax(proba))
             error_keys = list(self.cfg["error_msgs"].keys())
             
@@ -359,9 +726,11 @@ class VideoTransformTrack(VideoStreamTrack):
                 # Enviar feedback por WebSocket para TTS en cliente Flutter
                 if self.websocket and self.websocket.client_state == WebSocketState.CONNECTED:
                     feedback_message = f"{err}\n{sol}\nConf: {conf:.2f}"
-                    asyncio.create_task(self.websocket.send_text(json.dumps({
-                        "type": "feedback",
-                        "message": feedback_message                    })))
+                    feedback = {"type": "feedback", "message": feedback_message}
+                    if arrived is not None:
+                        # Hora (time.time) de llegada del frame que completó la ventana: latencia frame -> feedback
+                        feedback["frame_time"] = time.time() - (time.perf_counter() - arrived)
+                    asyncio.create_task(self.websocket.send_text(json.dumps(feedback)))
                 
                 if DEBUG_MODE:
                     print(f"[LSTM] Predicción: {label} (conf: {conf:.2f})")
@@ -381,7 +750,32 @@ class VideoTransformTrack(VideoStreamTrack):
         # NO dibujar nada - solo audio por WebSocket
         pass
 
-    def __del__(self):
-        """Limpia recursos al destruir el objeto"""
-        if hasattr(self, 'executor'):
-            self.executor.shutdown(wait=False)
+    def resources(self):
+        """Uso de recursos de la sesión para GET /sessions"""
+        return {
+            "track_id": self.session_id,
+            "exercise": self.exercise,
+            "frames": self.frame_count,
+            "frames_dropped": self.frames_dropped,
+            "reps": self.reps,
+            "buffer_bytes": self.buffer.nbytes + self.frame_buffers.nbytes,
+            "detection_interval": self.detection_interval,
+            "ended": self.readyState == "ended",
+        }
+
+    def stop(self):
+        """Libera el estado de la sesión en los servicios compartidos"""
+        super().stop()
+        if self.reader is not None:
+            self.reader.cancel()
+        if DEBUG_MODE:
+            print(f"[TRACK] Sesión {self.session_id} cerrada: {self.frames_dropped} frames descartados por atraso")
+        self.frame_buffers.release()
+        self.latest_frame = None
+        FRAME_CACHE.evict(self.session_id)
+        DETECTOR.discard(self.session_id)
+        CONTROLLERS.pop(self.session_id, None)
+        ACTIVE_TRACKS.pop(self.session_id, None)
+
+# Fin de la carga del módulo (fase "import" del arranque)
+MODULE_LOADED = time.perf_counter()
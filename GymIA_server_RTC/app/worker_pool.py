@@ -0,0 +1,471 @@
+# Pool de procesos de inferencia (YOLO-Pose + LSTM) con sesiones repartidas por carga
+# El proceso de señalización solo decodifica, dibuja y codifica; los modelos viven en los workers
+
+import asyncio
+import itertools
+import multiprocessing
+import os
+import threading
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+from app.detection_scheduler import STALE
+from app.utils.processing import WINDOW_SIZE
+
+FRAME_SHAPE = (WINDOW_SIZE[1], WINDOW_SIZE[0], 3)
+
+
+class WorkerError(RuntimeError):
+    """Error ocurrido dentro de un proceso de inferencia"""
+
+
+def default_backends(weights, models_dir, threads=None):
+    """YOLO-Pose y registro LSTM propios del proceso worker (backend según INFERENCE_BACKEND)"""
+    from app.exercises import load_exercise_config
+    from app.inference_backends import MODEL_VARIANTS, make_lstm_loader, make_pose_engine
+    from app.model_registry import ModelRegistry
+
+    return (
+        make_pose_engine(weights, threads=threads),
+        ModelRegistry(load_exercise_config(), loader=make_lstm_loader(threads=threads), models_dir=models_dir,
+                      variants=MODEL_VARIANTS),
+    )
+
+
+def _worker_main(index, shm_name, slots, requests, responses, backend_factory, weights, models_dir,
+                 max_batch, threads):
+    """
+    Bucle del proceso worker. Lee del pipe todas las peticiones pendientes y
+    ejecuta las detecciones en un solo lote de YOLO y las ventanas LSTM en un
+    lote por ejercicio. Los frames se leen de la memoria compartida, sin copias.
+    """
+    # Repartir los núcleos entre workers en lugar de que cada uno use todos
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+
+    from app.utils.pose_tracking import PoseTracker
+    from app.utils.processing import extract_pose
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    frames = np.ndarray((slots,) + FRAME_SHAPE, dtype=np.uint8, buffer=shm.buf)
+    from app.inference_backends import DEFAULT_THREADS
+
+    engine, registry = backend_factory(weights, models_dir, DEFAULT_THREADS or threads)
+    try:
+        # Cargar y calentar antes de avisar que está listo: la primera sesión no paga el trazado
+        from app.startup import warm_lstm, warm_pose
+
+        engine.load()
+        warm_pose(engine)
+        for exercise, cfg in registry.exercises.items():
+            warm_lstm(registry.get(exercise), cfg["timesteps"])
+    except Exception as e:
+        responses.send(("failed", None, f"{type(e).__name__}: {e}"))
+        return
+    responses.send(("ready", None, os.getpid()))
+
+    trackers = {}
+    running = True
+    while running:
+        try:
+            messages = [requests.recv()]
+        except EOFError:
+            break  # El proceso principal cerró el pipe
+        while len(messages) < max_batch * 4 and requests.poll():
+            messages.append(requests.recv())
+
+        detections, windows = [], {}
+        for message in messages:
+            op = message[0]
+            if op == "detect":
+                detections.append(message)
+            elif op == "lstm":
+                windows.setdefault(message[2], []).append(message)
+            elif op == "release":
+                trackers.pop(message[1], None)
+            elif op == "reload":
+                _, request_id, exercise, model_path = message
+                try:
+                    responses.send(("result", request_id, registry.swap(exercise, model_path)))
+                except Exception as e:
+                    responses.send(("error", request_id, f"{type(e).__name__}: {e}"))
+            elif op == "stop":
+                running = False
+
+        for start in range(0, len(detections), max_batch):
+            batch = detections[start:start + max_batch]
+            try:
+                results = engine.predict([frames[slot] for _, _, _, slot in batch])
+            except Exception as e:
+                for _, request_id, _, _ in batch:
+                    responses.send(("error", request_id, f"{type(e).__name__}: {e}"))
+                continue
+            for (_, request_id, session_id, _), result in zip(batch, results):
+                tracker = trackers.get(session_id)
+                if tracker is None:
+                    tracker = trackers[session_id] = PoseTracker()
+                try:
+                    proc = extract_pose(result, tracker, render=False)
+                except Exception as e:
+                    responses.send(("error", request_id, f"{type(e).__name__}: {e}"))
+                else:
+                    responses.send(("result", request_id, proc))
+
+        for exercise, batch in windows.items():
+            try:
+                proba = np.asarray(registry.get(exercise).predict_on_batch(np.stack([m[3] for m in batch])))
+            except Exception as e:
+                for _, request_id, _, _ in batch:
+                    responses.send(("error", request_id, f"{type(e).__name__}: {e}"))
+                continue
+            for (_, request_id, _, _), row in zip(batch, proba):
+                responses.send(("result", request_id, row))
+    shm.close()
+
+
+class _Worker:
+    def __init__(self, index, slots):
+        self.index = index
+        self.shm = shared_memory.SharedMemory(create=True, size=slots * int(np.prod(FRAME_SHAPE)))
+        self.frames = np.ndarray((slots,) + FRAME_SHAPE, dtype=np.uint8, buffer=self.shm.buf)
+        self.free_slots = list(range(slots))
+        self.sessions = set()
+        self.in_flight = 0
+        self.requests = 0
+        self.process = None
+        self.send_conn = None
+        self.recv_conn = None
+        self.reader = None
+        self.pid = None
+        self.alive = False
+        self.restarts = 0
+
+
+class WorkerPool:
+    """
+    Procesos de inferencia con su propia copia de YOLO-Pose y de los LSTM.
+
+    Cada sesión queda asignada al worker con menos sesiones (y menos trabajo en
+    curso) y sus frames se escriben, ya redimensionados a 640x640, en un slot de
+    la memoria compartida de ese worker; por el pipe solo viajan el número de
+    slot y los keypoints resultantes. Expone la misma interfaz que
+    `DetectionScheduler.detect` y `LSTMBatchEngine.predict`.
+    """
+
+    def __init__(self, workers, slots=16, weights="models/yolo11n-pose.pt", models_dir="models",
+                 max_batch=8, threads_per_worker=None, backend_factory=default_backends,
+                 start_timeout=300, max_restarts=3):
+        self.size = max(1, int(workers))
+        self.slots = max(1, int(slots))
+        self.weights = weights
+        self.models_dir = models_dir
+        self.max_batch = max(1, int(max_batch))
+        self.threads_per_worker = threads_per_worker
+        self.backend_factory = backend_factory
+        self.start_timeout = start_timeout
+        self.max_restarts = max_restarts
+        self._closing = False
+        self._workers = []
+        self._assignments = {}
+        self._futures = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._stats = {"frames": 0, "windows": 0, "stale": 0, "errors": 0, "worker_failures": 0}
+
+    # --- Ciclo de vida ---
+
+    def start(self):
+        """Lanza los procesos y espera a que carguen y calienten sus modelos (bloqueante)"""
+        if self._workers:
+            return
+        self._closing = False
+        for index in range(self.size):
+            worker = _Worker(index, self.slots)
+            self._launch(worker)
+            self._workers.append(worker)
+        for worker in self._workers:
+            self._wait_ready(worker)
+
+    def _launch(self, worker):
+        context = multiprocessing.get_context("spawn")  # Seguro con hilos y con PyTorch
+        threads = self.threads_per_worker or max(1, (os.cpu_count() or 1) // self.size)
+        req_recv, worker.send_conn = context.Pipe(duplex=False)
+        worker.recv_conn, resp_send = context.Pipe(duplex=False)
+        worker.process = context.Process(
+            target=_worker_main,
+            args=(worker.index, worker.shm.name, self.slots, req_recv, resp_send, self.backend_factory,
+                  self.weights, self.models_dir, self.max_batch, threads),
+            name=f"gymia-worker-{worker.index}",
+            daemon=True,
+        )
+        worker.process.start()
+        # Los extremos del hijo se cierran aquí: si el proceso muere, el lector recibe EOF
+        req_recv.close()
+        resp_send.close()
+
+    def _wait_ready(self, worker):
+        """Espera a que el worker cargue sus modelos y arranca su hilo lector"""
+        if not worker.recv_conn.poll(self.start_timeout):
+            raise WorkerError(f"El worker {worker.index} no respondió en {self.start_timeout}s")
+        try:
+            status, _, value = worker.recv_conn.recv()
+        except (EOFError, OSError):
+            raise WorkerError(f"El worker {worker.index} terminó mientras cargaba los modelos")
+        if status != "ready":
+            raise WorkerError(f"El worker {worker.index} no pudo cargar los modelos: {value}")
+        worker.pid = value
+        with self._lock:
+            worker.alive = True
+        worker.reader = threading.Thread(target=self._read_responses, args=(worker,),
+                                         name=f"gymia-worker-{worker.index}-reader", daemon=True)
+        worker.reader.start()
+
+    def _restart(self, worker):
+        """Relanza un worker caído sobre la misma memoria compartida (en un hilo aparte)"""
+        worker.process.join(timeout=5)
+        for conn in (worker.send_conn, worker.recv_conn):
+            conn.close()
+        if self._closing:
+            return
+        try:
+            self._launch(worker)
+            self._wait_ready(worker)
+        except WorkerError as e:
+            print(f"⚠️ No se pudo relanzar el worker {worker.index}: {e}")
+            return
+        print(f"✅ Worker {worker.index} relanzado (pid {worker.pid})")
+
+    def close(self):
+        """Detiene los procesos y libera la memoria compartida"""
+        self._closing = True
+        for worker in self._workers:
+            try:
+                worker.send_conn.send(("stop",))
+            except (OSError, ValueError):
+                pass
+        for worker in self._workers:
+            worker.process.join(timeout=5)
+            if worker.process.is_alive():
+                worker.process.terminate()
+            worker.shm.close()
+            worker.shm.unlink()
+        self._workers = []
+
+    # --- Asignación de sesiones ---
+
+    def assign(self, session_id):
+        """Worker de la sesión; la primera vez se elige el menos cargado"""
+        with self._lock:
+            worker = self._assignments.get(session_id)
+            if worker is None or not worker.alive:
+                worker = min(self._alive(), key=lambda w: (len(w.sessions), w.in_flight))
+                worker.sessions.add(session_id)
+                self._assignments[session_id] = worker
+            return worker
+
+    def _alive(self):
+        """Workers que pueden recibir peticiones (llamar con el lock tomado)"""
+        workers = [w for w in self._workers if w.alive]
+        if not workers:
+            raise WorkerError("No hay procesos de inferencia disponibles")
+        return workers
+
+    def discard(self, session_id):
+        """Libera la sesión y su tracker en el worker"""
+        with self._lock:
+            worker = self._assignments.pop(session_id, None)
+            if worker is not None:
+                worker.sessions.discard(session_id)
+        if worker is not None and worker.alive:
+            try:
+                self._send(worker, ("release", session_id))
+            except WorkerError:
+                pass  # El worker murió: su tracker se fue con él
+
+    # --- Inferencia ---
+
+    async def detect(self, session_id, frame, tracker=None):
+        """
+        Pose de `frame` calculada en el worker de la sesión. El tracker de la
+        sesión vive en ese proceso, por lo que `tracker` se ignora. Si el worker
+        no tiene slots libres el frame se descarta y se devuelve STALE.
+        """
+        worker = self.assign(session_id)
+        with self._lock:
+            slot = worker.free_slots.pop() if worker.free_slots else None
+            if slot is None:
+                self._stats["stale"] += 1
+                return STALE
+        self._write_frame(worker, slot, frame)
+        return await self._request(worker, "detect", session_id, slot)
+
+    async def detect_batch(self, session_id, frames):
+        """
+        Poses de `frames` en orden, para el análisis offline. En lugar de
+        descartar, espera slots libres, pero deja siempre la mitad de los slots
+        del worker para las sesiones en vivo (prioridad baja).
+        """
+        worker = self.assign(session_id)
+        reserved = self.slots // 2
+        requests = []
+        for frame in frames:
+            while True:
+                with self._lock:
+                    slot = worker.free_slots.pop() if len(worker.free_slots) > reserved else None
+                if slot is not None:
+                    break
+                await asyncio.sleep(0.005)
+            self._write_frame(worker, slot, frame)
+            # Las tareas envían en el orden de creación: el tracker del worker ve los frames en orden
+            requests.append(asyncio.ensure_future(self._request(worker, "detect", session_id, slot)))
+        return await asyncio.gather(*requests)
+
+    def _write_frame(self, worker, slot, frame):
+        if frame.shape == FRAME_SHAPE:
+            np.copyto(worker.frames[slot], frame)
+        else:
+            cv2.resize(frame, WINDOW_SIZE, dst=worker.frames[slot])  # Directo al slot compartido
+
+    async def predict(self, exercise, window):
+        """Probabilidades LSTM de una ventana (arreglo o KeypointRingBuffer)"""
+        if hasattr(window, "write_to"):
+            array = np.empty(window.shape, dtype=np.float32)
+            window.write_to(array)
+        else:
+            array = np.asarray(window, dtype=np.float32)
+        with self._lock:
+            worker = min(self._alive(), key=lambda w: w.in_flight)
+        return await self._request(worker, "lstm", exercise, array)
+
+    async def predict_batch(self, exercise, windows):
+        """Probabilidades LSTM de varias ventanas (análisis offline), repartidas entre los workers"""
+        return np.stack(await asyncio.gather(*[self.predict(exercise, window) for window in windows]))
+
+    async def reload(self, exercise, model_path=None):
+        """Reemplaza el modelo de un ejercicio en todos los workers"""
+        with self._lock:
+            workers = self._alive()
+        return await asyncio.gather(*[
+            self._request(worker, "reload", exercise, model_path) for worker in workers
+        ])
+
+    async def _request(self, worker, op, key, payload):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        request_id = next(self._ids)
+        with self._lock:
+            self._futures[request_id] = (future, loop, worker, op, payload if op == "detect" else None)
+            worker.in_flight += 1
+            worker.requests += 1
+        try:
+            self._send(worker, (op, request_id, key, payload))
+        except WorkerError:
+            # Si _fail_worker no la limpió ya, se deshace el registro de la petición
+            with self._lock:
+                if self._futures.pop(request_id, None) is not None:
+                    worker.in_flight -= 1
+                    if op == "detect" and payload not in worker.free_slots:
+                        worker.free_slots.append(payload)
+            raise
+        return await future
+
+    def _send(self, worker, message):
+        try:
+            worker.send_conn.send(message)
+        except (OSError, ValueError) as e:
+            raise WorkerError(f"El worker {worker.index} no está disponible: {e}")
+
+    def _read_responses(self, worker):
+        """Hilo lector: resuelve los futures del event loop con las respuestas del worker"""
+        while True:
+            try:
+                status, request_id, value = worker.recv_conn.recv()
+            except (EOFError, OSError):
+                self._fail_worker(worker)
+                return
+            with self._lock:
+                entry = self._futures.pop(request_id, None)
+                if entry is None:
+                    continue
+                future, loop, _, op, slot = entry
+                worker.in_flight -= 1
+                if slot is not None:
+                    worker.free_slots.append(slot)  # El worker ya terminó de leer el frame
+                if op == "detect":
+                    self._stats["frames"] += 1
+                elif op == "lstm":
+                    self._stats["windows"] += 1
+                if status == "error":
+                    self._stats["errors"] += 1
+            if status == "error":
+                loop.call_soon_threadsafe(_resolve_error, future, WorkerError(value))
+            else:
+                loop.call_soon_threadsafe(_resolve_result, future, value)
+
+    def _fail_worker(self, worker):
+        """
+        El proceso terminó: fallan sus peticiones pendientes, sus sesiones se
+        reasignan a los demás workers en su próximo frame y se relanza.
+        """
+        with self._lock:
+            worker.alive = False
+            pending = [(rid, entry) for rid, entry in self._futures.items() if entry[2] is worker]
+            for request_id, _ in pending:
+                self._futures.pop(request_id, None)
+            worker.in_flight = 0
+            worker.free_slots = list(range(self.slots))
+            for session_id in worker.sessions:
+                self._assignments.pop(session_id, None)
+            worker.sessions.clear()
+            restart = not self._closing and worker.restarts < self.max_restarts
+            if not self._closing:
+                self._stats["worker_failures"] += 1
+            if restart:
+                worker.restarts += 1
+        error = WorkerError(f"El worker {worker.index} terminó inesperadamente")
+        for _, (future, loop, _, _, _) in pending:
+            loop.call_soon_threadsafe(_resolve_error, future, error)
+        if restart:
+            print(f"⚠️ Worker {worker.index} terminó inesperadamente; relanzando ({worker.restarts}/{self.max_restarts})")
+            threading.Thread(target=self._restart, args=(worker,), name=f"gymia-worker-{worker.index}-restart",
+                             daemon=True).start()
+
+    # --- Estado ---
+
+    def pending(self):
+        with self._lock:
+            return len(self._futures)
+
+    def snapshot(self):
+        with self._lock:
+            return dict(
+                self._stats,
+                processes=self.size,
+                slots_per_worker=self.slots,
+                workers=[{
+                    "index": w.index,
+                    "pid": w.pid,
+                    "alive": w.alive,
+                    "restarts": w.restarts,
+                    "sessions": len(w.sessions),
+                    "in_flight": w.in_flight,
+                    "free_slots": len(w.free_slots),
+                    "requests": w.requests,
+                } for w in self._workers],
+            )
+
+
+def _resolve_result(future, value):
+    if not future.done():
+        future.set_result(value)
+
+
+def _resolve_error(future, error):
+    if not future.done():
+        future.set_exception(error)
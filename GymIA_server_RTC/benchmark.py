@@ -1,59 +1,323 @@
 #!/usr/bin/env python3
 """
-Benchmark para medir el rendimiento de las optimizaciones
+Benchmark end-to-end del pipeline de VideoTransformTrack.recv
+
+Reproduce un video grabado (o uno sintético) al ritmo de una cámara a través
+del pipeline completo: decodificación, detección, máquina de estados, LSTM,
+dibujo y re-codificación, con N sesiones simuladas en paralelo. Reporta la
+latencia desde la captura hasta el frame anotado (p50/p95/p99), frames descartados,
+throughput, CPU y RSS, y guarda los resultados en JSON para comparar commits.
+
+Uso:
+    python benchmark.py --video serie.mp4 --sessions 1,4,16,64 --output bench.json
+    python benchmark.py --compare bench_anterior.json --output bench.json
 """
-import time
-import statistics
+import argparse
 import asyncio
+import fractions
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
 import cv2
 import numpy as np
-from app.utils.processing_optimized import preprocess_frame, calculate_angle
-from ultralytics import YOLO
-
-async def benchmark_processing():
-    print("🔬 Iniciando benchmark de procesamiento...")
-    
-    # Cargar modelo
-    model = YOLO("models/yolo11n-pose.pt")
-    
-    # Generar frames de prueba
-    test_frames = []
-    for i in range(50):
-        frame = np.random.randint(0, 255, (480, 640, 3), dtype=np.uint8)
-        test_frames.append(frame)
-    
-    # Benchmark sin optimizaciones
-    print("📊 Probando sin optimizaciones...")
-    times_normal = []
-    for frame in test_frames[:10]:  # Solo 10 para comparación
-        start = time.time()
-        proc = preprocess_frame(frame, model, use_cache=False)
-        end = time.time()
-        times_normal.append(end - start)
-    
-    # Benchmark con optimizaciones
-    print("⚡ Probando con optimizaciones...")
-    times_optimized = []
-    for frame in test_frames[:10]:
-        start = time.time()
-        proc = preprocess_frame(frame, model, use_cache=True)
-        end = time.time()
-        times_optimized.append(end - start)
-    
-    # Resultados
-    avg_normal = statistics.mean(times_normal) * 1000
-    avg_optimized = statistics.mean(times_optimized) * 1000
-    improvement = ((avg_normal - avg_optimized) / avg_normal) * 100
-    
-    print(f"\n📈 RESULTADOS DEL BENCHMARK:")
-    print(f"Sin optimizaciones: {avg_normal:.2f}ms promedio")
-    print(f"Con optimizaciones: {avg_optimized:.2f}ms promedio")
-    print(f"Mejora: {improvement:.1f}%")
-    
-    if improvement > 10:
-        print("✅ Las optimizaciones están funcionando correctamente")
+
+VIDEO_CLOCK_RATE = 90000
+CODECS = {"vp8": "libvpx", "h264": "libx264"}
+
+
+def load_video_frames(path, max_frames, size):
+    """Decodifica el video una sola vez (fuera de la medición) y lo deja en memoria"""
+    import av
+
+    frames = []
+    with av.open(path) as container:
+        for frame in container.decode(video=0):
+            frames.append(cv2.resize(frame.to_ndarray(format="bgr24"), size))
+            if len(frames) >= max_frames:
+                break
+    if not frames:
+        raise ValueError(f"El video no tiene frames: {path}")
+    return frames
+
+
+def synthetic_frames(count, size):
+    """
+    Figura humana sintética haciendo sentadillas (cabeza, tronco y extremidades
+    rellenas sobre fondo con textura). Sirve para medir el pipeline sin video,
+    pero YOLO puede no detectarla: usar --video para resultados representativos.
+    """
+    w, h = size
+    rng = np.random.default_rng(0)
+    background = rng.integers(60, 120, (h, w, 3), dtype=np.uint8)
+    frames = []
+    for i in range(count):
+        depth = (1 - np.cos(2 * np.pi * i / 60)) / 2  # 0 arriba, 1 abajo
+        img = background.copy()
+        cx, floor = w // 2, int(h * 0.92)
+        knee = (cx + int(40 * depth * w / 640), floor - int(h * (0.22 - 0.05 * depth)))
+        hip = (cx - int(30 * depth * w / 640), floor - int(h * (0.45 - 0.18 * depth)))
+        shoulder = (cx, hip[1] - int(h * 0.25))
+        head = (shoulder[0], shoulder[1] - int(h * 0.07))
+        skin, cloth = (150, 180, 220), (200, 80, 40)
+        thick = max(8, w // 30)
+        cv2.line(img, (cx - 20, floor), knee, cloth, thick)
+        cv2.line(img, (cx + 20, floor), knee, cloth, thick)
+        cv2.line(img, knee, hip, cloth, thick)
+        cv2.line(img, hip, shoulder, cloth, thick + 10)
+        cv2.line(img, shoulder, (shoulder[0] + 50, shoulder[1] + 60), skin, thick // 2)
+        cv2.line(img, shoulder, (shoulder[0] - 50, shoulder[1] + 60), skin, thick // 2)
+        cv2.circle(img, head, max(12, w // 25), skin, -1)
+        frames.append(img)
+    return frames
+
+
+def rss_mb():
+    """RSS actual en MB (Linux); en otros sistemas, el máximo alcanzado"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:  # Windows
+        return float("nan")
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) if values else None
+
+
+def make_replay_track(frames, fps):
+    from aiortc.mediastreams import MediaStreamTrack
+    from av import VideoFrame
+
+    class ReplayTrack(MediaStreamTrack):
+        """
+        Track de entrada que entrega los frames en bucle con pts correctos, al
+        ritmo de una cámara de `fps` cuadros por segundo. Guarda el instante de
+        captura de cada pts para medir la latencia hasta el frame anotado.
+        """
+        kind = "video"
+        # yuv420p, como los entrega el decoder VP8/H264 de aiortc
+        planes = [cv2.cvtColor(img, cv2.COLOR_BGR2YUV_I420) for img in frames]
+
+        def __init__(self, offset):
+            super().__init__()
+            self.index = offset
+            self.step = int(VIDEO_CLOCK_RATE / fps)
+            self.started = None
+            self.sent = 0
+            self.captured = {}
+
+        async def recv(self):
+            now = time.perf_counter()
+            if self.started is None:
+                self.started = now
+            delay = self.started + self.sent / fps - now
+            await asyncio.sleep(max(0.0, delay))
+            img = self.planes[self.index % len(self.planes)]
+            frame = VideoFrame.from_ndarray(img, format="yuv420p")
+            frame.pts = self.index * self.step
+            frame.time_base = fractions.Fraction(1, VIDEO_CLOCK_RATE)
+            self.captured[frame.pts] = time.perf_counter()
+            self.index += 1
+            self.sent += 1
+            return frame
+
+        def capture_time(self, pts):
+            """
+            Instante de captura de `pts`. Los pts anteriores que no salieron
+            (descartados por latest-frame-wins) se olvidan: el dict no crece.
+            """
+            for old in list(self.captured):
+                if old >= pts:
+                    break
+                del self.captured[old]
+            return self.captured.pop(pts)
+
+    return ReplayTrack
+
+
+def make_encoder(codec, width, height, fps):
+    if codec == "none":
+        return None
+    import av
+
+    encoder = av.CodecContext.create(CODECS[codec], "w")
+    encoder.width = width
+    encoder.height = height
+    encoder.pix_fmt = "yuv420p"
+    encoder.framerate = fractions.Fraction(int(fps), 1)
+    encoder.time_base = fractions.Fraction(1, VIDEO_CLOCK_RATE)
+    return encoder
+
+
+async def run_session(server, replay_cls, index, args, latencies, counters):
+    source = replay_cls(index * 7)
+    track = server.VideoTransformTrack(source, exercise=args.exercise)
+    encoder = None
+    try:
+        for n in range(args.warmup + args.frames):
+            out = await track.recv()
+            if args.codec != "none":
+                if encoder is None:
+                    encoder = make_encoder(args.codec, out.width, out.height, args.fps)
+                encoder.encode(out.reformat(format="yuv420p"))
+            # Latencia desde la captura del frame hasta que sale anotado y codificado
+            elapsed = time.perf_counter() - source.capture_time(out.pts)
+            if n >= args.warmup:
+                latencies.append(elapsed)
+                counters["frames"] += 1
+                counters["frames_with_pose"] += int(track.last_detection is not None)
+        counters["source_frames"] += source.sent
+        counters["dropped"] += track.frames_dropped
+    finally:
+        track.stop()
+
+
+async def run_level(server, replay_cls, sessions, args):
+    latencies = []
+    counters = {"frames": 0, "frames_with_pose": 0, "source_frames": 0, "dropped": 0}
+    rss_before = rss_mb()
+    cpu_before = time.process_time()
+    wall_before = time.perf_counter()
+    await asyncio.gather(*[
+        run_session(server, replay_cls, i, args, latencies, counters) for i in range(sessions)
+    ])
+    wall = time.perf_counter() - wall_before
+    cpu = time.process_time() - cpu_before
+    latencies_ms = [x * 1000 for x in latencies]
+    return {
+        "sessions": sessions,
+        "frames": counters["frames"],
+        "wall_seconds": round(wall, 3),
+        "throughput_fps": round(counters["frames"] / wall, 2) if wall > 0 else None,
+        "per_session_fps": round(counters["frames"] / wall / sessions, 2) if wall > 0 else None,
+        "latency_ms": {
+            "p50": percentile(latencies_ms, 50),
+            "p95": percentile(latencies_ms, 95),
+            "p99": percentile(latencies_ms, 99),
+            "mean": float(np.mean(latencies_ms)) if latencies_ms else None,
+            "max": float(np.max(latencies_ms)) if latencies_ms else None,
+        },
+        "cpu_percent": round(100 * cpu / wall, 1) if wall > 0 else None,
+        "cpu_cores": os.cpu_count(),
+        "rss_mb_before": round(rss_before, 1),
+        "rss_mb_after": round(rss_mb(), 1),
+        "source_frames": counters["source_frames"],
+        "dropped_frames": counters["dropped"],
+        "pose_rate": round(counters["frames_with_pose"] / counters["frames"], 3) if counters["frames"] else None,
+        "detection": server.DETECTION_SCHEDULER.snapshot(),
+        "lstm": server.LSTM_ENGINE.snapshot(),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_level(result):
+    lat = result["latency_ms"]
+    print(f"  {result['sessions']:3d} sesiones | p50 {lat['p50']:7.1f} ms | p95 {lat['p95']:7.1f} ms | "
+          f"p99 {lat['p99']:7.1f} ms | {result['throughput_fps']:7.1f} fps totales | "
+          f"descartados {result['dropped_frames']:5d} | CPU {result['cpu_percent']:6.1f}% | "
+          f"RSS {result['rss_mb_after']:7.1f} MB")
+
+
+def print_comparison(current, previous):
+    before = {level["sessions"]: level for level in previous.get("levels", [])}
+    print(f"\n📊 Comparación con {previous.get('commit') or 'resultado anterior'}:")
+    for level in current["levels"]:
+        old = before.get(level["sessions"])
+        if old is None:
+            continue
+        for key in ("p50", "p95", "p99"):
+            new_v, old_v = level["latency_ms"][key], old["latency_ms"][key]
+            if new_v is not None and old_v:
+                print(f"  {level['sessions']:3d} sesiones {key}: {old_v:7.1f} -> {new_v:7.1f} ms "
+                      f"({(new_v - old_v) / old_v * 100:+.1f}%)")
+        if old.get("throughput_fps"):
+            change = (level["throughput_fps"] - old["throughput_fps"]) / old["throughput_fps"] * 100
+            print(f"  {level['sessions']:3d} sesiones throughput: {old['throughput_fps']:.1f} -> "
+                  f"{level['throughput_fps']:.1f} fps ({change:+.1f}%)")
+
+
+async def benchmark(args):
+    print("🔬 Iniciando benchmark end-to-end...")
+    size = (args.width, args.height)
+    if args.video:
+        frames = load_video_frames(args.video, args.max_source_frames, size)
+        source = os.path.basename(args.video)
     else:
-        print("⚠️  Las optimizaciones podrían necesitar ajustes")
+        frames = synthetic_frames(120, size)
+        source = "synthetic"
+        print("⚠️  Usando video sintético: YOLO puede no detectar la figura. Usa --video para resultados reales.")
+
+    from app import webrtc_server_optimized as server
+
+    replay_cls = make_replay_track(frames, args.fps)
+    levels = []
+    for sessions in args.sessions:
+        print(f"📊 Probando con {sessions} sesiones...")
+        result = await run_level(server, replay_cls, sessions, args)
+        print_level(result)
+        levels.append(result)
+
+    return {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "source": source,
+        "source_frames": len(frames),
+        "resolution": list(size),
+        "exercise": args.exercise,
+        "frames_per_session": args.frames,
+        "warmup_frames": args.warmup,
+        "codec": args.codec,
+        "config": {key: os.environ[key] for key in sorted(os.environ) if key in server.__dict__},
+        "levels": levels,
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark end-to-end de VideoTransformTrack.recv")
+    parser.add_argument("--video", help="Video grabado a reproducir (por defecto, sintético)")
+    parser.add_argument("--sessions", default="1,4,16,64",
+                        type=lambda s: [int(x) for x in s.split(",") if x])
+    parser.add_argument("--frames", type=int, default=150, help="Frames medidos por sesión")
+    parser.add_argument("--warmup", type=int, default=20, help="Frames de calentamiento por sesión")
+    parser.add_argument("--exercise", default=os.environ.get("GYMIA_EXERCISE", "peso_muerto"))
+    parser.add_argument("--fps", type=float, default=30, help="FPS de la cámara simulada")
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    parser.add_argument("--max-source-frames", type=int, default=300)
+    parser.add_argument("--codec", choices=["vp8", "h264", "none"], default="vp8",
+                        help="Re-codificación del frame de salida")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", help="JSON de un benchmark anterior para comparar")
+    return parser.parse_args()
+
 
 if __name__ == "__main__":
-    asyncio.run(benchmark_processing())
+    args = parse_args()
+    results = asyncio.run(benchmark(args))
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n✅ Resultados guardados en {args.output}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            print_comparison(results, json.load(f))
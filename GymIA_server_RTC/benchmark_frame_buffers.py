@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark de la ruta de frames de VideoTransformTrack.recv:
+to_ndarray + cv2.resize + from_ndarray (ruta anterior) vs FrameBuffers.
+
+Para contar asignaciones se conservan las salidas de cada frame y se cuentan
+los bloques grandes (>= 64 KiB) que numpy reservó durante la corrida. Los
+buffers de PyAV (to_ndarray, from_ndarray) se cuentan aparte, porque FFmpeg
+no pasa por tracemalloc.
+"""
+import argparse
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+from av import VideoFrame
+
+from app.detection_scheduler import _fit
+from app.utils.frame_buffers import FrameBuffers
+from app.utils.processing import WINDOW_SIZE
+
+LARGE_BLOCK = 64 * 1024
+
+
+def camera_frames(count, width, height):
+    """Frames yuv420p como los entrega el decoder de aiortc"""
+    rng = np.random.default_rng(0)
+    frames = []
+    for _ in range(count):
+        img = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+        frames.append(VideoFrame.from_ndarray(cv2.cvtColor(img, cv2.COLOR_BGR2YUV_I420), format="yuv420p"))
+    return frames
+
+
+def draw(out):
+    cv2.circle(out, (100, 100), 20, (0, 255, 0), -1)
+
+
+def old_path(frame, state, keep):
+    img = frame.to_ndarray(format="bgr24")
+    out = cv2.resize(img, WINDOW_SIZE)
+    detection_input = cv2.resize(img, WINDOW_SIZE)  # Copia propia del planificador YOLO
+    draw(out)
+    new_frame = VideoFrame.from_ndarray(out, format="bgr24")
+    state["av_buffers"] += 2  # to_ndarray + from_ndarray
+    keep.append((img, out, detection_input, new_frame))
+
+
+def new_path(frame, state, keep):
+    buffers = state["buffers"]
+    img = buffers.decode(frame)
+    out = buffers.output(*WINDOW_SIZE)
+    cv2.resize(img, WINDOW_SIZE, dst=out)
+    detection_input = _fit(out)
+    draw(out)
+    new_frame = buffers.video_frame(out, frame.pts, frame.time_base)
+    if not buffers.zero_copy:
+        state["av_buffers"] += 1  # from_ndarray de respaldo
+    keep.append((img, out, detection_input, new_frame))
+
+
+def measure(fn, frames, repeats):
+    state = {"buffers": FrameBuffers(), "av_buffers": 0}
+    fn(frames[0], state, [])  # Calentamiento (los buffers se asignan aquí)
+
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for frame in frames:
+            fn(frame, state, [])
+        times.append(time.perf_counter() - start)
+
+    state["av_buffers"] = 0
+    keep = []
+    tracemalloc.start()  # Solo se registran los bloques reservados desde aquí
+    for frame in frames:
+        fn(frame, state, keep)
+    snapshot = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    domain = [tracemalloc.DomainFilter(True, np.lib.tracemalloc_domain)]
+    large = [t for t in snapshot.filter_traces(domain).traces if t.size >= LARGE_BLOCK]
+    return {
+        "us_per_frame": min(times) / len(frames) * 1e6,
+        "allocs_per_frame": len(large) / len(frames),
+        "mb_per_frame": sum(t.size for t in large) / len(frames) / 1e6,
+        "av_buffers_per_frame": state["av_buffers"] / len(frames),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--frames", type=int, default=60)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    for width, height in ((640, 480), (1280, 720)):
+        frames = camera_frames(args.frames, width, height)
+        print(f"\n📊 Cámara {width}x{height}, {args.frames} frames, mejor de {args.repeats} repeticiones")
+        results = {}
+        for name, fn in (("anterior", old_path), ("buffers", new_path)):
+            r = results[name] = measure(fn, frames, args.repeats)
+            print(f"  {name:8s} {r['us_per_frame']:8.1f} µs/frame | {r['allocs_per_frame']:4.1f} asignaciones numpy/frame "
+                  f"({r['mb_per_frame']:5.2f} MB) | {r['av_buffers_per_frame']:3.1f} buffers PyAV/frame")
+        print(f"  Mejora: {results['anterior']['us_per_frame'] / results['buffers']['us_per_frame']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
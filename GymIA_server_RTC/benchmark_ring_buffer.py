@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark del buffer de keypoints del LSTM:
+deque + np.array(...).reshape (ruta anterior) vs KeypointRingBuffer.
+"""
+import argparse
+import time
+import tracemalloc
+from collections import deque
+
+import numpy as np
+
+from app.utils.ring_buffer import KeypointRingBuffer
+
+FEATURES = 34
+
+
+def deque_path(frames, timesteps, batch):
+    buffer = deque(maxlen=timesteps)
+    for kps in frames:
+        buffer.append(kps)
+        if len(buffer) == timesteps:
+            seq = np.array(buffer).reshape(1, timesteps, -1)
+            batch[0] = seq[0]
+
+
+def ring_path(frames, timesteps, batch):
+    buffer = KeypointRingBuffer(timesteps, FEATURES)
+    for kps in frames:
+        buffer.append(kps)
+        if buffer.is_full():
+            buffer.write_to(batch[0])
+
+
+def measure(fn, frames, timesteps, repeats):
+    batch = np.empty((1, timesteps, FEATURES), dtype=np.float32)
+    fn(frames, timesteps, batch)  # Calentamiento
+
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(frames, timesteps, batch)
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    fn(frames, timesteps, batch)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(times), peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--frames", type=int, default=3000)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    frames = [np.random.rand(FEATURES).astype(np.float32) for _ in range(args.frames)]
+
+    print(f"🔬 Buffer LSTM: {args.frames} frames, mejor de {args.repeats} repeticiones")
+    for timesteps in (30, 60):
+        print(f"\n📊 timesteps={timesteps}")
+        results = {}
+        for name, fn in (("deque", deque_path), ("ring", ring_path)):
+            best, peak = measure(fn, frames, timesteps, args.repeats)
+            results[name] = best
+            per_frame_us = best / args.frames * 1e6
+            print(f"  {name:6s} {per_frame_us:8.2f} µs/frame   pico de memoria {peak / 1024:8.1f} KiB")
+        print(f"  Mejora: {results['deque'] / results['ring']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Exporta los modelos de models/ para los backends de inferencia compilados:
+
+  models/*.h5  (LSTM Keras)  -> .onnx (tf2onnx) y/o .xml/.bin (OpenVINO IR)
+  models/*.pt  (YOLO-Pose)   -> .onnx (ultralytics) y/o .xml/.bin (OpenVINO IR)
+
+Los archivos exportados quedan junto al original con el mismo nombre, que es
+donde los busca app.inference_backends (INFERENCE_BACKEND=onnx | openvino).
+Se ejecuta una sola vez, o después de reentrenar un modelo.
+
+Dependencias solo para exportar: tensorflow, tf2onnx, ultralytics, onnx y
+(para OpenVINO) openvino.
+"""
+import argparse
+import glob
+import os
+import time
+
+from app.inference_backends import exported_path
+
+ONNX_OPSET = 13
+POSE_IMGSZ = 640
+
+
+def export_lstm_onnx(path):
+    import tensorflow as tf
+    import tf2onnx
+    from keras.models import load_model
+
+    model = load_model(path)
+    _, timesteps, features = model.input_shape
+    # Batch dinámico: el motor LSTM agrupa ventanas de varias sesiones
+    signature = [tf.TensorSpec((None, timesteps, features), tf.float32, name="window")]
+    target = exported_path(path, "onnx")
+    tf2onnx.convert.from_keras(model, input_signature=signature, opset=ONNX_OPSET, output_path=target)
+    return target
+
+
+def export_pose_onnx(path):
+    from ultralytics import YOLO
+
+    # Batch y tamaño dinámicos: el planificador envía lotes de hasta DETECTION_MAX_BATCH
+    exported = YOLO(path).export(format="onnx", imgsz=POSE_IMGSZ, dynamic=True, opset=ONNX_OPSET, simplify=True)
+    target = exported_path(path, "onnx")
+    if os.path.abspath(exported) != os.path.abspath(target):
+        os.replace(exported, target)
+    return target
+
+
+def export_openvino(path):
+    """IR de OpenVINO a partir del ONNX (se exporta primero si no existe)"""
+    import openvino as ov
+
+    source = exported_path(path, "onnx")
+    if not os.path.isfile(source):
+        source = export_pose_onnx(path) if path.endswith(".pt") else export_lstm_onnx(path)
+    target = exported_path(path, "openvino")
+    ov.save_model(ov.convert_model(source), target, compress_to_fp16=False)
+    return target
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--models-dir", default="models")
+    parser.add_argument("--models", nargs="*", help="Archivos a exportar (por defecto todos los .h5 y .pt)")
+    parser.add_argument("--formats", default="onnx", help="Lista separada por comas: onnx, openvino")
+    parser.add_argument("--force", action="store_true", help="Reexportar aunque el archivo ya exista")
+    args = parser.parse_args()
+
+    formats = [f.strip() for f in args.formats.split(",") if f.strip()]
+    for fmt in formats:
+        if fmt not in ("onnx", "openvino"):
+            parser.error(f"Formato desconocido: {fmt}")
+
+    paths = args.models or sorted(
+        glob.glob(os.path.join(args.models_dir, "*.h5")) + glob.glob(os.path.join(args.models_dir, "*.pt"))
+    )
+    if not paths:
+        print(f"⚠️ No hay modelos .h5 ni .pt en {args.models_dir}")
+        return 1
+
+    failures = 0
+    for path in paths:
+        for fmt in formats:
+            target = exported_path(path, fmt)
+            if os.path.isfile(target) and not args.force:
+                print(f"⏭️  {target} ya existe (usar --force para reexportar)")
+                continue
+            start = time.perf_counter()
+            try:
+                if fmt == "openvino":
+                    target = export_openvino(path)
+                elif path.endswith(".pt"):
+                    target = export_pose_onnx(path)
+                else:
+                    target = export_lstm_onnx(path)
+            except Exception as e:
+                failures += 1
+                print(f"❌ {path} -> {fmt}: {type(e).__name__}: {e}")
+                continue
+            print(f"✅ {path} -> {target} ({time.perf_counter() - start:.1f}s)")
+
+    if failures:
+        print(f"\n{failures} exportaciones fallaron")
+        return 1
+    print("\nVerificar las salidas con: python test_backend_parity.py")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Generador de carga WebRTC para /signaling (solo localhost)
+
+Abre muchas sesiones simultáneas como lo haría la app Flutter: WebSocket de
+señalización, oferta con el campo `exercise` y un video en bucle como track de
+cámara. Por sesión mide el tiempo hasta el primer frame anotado, los FPS
+entregados, el intervalo entre mensajes {"type": "feedback"} y su latencia
+desde la llegada al servidor del frame que completó la ventana LSTM
+(`frame_time` del mensaje; cliente y servidor comparten el reloj). Los niveles de
+concurrencia se prueban en orden hasta superar el presupuesto: primer frame p95,
+FPS p5 y latencia del feedback p95.
+
+Uso:
+    uvicorn app.webrtc_server_optimized:app --port 8000
+    python load_generator.py --video serie.mp4 --sessions 1,4,8,16,32 --duration 30
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+import numpy as np
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) if values else None
+
+
+def make_source_track(args):
+    """Track de cámara: el video en bucle, o la figura sintética del benchmark"""
+    if args.video:
+        from aiortc.contrib.media import MediaPlayer
+
+        player = MediaPlayer(args.video, loop=True)
+        return player.video, player
+
+    from aiortc.mediastreams import VideoStreamTrack
+    from av import VideoFrame
+
+    from benchmark import synthetic_frames
+
+    frames = synthetic_frames(120, (args.width, args.height))
+
+    class LoopTrack(VideoStreamTrack):
+        def __init__(self):
+            super().__init__()
+            self.index = 0
+
+        async def recv(self):
+            pts, time_base = await self.next_timestamp()
+            frame = VideoFrame.from_ndarray(frames[self.index % len(frames)], format="bgr24")
+            frame.pts, frame.time_base = pts, time_base
+            self.index += 1
+            return frame
+
+    return LoopTrack(), None
+
+
+class SessionStats:
+    def __init__(self, index):
+        self.index = index
+        self.offer_sent = None
+        self.first_frame = None
+        self.frame_times = []
+        self.feedback_times = []
+        self.feedback_lags = []
+        self.error = None
+
+    def summary(self):
+        frames = len(self.frame_times)
+        span = self.frame_times[-1] - self.frame_times[0] if frames > 1 else 0.0
+        intervals = np.diff(self.feedback_times).tolist() if len(self.feedback_times) > 1 else []
+        return {
+            "session": self.index,
+            "error": self.error,
+            "time_to_first_frame_ms": (self.first_frame - self.offer_sent) * 1000
+            if self.first_frame and self.offer_sent else None,
+            "frames": frames,
+            "delivered_fps": (frames - 1) / span if span > 0 else 0.0,
+            "feedback_messages": len(self.feedback_times),
+            "time_to_first_feedback_ms": (self.feedback_times[0] - self.first_frame) * 1000
+            if self.feedback_times and self.first_frame else None,
+            "feedback_interval_p50_ms": percentile([x * 1000 for x in intervals], 50),
+            "feedback_lag_p95_ms": percentile(self.feedback_lags, 95),
+        }
+
+
+async def run_session(index, args, stop_at):
+    import websockets
+    from aiortc import RTCPeerConnection, RTCSessionDescription
+
+    stats = SessionStats(index)
+    pc = RTCPeerConnection()
+    source, player = make_source_track(args)
+    pc.addTrack(source)
+    consumers = []
+
+    @pc.on("track")
+    def on_track(track):
+        async def consume():
+            while True:
+                try:
+                    await track.recv()
+                except Exception:
+                    return
+                now = time.perf_counter()
+                if stats.first_frame is None:
+                    stats.first_frame = now
+                stats.frame_times.append(now)
+        consumers.append(asyncio.ensure_future(consume()))
+
+    url = f"ws://127.0.0.1:{args.port}/signaling"
+    try:
+        async with websockets.connect(url) as ws:
+            offer = await pc.createOffer()
+            await pc.setLocalDescription(offer)  # Incluye los candidatos ICE en el SDP
+            stats.offer_sent = time.perf_counter()
+            await ws.send(json.dumps({
+                "type": "offer",
+                "sdp": pc.localDescription.sdp,
+                "exercise": args.exercise,
+            }))
+            while time.perf_counter() < stop_at:
+                try:
+                    raw = await asyncio.wait_for(ws.recv(), timeout=max(0.1, stop_at - time.perf_counter()))
+                except asyncio.TimeoutError:
+                    break
+                msg = json.loads(raw)
+                if msg["type"] == "answer":
+                    await pc.setRemoteDescription(RTCSessionDescription(sdp=msg["sdp"], type=msg["type"]))
+                elif msg["type"] == "feedback":
+                    stats.feedback_times.append(time.perf_counter())
+                    if msg.get("frame_time") is not None:
+                        # Frame que completó la ventana -> feedback recibido (no incluye la codificación del cliente)
+                        stats.feedback_lags.append((time.time() - msg["frame_time"]) * 1000)
+            await ws.send(json.dumps({"type": "bye"}))
+    except Exception as e:
+        stats.error = f"{type(e).__name__}: {e}"
+    finally:
+        for task in consumers:
+            task.cancel()
+        source.stop()  # Con MediaPlayer también detiene la decodificación del video
+        await pc.close()
+    return stats
+
+
+async def run_level(sessions, args):
+    start = time.perf_counter()
+    tasks = []
+    for i in range(sessions):
+        stop_at = time.perf_counter() + args.duration
+        tasks.append(asyncio.ensure_future(run_session(i, args, stop_at)))
+        await asyncio.sleep(args.ramp)  # Llegada escalonada, como en el gimnasio
+    results = [stats.summary() for stats in await asyncio.gather(*tasks)]
+    ok = [r for r in results if r["error"] is None and r["frames"] > 0]
+    ttff = [r["time_to_first_frame_ms"] for r in ok if r["time_to_first_frame_ms"] is not None]
+    fps = [r["delivered_fps"] for r in ok]
+    lags = [r["feedback_lag_p95_ms"] for r in ok if r["feedback_lag_p95_ms"] is not None]
+    intervals = [r["feedback_interval_p50_ms"] for r in ok if r["feedback_interval_p50_ms"] is not None]
+    level = {
+        "sessions": sessions,
+        "connected": len(ok),
+        "failed": sessions - len(ok),
+        "wall_seconds": round(time.perf_counter() - start, 2),
+        "time_to_first_frame_ms": {"p50": percentile(ttff, 50), "p95": percentile(ttff, 95)},
+        "delivered_fps": {"p5": percentile(fps, 5), "p50": percentile(fps, 50)},
+        "feedback_lag_ms": {"p95": percentile(lags, 95)},
+        "feedback_interval_ms": {"p50": percentile(intervals, 50)},
+        "session_results": results,
+    }
+    level["within_budget"] = bool(
+        level["failed"] == 0
+        and ttff and level["time_to_first_frame_ms"]["p95"] <= args.first_frame_budget_ms
+        and fps and level["delivered_fps"]["p5"] >= args.min_fps
+        and lags and level["feedback_lag_ms"]["p95"] <= args.feedback_lag_budget_ms
+    )
+    return level
+
+
+def print_level(level):
+    ttff, fps = level["time_to_first_frame_ms"], level["delivered_fps"]
+    fmt = lambda v, spec: format(v, spec) if v is not None else "   -"
+    status = "✅" if level["within_budget"] else "❌"
+    print(f"{status} {level['sessions']:3d} sesiones | conectadas {level['connected']:3d} | "
+          f"primer frame p95 {fmt(ttff['p95'], '7.0f')} ms | FPS p5 {fmt(fps['p5'], '5.1f')} "
+          f"p50 {fmt(fps['p50'], '5.1f')} | feedback lag p95 {fmt(level['feedback_lag_ms']['p95'], '6.0f')} ms")
+
+
+async def main(args):
+    print(f"🚦 Generador de carga contra ws://127.0.0.1:{args.port}/signaling ({args.exercise})")
+    levels = []
+    for sessions in args.sessions:
+        level = await run_level(sessions, args)
+        print_level(level)
+        levels.append(level)
+        if not level["within_budget"] and not args.keep_going:
+            print("⚠️  Presupuesto superado; se detiene el escalado (usar --keep-going para seguir)")
+            break
+        await asyncio.sleep(args.cooldown)
+
+    capacity = max([l["sessions"] for l in levels if l["within_budget"]], default=0)
+    print(f"\n📈 Sesiones simultáneas dentro del presupuesto: {capacity} (primer frame p95 <= "
+          f"{args.first_frame_budget_ms:.0f} ms, FPS p5 >= {args.min_fps:g}, "
+          f"feedback lag p95 <= {args.feedback_lag_budget_ms:.0f} ms)")
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "exercise": args.exercise,
+        "video": os.path.basename(args.video) if args.video else "synthetic",
+        "duration_seconds": args.duration,
+        "budget": {"first_frame_ms": args.first_frame_budget_ms, "min_fps": args.min_fps,
+                   "feedback_lag_ms": args.feedback_lag_budget_ms},
+        "capacity_sessions": capacity,
+        "levels": levels,
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generador de carga WebRTC para /signaling (localhost)")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--video", help="Video a enviar en bucle (por defecto, figura sintética)")
+    parser.add_argument("--exercise", default=os.environ.get("GYMIA_EXERCISE", "peso_muerto"))
+    parser.add_argument("--sessions", default="1,4,8,16,32",
+                        type=lambda s: [int(x) for x in s.split(",") if x])
+    parser.add_argument("--duration", type=float, default=30, help="Segundos por sesión")
+    parser.add_argument("--ramp", type=float, default=0.1, help="Segundos entre el inicio de cada sesión")
+    parser.add_argument("--cooldown", type=float, default=3, help="Pausa entre niveles")
+    parser.add_argument("--first-frame-budget-ms", type=float, default=3000)
+    parser.add_argument("--min-fps", type=float, default=15)
+    parser.add_argument("--feedback-lag-budget-ms", type=float, default=1000,
+                        help="Latencia p95 máxima del feedback desde el frame que completó la ventana")
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    parser.add_argument("--keep-going", action="store_true")
+    parser.add_argument("--output", default="load_results.json")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    results = asyncio.run(main(args))
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"✅ Resultados guardados en {args.output}")
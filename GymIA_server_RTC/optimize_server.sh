@@ -19,7 +19,7 @@ DETECTION_INTERVAL=2
 PREDICTION_INTERVAL=3
 GYMIA_EXERCISE=peso_muerto
 MAX_WORKERS=2
-CACHE_DURATION=0.05
+CACHE_MAX_AGE=0.5
 TARGET_FPS=30
 ENABLE_BATCH_PROCESSING=false
 EOF
@@ -33,7 +33,7 @@ DETECTION_INTERVAL=3
 PREDICTION_INTERVAL=5
 GYMIA_EXERCISE=peso_muerto
 MAX_WORKERS=2
-CACHE_DURATION=0.1
+CACHE_MAX_AGE=1.0
 TARGET_FPS=20
 ENABLE_BATCH_PROCESSING=false
 EOF
@@ -47,7 +47,7 @@ DETECTION_INTERVAL=1
 PREDICTION_INTERVAL=1
 GYMIA_EXERCISE=peso_muerto
 MAX_WORKERS=1
-CACHE_DURATION=0
+CACHE_MAX_AGE=0
 TARGET_FPS=30
 ENABLE_BATCH_PROCESSING=false
 EOF
@@ -61,7 +61,7 @@ DETECTION_INTERVAL=4
 PREDICTION_INTERVAL=8
 GYMIA_EXERCISE=peso_muerto
 MAX_WORKERS=3
-CACHE_DURATION=0.15
+CACHE_MAX_AGE=1.5
 TARGET_FPS=15
 ENABLE_BATCH_PROCESSING=false
 EOF
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Genera variantes int8 / fp16 de los modelos exportados a ONNX (export_models.py)
+y solo las acepta si no empeoran la calidad del feedback.
+
+LSTM: las ventanas de prueba se construyen como en entrenamientolstm*.ipynb
+(CSV de keypoints por clase, ventanas deslizantes de 30/60 timesteps y el 10%
+de prueba de train_test_split con random_state=42). Una variante se acepta si
+la precisión de ninguna clase cae más de --max-drop respecto al modelo float32.
+
+YOLO-Pose: con --images, la variante se compara con el modelo float32 sobre
+esas imágenes (que también calibran la cuantización int8); se acepta si detecta
+a la persona en las mismas imágenes y el error medio de keypoints no supera
+--max-pose-error-px.
+
+El resultado queda en models/quantization.json, con el sha256 del ONNX float32
+evaluado; el servidor solo carga las variantes aceptadas (MODEL_VARIANTS,
+POSE_VARIANT) cuyo ONNX de origen no cambió desde entonces.
+"""
+import argparse
+import glob
+import json
+import os
+import time
+
+import cv2
+import numpy as np
+
+from app.exercises import load_exercise_config
+from app.inference_backends import (
+    QUANTIZATION_REPORT, VARIANTS, CompiledLSTM, CompiledPoseEngine, _letterbox, exported_path,
+    load_session, source_digest, variant_path,
+)
+from app.utils.processing import extract_pose
+from training.dataset import load_windows
+
+EVAL_BATCH = 256
+
+
+# --- Datos de prueba ---
+
+def held_out_windows(data_dir, exercise, timesteps):
+    """Ventanas de prueba de los notebooks; solo esas se copian a memoria"""
+    dataset = load_windows(data_dir, exercise, timesteps)
+    test = dataset.notebook_split()["test"]
+    return dataset.batch(test), dataset.labels[test]
+
+
+def per_class_accuracy(y, predicted, classes):
+    return [float((predicted[y == c] == c).mean()) if (y == c).any() else None for c in range(classes)]
+
+
+# --- Conversión ---
+
+def quantize_int8(source, target, calibration=None):
+    """
+    int8 dinámico (pesos int8, activaciones cuantizadas en ejecución) para los
+    LSTM; estático QDQ con imágenes de calibración para YOLO-Pose.
+    """
+    from onnxruntime.quantization import QuantFormat, QuantType, quantize_dynamic, quantize_static
+
+    if calibration is None:
+        quantize_dynamic(source, target, weight_type=QuantType.QInt8)
+        return
+    quantize_static(source, target, calibration, quant_format=QuantFormat.QDQ, per_channel=True,
+                    activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8)
+
+
+def convert_fp16(source, target):
+    """Pesos y cálculo en float16; entradas y salidas siguen en float32"""
+    import onnx
+    from onnxruntime.transformers.float16 import convert_float_to_float16
+
+    onnx.save(convert_float_to_float16(onnx.load(source), keep_io_types=True), target)
+
+
+class _ImageCalibration:
+    """Lector de calibración de ONNX Runtime: imágenes con el mismo letterbox que la inferencia"""
+
+    def __init__(self, images, input_name, imgsz):
+        self._batches = iter(
+            {input_name: (_letterbox(image, imgsz)[0][..., ::-1].transpose(2, 0, 1)[None] / 255.0).astype(np.float32)}
+            for image in images
+        )
+
+    def get_next(self):
+        return next(self._batches, None)
+
+
+def build_variant(source, variant, calibration=None):
+    target = variant_path(source, variant)
+    if variant == "int8":
+        quantize_int8(exported_path(source, "onnx"), target, calibration)
+    else:
+        convert_fp16(exported_path(source, "onnx"), target)
+    return target
+
+
+# --- Control de precisión ---
+
+def evaluate_lstm(model, X):
+    return np.concatenate([
+        np.asarray(model.predict_on_batch(X[i:i + EVAL_BATCH])).argmax(axis=1) for i in range(0, len(X), EVAL_BATCH)
+    ])
+
+
+def gate_lstm(path, variant, X, y, classes, max_drop, threads):
+    float32 = CompiledLSTM(load_session(exported_path(path, "onnx"), "onnx", threads))
+    quantized = CompiledLSTM(load_session(variant_path(path, variant), "onnx", threads))
+    reference = per_class_accuracy(y, evaluate_lstm(float32, X), classes)
+    start = time.perf_counter()
+    candidate = per_class_accuracy(y, evaluate_lstm(quantized, X), classes)
+    seconds = time.perf_counter() - start
+    drops = [round(r - c, 4) for r, c in zip(reference, candidate) if r is not None]
+    accepted = max(drops) <= max_drop
+    entry = {
+        "accepted": accepted,
+        "file": os.path.basename(variant_path(path, variant)),
+        "source_sha256": source_digest(path),
+        "windows": int(len(X)),
+        "max_drop": max_drop,
+        "float32_accuracy": reference,
+        "accuracy": candidate,
+        "accuracy_drop": drops,
+        "windows_per_second": round(len(X) / seconds, 1),
+    }
+    if not accepted:
+        entry["reason"] = f"la precisión de una clase cae {max(drops):.2%} (máximo {max_drop:.2%})"
+    return entry
+
+
+def gate_pose(weights, variant, images, max_error_px, max_drop, threads):
+    reference = CompiledPoseEngine(weights, "onnx", threads)
+    candidate = CompiledPoseEngine(weights, "onnx", threads, variant=variant)
+    agree, errors = 0, []
+    for image in images:
+        expected = extract_pose(reference.predict(image)[0], render=False)
+        found = extract_pose(candidate.predict(image)[0], render=False)
+        if (expected is None) == (found is None):
+            agree += 1
+        if expected is not None and found is not None:
+            visible = (expected[1] != 0).any(axis=1) & (found[1] != 0).any(axis=1)
+            if visible.any():
+                errors.append(float(np.abs(found[1][visible] - expected[1][visible]).mean()))
+    agreement = agree / len(images)
+    mean_error = float(np.mean(errors)) if errors else 0.0
+    accepted = agreement >= 1.0 - max_drop and mean_error <= max_error_px
+    entry = {
+        "accepted": accepted,
+        "file": os.path.basename(variant_path(weights, variant)),
+        "source_sha256": source_digest(weights),
+        "images": len(images),
+        "detection_agreement": round(agreement, 4),
+        "mean_keypoint_error_px": round(mean_error, 2),
+        "max_keypoint_error_px": max_error_px,
+    }
+    if not accepted:
+        entry["reason"] = (f"detección coincide en {agreement:.1%} de las imágenes y el error medio "
+                           f"es {mean_error:.1f} px (máximo {max_error_px} px)")
+    return entry
+
+
+def save_report(report_path, entries):
+    """Actualiza el reporte junto a los modelos: otros modelos y variantes se conservan"""
+    try:
+        with open(report_path, encoding="utf-8") as f:
+            report = json.load(f)
+    except (OSError, ValueError):
+        report = {}
+    for path, variants in entries.items():
+        report.setdefault(os.path.basename(path), {}).update(variants)
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data-dir", help="Dataset binario (training.dataset) o carpeta con los CSV por clase (dataset_imagenes)")
+    parser.add_argument("--exercises", default=None, help="Lista separada por comas (por defecto todos)")
+    parser.add_argument("--variants", default=",".join(VARIANTS), help="int8, fp16")
+    parser.add_argument("--max-drop", type=float, default=0.01, help="Caída máxima de precisión por clase (0.01 = 1 punto)")
+    parser.add_argument("--weights", default="models/yolo11n-pose.pt")
+    parser.add_argument("--images", help="Carpeta de imágenes para calibrar y validar YOLO-Pose")
+    parser.add_argument("--max-pose-error-px", type=float, default=3.0)
+    parser.add_argument("--threads", type=int, default=0, help="Hilos de ONNX Runtime para la evaluación")
+    args = parser.parse_args()
+
+    variants = [v.strip() for v in args.variants.split(",") if v.strip()]
+    for variant in variants:
+        if variant not in VARIANTS:
+            parser.error(f"Variante desconocida: {variant}")
+    if not args.data_dir and not args.images:
+        parser.error("Indicar --data-dir (LSTM) y/o --images (YOLO-Pose)")
+
+    exercises = load_exercise_config()
+    selected = args.exercises.split(",") if args.exercises else list(exercises)
+    report = {}
+    rejected = 0
+
+    if args.data_dir:
+        for exercise in selected:
+            cfg = exercises[exercise]
+            path = cfg["model_path"]
+            if not os.path.isfile(exported_path(path, "onnx")):
+                print(f"⏭️  {exercise}: falta {exported_path(path, 'onnx')} (ejecutar export_models.py)")
+                continue
+            X, y = held_out_windows(args.data_dir, exercise, cfg["timesteps"])
+            print(f"\n📊 {exercise}: {len(X)} ventanas de prueba de {cfg['timesteps']} timesteps")
+            for variant in variants:
+                build_variant(path, variant)
+                entry = gate_lstm(path, variant, X, y, len(cfg["class_labels"]), args.max_drop, args.threads)
+                report.setdefault(path, {})[variant] = entry
+                rejected += not entry["accepted"]
+                for label, before, after in zip(cfg["class_labels"], entry["float32_accuracy"], entry["accuracy"]):
+                    print(f"   {variant:5s} {label:24s} {before:.3f} -> {after:.3f}")
+                print(f"   {'✅ aceptada' if entry['accepted'] else '❌ ' + entry['reason']} "
+                      f"({entry['windows_per_second']} ventanas/s)")
+
+    if args.images:
+        files = sorted(f for ext in ("jpg", "jpeg", "png") for f in glob.glob(os.path.join(args.images, f"*.{ext}")))
+        images = [img for img in (cv2.imread(f) for f in files) if img is not None]
+        if not images:
+            print(f"⏭️  YOLO-Pose: no hay imágenes en {args.images}")
+        elif not os.path.isfile(exported_path(args.weights, "onnx")):
+            print(f"⏭️  YOLO-Pose: falta {exported_path(args.weights, 'onnx')} (ejecutar export_models.py)")
+        else:
+            print(f"\n📊 YOLO-Pose: {len(images)} imágenes")
+            for variant in variants:
+                calibration = None
+                if variant == "int8":
+                    input_name = load_session(exported_path(args.weights, "onnx"), "onnx").input.name
+                    calibration = _ImageCalibration(images, input_name, 640)
+                build_variant(args.weights, variant, calibration)
+                entry = gate_pose(args.weights, variant, images, args.max_pose_error_px, args.max_drop, args.threads)
+                report.setdefault(args.weights, {})[variant] = entry
+                rejected += not entry["accepted"]
+                print(f"   {variant:5s} {'✅ aceptada' if entry['accepted'] else '❌ ' + entry['reason']} "
+                      f"(error medio {entry['mean_keypoint_error_px']} px)")
+
+    for report_path in sorted({os.path.join(os.path.dirname(path), QUANTIZATION_REPORT) for path in report}):
+        save_report(report_path, {path: entries for path, entries in report.items()
+                                  if os.path.join(os.path.dirname(path), QUANTIZATION_REPORT) == report_path})
+        print(f"\n📝 Reporte en {report_path} ({rejected} variantes rechazadas)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Test de paridad entre los backends de inferencia: compara las salidas de los
+modelos exportados (ONNX Runtime / OpenVINO) con las de Keras y ultralytics.
+
+- LSTM: probabilidades por clase sobre ventanas aleatorias (semilla fija),
+  dentro de LSTM_ATOL y con la misma clase ganadora.
+- YOLO-Pose: keypoints de la persona principal de una imagen de prueba,
+  dentro de POSE_ATOL_PX píxeles.
+- YOLO-Pose sin personas: una salida sin filas sobre el umbral y un frame
+  negro deben dar un resultado vacío, no un error.
+
+Los backends o archivos exportados que falten se omiten (ver export_models.py).
+"""
+
+import argparse
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from app.exercises import load_exercise_config
+from app.inference_backends import _postprocess, available_backends, exported_path, make_lstm_loader, make_pose_engine
+from app.utils.processing import extract_pose
+
+LSTM_ATOL = 1e-4
+POSE_ATOL_PX = 2.0
+FEATURES = 34
+
+
+def _skip(message):
+    print(f"⏭️  {message}")
+    return True
+
+
+def check_lstm_parity(backends, windows):
+    """Probabilidades LSTM de cada ejercicio: Keras vs modelos exportados"""
+    try:
+        from keras.models import load_model
+    except ImportError:
+        return _skip("LSTM: Keras no está instalado")
+
+    rng = np.random.default_rng(0)
+    all_passed = True
+    for exercise, cfg in load_exercise_config().items():
+        path = cfg["model_path"]
+        x = rng.random((windows, cfg["timesteps"], FEATURES), dtype=np.float32)
+        reference = np.asarray(load_model(path).predict_on_batch(x))
+        for backend in backends:
+            if not os.path.isfile(exported_path(path, backend)):
+                _skip(f"LSTM {exercise} ({backend}): falta {exported_path(path, backend)}")
+                continue
+            output = np.asarray(make_lstm_loader(backend)(path).predict_on_batch(x))
+            error = float(np.abs(output - reference).max())
+            same_class = bool((output.argmax(axis=1) == reference.argmax(axis=1)).all())
+            ok = error <= LSTM_ATOL and same_class
+            all_passed &= ok
+            print(f"{'✅' if ok else '❌'} LSTM {exercise} ({backend}): error máximo {error:.2e}, "
+                  f"misma clase: {'sí' if same_class else 'no'}")
+    return all_passed
+
+
+def check_pose_parity(backends, weights, image_path):
+    """Keypoints de la persona principal: ultralytics vs modelos exportados"""
+    try:
+        import cv2
+        from app.pose_engine import PoseEngine
+        from ultralytics.utils import ASSETS
+    except ImportError:
+        return _skip("YOLO-Pose: ultralytics no está instalado")
+
+    image = cv2.imread(image_path or str(ASSETS / "bus.jpg"))
+    if image is None:
+        return _skip(f"YOLO-Pose: no se pudo leer la imagen {image_path}")
+
+    reference = extract_pose(PoseEngine(weights).predict([image])[0], render=False)
+    if reference is None:
+        return _skip("YOLO-Pose: la imagen de prueba no tiene personas")
+
+    all_passed = True
+    for backend in backends:
+        if not os.path.isfile(exported_path(weights, backend)):
+            _skip(f"YOLO-Pose ({backend}): falta {exported_path(weights, backend)}")
+            continue
+        result = extract_pose(make_pose_engine(weights, backend, variant="").predict([image])[0], render=False)
+        if result is None:
+            print(f"❌ YOLO-Pose ({backend}): no detectó a la persona")
+            all_passed = False
+            continue
+        # Solo keypoints visibles en ambos (los ocultos se reportan en (0, 0))
+        visible = (reference[1] != 0).any(axis=1) & (result[1] != 0).any(axis=1)
+        error = float(np.abs(result[1][visible] - reference[1][visible]).max()) if visible.any() else 0.0
+        ok = error <= POSE_ATOL_PX
+        all_passed &= ok
+        print(f"{'✅' if ok else '❌'} YOLO-Pose ({backend}): error máximo {error:.2f} px "
+              f"en {int(visible.sum())} keypoints")
+    return all_passed
+
+
+def _is_empty(result):
+    return len(result.boxes.conf) == 0 and result.keypoints.xy.shape[1:] == (17, 2) \
+        and extract_pose(result, render=False) is None
+
+
+def check_no_person(backends, weights):
+    """Sin detecciones sobre el umbral: resultado vacío en el postproceso y en cada backend"""
+    image = np.zeros((480, 640, 3), dtype=np.uint8)
+    prediction = np.zeros((56, 8400), dtype=np.float32)  # Todas las confianzas en 0
+    try:
+        ok = _is_empty(_postprocess(prediction, image, 1.0, (0, 80)))
+    except ValueError as e:
+        print(f"❌ Postproceso sin filas: {e}")
+        ok = False
+    else:
+        print(f"{'✅' if ok else '❌'} Postproceso sin filas sobre el umbral")
+    all_passed = ok
+
+    for backend in backends:
+        if not os.path.isfile(exported_path(weights, backend)):
+            _skip(f"YOLO-Pose sin personas ({backend}): falta {exported_path(weights, backend)}")
+            continue
+        try:
+            ok = _is_empty(make_pose_engine(weights, backend, variant="").predict([image])[0])
+        except ValueError as e:
+            print(f"❌ YOLO-Pose sin personas ({backend}): {e}")
+            ok = False
+        else:
+            print(f"{'✅' if ok else '❌'} YOLO-Pose sin personas ({backend}): frame negro")
+        all_passed &= ok
+    return all_passed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", default=None, help="Lista separada por comas (por defecto los instalados)")
+    parser.add_argument("--weights", default="models/yolo11n-pose.pt")
+    parser.add_argument("--image", default=None, help="Imagen de prueba (por defecto bus.jpg de ultralytics)")
+    parser.add_argument("--windows", type=int, default=16)
+    args = parser.parse_args()
+
+    backends = args.backends.split(",") if args.backends else [b for b in available_backends() if b != "native"]
+
+    print("🔍 PARIDAD DE BACKENDS DE INFERENCIA")
+    print("=" * 60)
+    if not backends:
+        _skip("No hay backends compilados instalados (onnxruntime, openvino)")
+        sys.exit(0)
+
+    print("\n1. LSTM:")
+    lstm_ok = check_lstm_parity(backends, args.windows)
+
+    print("\n2. YOLO-POSE:")
+    pose_ok = check_pose_parity(backends, args.weights, args.image)
+
+    print("\n3. YOLO-POSE SIN PERSONAS:")
+    pose_ok &= check_no_person(backends, args.weights)
+
+    print("\n" + "=" * 60)
+    if lstm_ok and pose_ok:
+        print("🎉 LOS BACKENDS COINCIDEN")
+        sys.exit(0)
+    print("❌ HAY DIFERENCIAS FUERA DE TOLERANCIA")
+    sys.exit(1)
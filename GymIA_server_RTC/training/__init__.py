@@ -0,0 +1,7 @@
+# server_project/training/__init__.py
+
+"""
+Herramientas para preparar datos y reentrenar los LSTM fuera de los notebooks.
+Las ventanas se leen como vistas sobre los keypoints crudos (`windows`) y
+`train_lstm` entrena los modelos con tf.data.
+"""
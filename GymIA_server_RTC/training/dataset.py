@@ -0,0 +1,227 @@
+# Dataset binario de keypoints: arreglos .npy por ejercicio y un manifest JSON
+# Se abre con memory mapping: cargar es leer el manifest, los frames se leen del disco al usarlos
+#
+# Uso:
+#   python -m training.dataset convert /ruta/dataset_imagenes dataset/
+#   python -m training.dataset info dataset/
+
+import argparse
+import json
+import os
+import re
+
+import numpy as np
+
+from training.windows import DATASET_FILES, FEATURES, WindowDataset, load_keypoints_csv
+
+MANIFEST = "manifest.json"
+FORMAT = "gymia-keypoints"
+FORMAT_VERSION = 1
+# Arreglos por ejercicio, una fila por frame y las secuencias una detrás de otra
+ARRAYS = {
+    "keypoints": np.float32,  # (filas, 34) keypoints normalizados (xyn)
+    "sequence": np.int32,     # Id de la secuencia (serie) de cada fila
+    "frame": np.int32,        # Índice del frame dentro de su secuencia
+}
+
+
+def _atomic_save(path, array):
+    tmp = path + ".tmp.npy"
+    np.save(tmp, array)
+    os.replace(tmp, path)
+
+
+def read_manifest(root):
+    path = os.path.join(root, MANIFEST)
+    if not os.path.isfile(path):
+        return {"format": FORMAT, "version": FORMAT_VERSION, "features": FEATURES, "exercises": {}}
+    with open(path) as f:
+        manifest = json.load(f)
+    if manifest.get("format") != FORMAT or manifest.get("version", 0) > FORMAT_VERSION:
+        raise ValueError(f"{path} no es un dataset {FORMAT} v{FORMAT_VERSION}")
+    return manifest
+
+
+def write_exercise(root, exercise, classes, sequences):
+    """
+    Guarda (o reemplaza) los datos de un ejercicio. `sequences` son dicts con
+    `name`, `label` (índice en `classes`), `keypoints` (frames, 34) y
+    opcionalmente `frame` (índice de cada frame en la serie original).
+    """
+    os.makedirs(root, exist_ok=True)
+    table, keypoints, sequence_ids, frames = [], [], [], []
+    start = 0
+    for seq_id, seq in enumerate(sequences):
+        kps = np.asarray(seq["keypoints"], dtype=np.float32).reshape(-1, FEATURES)
+        frame = seq.get("frame")
+        frame = np.arange(len(kps), dtype=np.int32) if frame is None else np.asarray(frame, dtype=np.int32)
+        table.append({"id": seq_id, "name": seq["name"], "label": int(seq["label"]), "start": start, "length": len(kps)})
+        keypoints.append(kps)
+        sequence_ids.append(np.full(len(kps), seq_id, dtype=np.int32))
+        frames.append(frame)
+        start += len(kps)
+
+    arrays = {
+        "keypoints": np.concatenate(keypoints) if keypoints else np.empty((0, FEATURES), dtype=np.float32),
+        "sequence": np.concatenate(sequence_ids) if sequence_ids else np.empty(0, dtype=np.int32),
+        "frame": np.concatenate(frames) if frames else np.empty(0, dtype=np.int32),
+    }
+    # Cada escritura usa nombres nuevos (`<ejercicio>.<arreglo>.<revisión>.npy`): los archivos
+    # del manifest actual no se tocan hasta que el nuevo manifest los reemplaza
+    manifest = read_manifest(root)
+    previous = manifest["exercises"].get(exercise, {})
+    revision = previous.get("revision", 0) + 1
+    files = {}
+    for name, array in arrays.items():
+        files[name] = f"{exercise}.{name}.{revision}.npy"
+        _atomic_save(os.path.join(root, files[name]), array.astype(ARRAYS[name], copy=False))
+
+    # El manifest se escribe al final: un ejercicio a medio convertir no queda referenciado
+    manifest["exercises"][exercise] = {"classes": list(classes), "rows": start, "revision": revision,
+                                       "files": files, "sequences": table}
+    tmp = os.path.join(root, MANIFEST + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, os.path.join(root, MANIFEST))
+
+    # Los arreglos de la revisión anterior ya no están referenciados (en Linux, un memmap
+    # abierto sobre ellos sigue leyendo el archivo borrado)
+    for old in previous.get("files", {}).values():
+        if old not in files.values():
+            try:
+                os.remove(os.path.join(root, old))
+            except FileNotFoundError:
+                pass
+    return manifest["exercises"][exercise]
+
+
+class KeypointDataset:
+    """Dataset abierto con memory mapping; los arreglos son de solo lectura"""
+
+    def __init__(self, root):
+        self.root = root
+        self.manifest = read_manifest(root)
+        if not self.manifest["exercises"]:
+            raise FileNotFoundError(f"No hay un dataset en {root} ({MANIFEST})")
+        self._arrays = {}
+
+    @property
+    def exercises(self):
+        return list(self.manifest["exercises"])
+
+    def info(self, exercise):
+        return self.manifest["exercises"][exercise]
+
+    def array(self, exercise, name):
+        key = (exercise, name)
+        if key not in self._arrays:
+            path = os.path.join(self.root, self.info(exercise)["files"][name])
+            self._arrays[key] = np.load(path, mmap_mode="r")
+        return self._arrays[key]
+
+    def keypoints(self, exercise):
+        return self.array(exercise, "keypoints")
+
+    def sequences(self, exercise):
+        return self.info(exercise)["sequences"]
+
+    def windows(self, exercise, timesteps):
+        """WindowDataset sobre el memmap del ejercicio (una secuencia por serie, sin copiar)"""
+        table = self.sequences(exercise)
+        return WindowDataset(self.keypoints(exercise), [s["length"] for s in table],
+                             [s["label"] for s in table], timesteps)
+
+
+def load_windows(path, exercise, timesteps):
+    """Ventanas de un dataset binario (carpeta con manifest.json) o de la carpeta de CSV de los notebooks"""
+    if os.path.isfile(os.path.join(path, MANIFEST)):
+        return KeypointDataset(path).windows(exercise, timesteps)
+    return WindowDataset.from_csv(path, exercise, timesteps)
+
+
+# --- Conversión desde los CSV ---
+
+def _frame_number(image, fallback):
+    """Número de frame del nombre de la imagen (columna1_correcto_000053.jpg -> 53)"""
+    match = re.search(r"(\d+)\D*$", image)
+    return int(match.group(1)) if match else fallback
+
+
+def sequences_from_parts(parts_dir, label):
+    """Una secuencia por serie, desde la carpeta .parts de training.extract_keypoints"""
+    sequences = []
+    for name in sorted(os.listdir(parts_dir)):
+        if not name.endswith(".csv"):
+            continue
+        with open(os.path.join(parts_dir, name)) as f:
+            next(f)
+            rows = [line.rstrip("\n").split(",") for line in f if line.strip()]
+        sequences.append({
+            "name": name[:-len(".csv")],
+            "label": label,
+            "keypoints": np.array([row[1:] for row in rows], dtype=np.float32).reshape(-1, FEATURES),
+            "frame": np.array([_frame_number(row[0], i) for i, row in enumerate(rows)], dtype=np.int32),
+        })
+    return sequences
+
+
+def convert_exercise(source, target, exercise):
+    """
+    Convierte los archivos de DATASET_FILES de `source`. Si junto a un CSV
+    está su carpeta .parts (training.extract_keypoints), se usa para conservar
+    los límites entre series; si no, el CSV completo es una sola secuencia.
+    """
+    sequences = []
+    for label, name in enumerate(DATASET_FILES[exercise]):
+        csv_path = os.path.join(source, f"{name}.txt")
+        parts_dir = csv_path + ".parts"
+        if os.path.isdir(parts_dir):
+            sequences.extend(sequences_from_parts(parts_dir, label))
+        elif os.path.isfile(csv_path):
+            sequences.append({"name": name, "label": label, "keypoints": load_keypoints_csv(csv_path)})
+        else:
+            raise FileNotFoundError(f"No existe {csv_path}")
+    return write_exercise(target, exercise, DATASET_FILES[exercise], sequences)
+
+
+def print_info(root):
+    dataset = KeypointDataset(root)
+    for exercise in dataset.exercises:
+        info = dataset.info(exercise)
+        labels = np.array([s["label"] for s in info["sequences"]], dtype=np.int64)
+        lengths = np.array([s["length"] for s in info["sequences"]], dtype=np.int64)
+        print(f"📊 {exercise}: {info['rows']} frames en {len(lengths)} secuencias")
+        for label, name in enumerate(info["classes"]):
+            mask = labels == label
+            print(f"   {label} {name:24s} {int(lengths[mask].sum()):7d} frames, {int(mask.sum())} secuencias")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dataset binario de keypoints (.npy + manifest.json)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    convert = commands.add_parser("convert", help="Convierte los CSV de los notebooks")
+    convert.add_argument("source", help="Carpeta con los CSV por clase (dataset_imagenes)")
+    convert.add_argument("target", help="Carpeta del dataset binario")
+    convert.add_argument("--exercises", default=None, help="Lista separada por comas (por defecto todos)")
+    info = commands.add_parser("info", help="Resumen por ejercicio y clase")
+    info.add_argument("target")
+    args = parser.parse_args()
+
+    if args.command == "convert":
+        exercises = args.exercises.split(",") if args.exercises else list(DATASET_FILES)
+        for exercise in exercises:
+            try:
+                entry = convert_exercise(args.source, args.target, exercise)
+            except FileNotFoundError as e:
+                print(f"⏭️  {exercise}: {e}")
+                continue
+            print(f"✅ {exercise}: {entry['rows']} frames, {len(entry['sequences'])} secuencias")
+    if not os.path.isfile(os.path.join(args.target, MANIFEST)):
+        print(f"⚠️  No hay un dataset en {args.target} ({MANIFEST})")
+        return 1
+    print_info(args.target)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
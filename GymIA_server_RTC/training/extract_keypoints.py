@@ -0,0 +1,249 @@
+# Extracción de keypoints para entrenamiento (reemplaza los bucles de Procesamiento.ipynb)
+# Carpetas de imágenes -> CSV de los notebooks, con varios procesos y retomable por carpeta
+#
+# Uso:
+#   python -m training.extract_keypoints /ruta/peso_muerto/extension_correcto dataset_imagenes/extension_correctos.txt
+
+import argparse
+import collections
+import concurrent.futures
+import multiprocessing
+import os
+import time
+
+import cv2
+import numpy as np
+
+from app.offline_analysis import iter_batches
+from app.utils.pose_tracking import PoseTracker
+from app.utils.processing import extract_pose
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+PARTS_SUFFIX = ".parts"  # Carpeta junto al CSV con un archivo terminado por carpeta de imágenes
+FEATURES = 34
+
+# Motor YOLO-Pose y cache del proceso (uno por worker, no uno por carpeta)
+_ENGINE = None
+_CACHE = None
+_DECODE_THREADS = 2
+
+
+def list_images(folder):
+    return sorted(name for name in os.listdir(folder) if name.lower().endswith(IMAGE_EXTENSIONS))
+
+
+def list_folders(root):
+    """Subcarpetas con imágenes (una secuencia cada una); `root` mismo si tiene imágenes sueltas"""
+    folders = [os.path.join(root, name) for name in sorted(os.listdir(root))
+               if os.path.isdir(os.path.join(root, name))]
+    folders = [folder for folder in folders if list_images(folder)]
+    if list_images(root):
+        folders.insert(0, root)
+    return folders
+
+
+def part_path(output, folder, root):
+    name = os.path.relpath(folder, root).replace(os.sep, "__")
+    return os.path.join(output + PARTS_SUFFIX, ("_raiz" if name == "." else name) + ".csv")
+
+
+def load_image(path, cache=None):
+    """
+    (digest, resultado cacheado, imagen): con cache, una imagen ya procesada
+    por el mismo modelo no se decodifica. Sin cache, solo la imagen.
+    """
+    if cache is None:
+        return None, None, cv2.imread(path)
+    digest, data = cache.digest(path)
+    cached = cache.get(digest)
+    if cached is not None:
+        return digest, cached, None
+    if data is None:
+        with open(path, "rb") as f:
+            data = f.read()
+    return digest, None, cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+
+def iter_decoded(paths, executor, prefetch, cache=None):
+    """
+    Imágenes decodificadas en hilos (cv2 libera el GIL), hasta `prefetch`
+    por delante de la inferencia y en el orden de `paths`.
+    """
+    pending = collections.deque()
+    for path in paths:
+        pending.append((path, executor.submit(load_image, path, cache)))
+        if len(pending) >= prefetch:
+            path, future = pending.popleft()
+            yield path, future.result()
+    while pending:
+        path, future = pending.popleft()
+        yield path, future.result()
+
+
+def extract_folder(engine, folder, target, batch_size=16, prefetch=64, decode_threads=2, cache=None):
+    """
+    Keypoints normalizados (xyn) de la persona seguida en cada imagen de la
+    carpeta, en orden de nombre. Las filas se escriben a medida que salen de
+    cada lote en `target`.tmp, que se renombra a `target` al terminar: un
+    archivo `target` existente es una carpeta completa.
+
+    Con `cache` (FeatureCache), YOLO-Pose solo procesa las imágenes que no
+    están en el cache; la selección de la persona se repite igual sobre las
+    detecciones cacheadas.
+    """
+    images = list_images(folder)
+    tracker = PoseTracker()  # La persona se sigue dentro de la carpeta, como track(persist=True)
+    rows = unreadable = cached = 0
+    start = time.perf_counter()
+    tmp = target + ".tmp"
+    with open(tmp, "w") as out, \
+            concurrent.futures.ThreadPoolExecutor(max_workers=decode_threads, thread_name_prefix="decode") as executor:
+        out.write("image," + ",".join(str(i) for i in range(FEATURES)) + "\n")
+        decoded = iter_decoded((os.path.join(folder, name) for name in images), executor, prefetch, cache)
+        for batch in iter_batches(decoded, batch_size):
+            unreadable += sum(result is None and img is None for _, (_, result, img) in batch)
+            batch = [(path, digest, result, img) for path, (digest, result, img) in batch
+                     if result is not None or img is not None]
+            results = [result for _, _, result, _ in batch]
+            missing = [i for i, result in enumerate(results) if result is None]
+            if missing:
+                detected = engine.predict([batch[i][3] for i in missing])
+                for i, result in zip(missing, detected):
+                    results[i] = result
+                if cache is not None:
+                    cache.put_many((batch[i][1], result) for i, result in zip(missing, detected))
+            cached += len(batch) - len(missing)
+            for (path, *_), result in zip(batch, results):
+                pose = extract_pose(result, tracker, render=False)
+                if pose is None:
+                    continue  # Sin persona: se omite, como en el notebook
+                out.write(os.path.basename(path) + "," + ",".join(f"{v:.9g}" for v in pose[0]) + "\n")
+                rows += 1
+            out.flush()
+    if cache is not None:
+        cache.commit()
+    os.replace(tmp, target)
+    return {"folder": folder, "images": len(images), "rows": rows, "unreadable": unreadable, "cached": cached,
+            "seconds": time.perf_counter() - start}
+
+
+def _init_worker(weights, backend, threads, decode_threads, cache_path=None):
+    """Carga YOLO-Pose (y abre el cache) una vez por proceso, con `threads` hilos de inferencia"""
+    global _ENGINE, _CACHE, _DECODE_THREADS
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    cv2.setNumThreads(1)  # Los hilos de decodificación ya reparten cv2 entre núcleos
+
+    from app.inference_backends import make_pose_engine
+
+    _ENGINE = make_pose_engine(weights, backend, threads=threads)
+    _ENGINE.load()
+    _DECODE_THREADS = decode_threads
+    if cache_path:
+        from training.feature_cache import FeatureCache, model_identity
+
+        _CACHE = FeatureCache(cache_path, model_identity(_ENGINE))
+
+
+def _extract_in_worker(folder, target, batch_size, prefetch):
+    return extract_folder(_ENGINE, folder, target, batch_size, prefetch, _DECODE_THREADS, _CACHE)
+
+
+def merge_parts(parts, output):
+    """CSV de los notebooks (índice + 34 columnas) con las carpetas en orden, escrito de forma atómica"""
+    tmp = output + ".tmp"
+    index = 0
+    with open(tmp, "w") as out:
+        out.write("," + ",".join(str(i) for i in range(FEATURES)) + "\n")
+        for part in parts:
+            with open(part) as f:
+                next(f)  # Encabezado
+                for line in f:
+                    out.write(f"{index}," + line.split(",", 1)[1])
+                    index += 1
+    os.replace(tmp, output)
+    return index
+
+
+def run(root, output, weights="models/yolo11n-pose.pt", backend=None, workers=None, batch_size=16,
+        prefetch=64, decode_threads=2, cache_path=None, refresh=False):
+    """
+    Extrae todas las carpetas pendientes de `root` y arma el CSV; devuelve la
+    cantidad de filas. `refresh` vuelve a extraer también las terminadas (con
+    `cache_path`, YOLO-Pose solo corre sobre las imágenes nuevas o cambiadas).
+    """
+    folders = list_folders(root)
+    if not folders:
+        raise FileNotFoundError(f"No hay imágenes en {root}")
+    os.makedirs(output + PARTS_SUFFIX, exist_ok=True)
+    targets = {folder: part_path(output, folder, root) for folder in folders}
+    pending = [folder for folder in folders if refresh or not os.path.isfile(targets[folder])]
+    print(f"📂 {root}: {len(folders)} carpetas, "
+          + ("se vuelven a extraer todas" if refresh else f"{len(folders) - len(pending)} ya extraídas"))
+
+    cpus = os.cpu_count() or 1
+    workers = max(1, cpus // 2) if workers is None else workers
+    threads = max(1, cpus // max(workers, 1))
+    start = time.perf_counter()
+    done = collections.Counter()
+
+    def report(stats):
+        done.update(images=stats["images"], rows=stats["rows"], cached=stats["cached"], folders=1)
+        rate = stats["images"] / max(stats["seconds"], 1e-9)
+        print(f"✅ [{done['folders']}/{len(pending)}] {os.path.relpath(stats['folder'], root)}: "
+              f"{stats['rows']}/{stats['images']} imágenes con persona ({rate:.1f} img/s)"
+              + (f", {stats['cached']} del cache" if cache_path else "")
+              + (f", {stats['unreadable']} ilegibles" if stats["unreadable"] else ""))
+
+    if pending and workers == 0:
+        # En este proceso (depuración o GPU)
+        _init_worker(weights, backend, threads, decode_threads, cache_path)
+        for folder in pending:
+            report(_extract_in_worker(folder, targets[folder], batch_size, prefetch))
+    elif pending:
+        context = multiprocessing.get_context("spawn")
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers, mp_context=context, initializer=_init_worker,
+            initargs=(weights, backend, threads, decode_threads, cache_path),
+        ) as pool:
+            futures = [pool.submit(_extract_in_worker, folder, targets[folder], batch_size, prefetch)
+                       for folder in pending]
+            for future in concurrent.futures.as_completed(futures):
+                report(future.result())
+
+    if pending:
+        elapsed = time.perf_counter() - start
+        print(f"⏱️  {done['images']} imágenes en {elapsed:.1f}s ({done['images'] / max(elapsed, 1e-9):.1f} img/s)")
+        if cache_path:
+            print(f"📦 Cache: {done['cached']}/{done['images']} imágenes sin YOLO-Pose "
+                  f"({done['cached'] / max(done['images'], 1):.0%} de aciertos)")
+    rows = merge_parts([targets[folder] for folder in folders], output)
+    print(f"📝 {output}: {rows} filas")
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extracción de keypoints de carpetas de imágenes al CSV de entrenamiento")
+    parser.add_argument("root", help="Carpeta de una clase, con una subcarpeta de imágenes por serie")
+    parser.add_argument("output", help="CSV de salida (p. ej. dataset_imagenes/extension_correctos.txt)")
+    parser.add_argument("--weights", default="models/yolo11n-pose.pt")
+    parser.add_argument("--backend", default=None, help="native, onnx, openvino o auto (por defecto INFERENCE_BACKEND)")
+    parser.add_argument("--workers", type=int, default=None, help="Procesos (por defecto la mitad de los núcleos; 0 = este proceso)")
+    parser.add_argument("--batch", type=int, default=16, help="Imágenes por llamada a YOLO-Pose")
+    parser.add_argument("--prefetch", type=int, default=64, help="Imágenes decodificadas por delante de la inferencia")
+    parser.add_argument("--decode-threads", type=int, default=2, help="Hilos de decodificación por proceso")
+    parser.add_argument("--cache", default=None, help="Cache SQLite de detecciones por imagen y modelo (training.feature_cache)")
+    parser.add_argument("--refresh", action="store_true", help="Volver a extraer también las series ya terminadas")
+    args = parser.parse_args()
+
+    run(args.root, args.output, args.weights, args.backend, args.workers, args.batch, args.prefetch,
+        args.decode_threads, args.cache, args.refresh)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,225 @@
+# Cache persistente de detecciones YOLO-Pose por contenido de imagen y modelo
+# Al re-extraer un dataset, YOLO solo corre sobre imágenes nuevas, cambiadas o con otro modelo
+#
+# Uso:
+#   python -m training.extract_keypoints ... --cache keypoints_cache.sqlite
+#   python -m training.feature_cache stats keypoints_cache.sqlite
+#   python -m training.feature_cache prune keypoints_cache.sqlite --keep-model <modelo>
+
+import argparse
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from app.inference_backends import PoseResult
+from app.utils.processing import _numpy
+
+KEYPOINTS = 17
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS poses (
+    digest TEXT NOT NULL,        -- sha256 del archivo de imagen
+    model TEXT NOT NULL,         -- model_identity() del YOLO-Pose que la procesó
+    height INTEGER NOT NULL,
+    width INTEGER NOT NULL,
+    persons INTEGER NOT NULL,
+    boxes BLOB NOT NULL,         -- float32 (personas, 5): xyxy + confianza
+    keypoints BLOB NOT NULL,     -- float32 (personas, 17, 3): x, y en píxeles + confianza
+    created REAL NOT NULL,
+    PRIMARY KEY (digest, model)
+);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,       -- Ruta absoluta de la imagen
+    digest TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS files_digest ON files (digest);
+"""
+
+
+def _file_digest(paths):
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def model_identity(engine):
+    """
+    Identidad del YOLO-Pose: archivo que se ejecuta (pesos, exportado o
+    variante), backend y hash de su contenido. Cambiar los pesos invalida el cache.
+    """
+    path = getattr(engine, "path", engine.weights)
+    backend = getattr(engine, "backend", "native")
+    files = [path]
+    if path.endswith(".xml") and os.path.isfile(os.path.splitext(path)[0] + ".bin"):
+        files.append(os.path.splitext(path)[0] + ".bin")  # Pesos de OpenVINO
+    return f"{os.path.basename(path)}:{backend}:{_file_digest(files)[:16]}"
+
+
+def result_arrays(result):
+    """Resultado de YOLO-Pose (ultralytics o PoseResult) -> (alto, ancho, boxes, keypoints) en float32"""
+    height, width = result.orig_img.shape[:2]
+    if not result.boxes:
+        return height, width, np.empty((0, 5), np.float32), np.empty((0, KEYPOINTS, 3), np.float32)
+    xyxy = _numpy(result.boxes.xyxy).reshape(-1, 4)
+    conf = _numpy(result.boxes.conf).reshape(-1, 1)
+    xy = _numpy(result.keypoints.xy).reshape(-1, KEYPOINTS, 2)
+    kconf = result.keypoints.conf
+    kconf = np.ones(xy.shape[:2], np.float32) if kconf is None else _numpy(kconf).reshape(-1, KEYPOINTS)
+    boxes = np.concatenate([xyxy, conf], axis=1).astype(np.float32)
+    return height, width, boxes, np.concatenate([xy, kconf[..., None]], axis=2).astype(np.float32)
+
+
+def cached_result(height, width, boxes, keypoints):
+    """PoseResult equivalente al original, para extract_pose y PoseTracker"""
+    # extract_pose solo usa el tamaño de la imagen (para xyn): una vista sin memoria propia
+    image = np.broadcast_to(np.zeros(1, dtype=np.uint8), (height, width, 3))
+    return PoseResult(image, boxes[:, :4], boxes[:, 4], keypoints)
+
+
+class FeatureCache:
+    """
+    Detecciones de YOLO-Pose indexadas por (sha256 de la imagen, modelo), en SQLite.
+
+    `files` recuerda el hash de cada ruta con su tamaño y fecha de
+    modificación: una imagen sin cambios no se vuelve a leer. Es seguro entre
+    hilos (una conexión con lock) y entre procesos (WAL).
+    """
+
+    def __init__(self, path, model):
+        self.path = path
+        self.model = model
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._files = []  # Filas de `files` pendientes: se escriben junto con el próximo lote
+        self._db = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+
+    def digest(self, path):
+        """(sha256, bytes del archivo o None si el hash salió del índice)"""
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        with self._lock:
+            row = self._db.execute("SELECT digest FROM files WHERE path = ? AND size = ? AND mtime_ns = ?",
+                                   (path, stat.st_size, stat.st_mtime_ns)).fetchone()
+        if row is not None:
+            return row[0], None
+        with open(path, "rb") as f:
+            data = f.read()
+        digest = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            self._files.append((path, digest, stat.st_size, stat.st_mtime_ns))
+        return digest, data
+
+    def get(self, digest):
+        """Resultado cacheado de la imagen para este modelo, o None"""
+        with self._lock:
+            row = self._db.execute("SELECT height, width, persons, boxes, keypoints FROM poses "
+                                   "WHERE digest = ? AND model = ?", (digest, self.model)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        height, width, persons, boxes, keypoints = row
+        return cached_result(height, width, np.frombuffer(boxes, np.float32).reshape(persons, 5),
+                             np.frombuffer(keypoints, np.float32).reshape(persons, KEYPOINTS, 3))
+
+    def put_many(self, items):
+        """Guarda [(digest, resultado de YOLO-Pose)] en una transacción"""
+        rows = []
+        now = time.time()
+        for digest, result in items:
+            height, width, boxes, keypoints = result_arrays(result)
+            rows.append((digest, self.model, height, width, len(boxes), boxes.tobytes(), keypoints.tobytes(), now))
+        with self._lock:
+            self._write_files()
+            self._db.executemany("INSERT OR REPLACE INTO poses VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self._db.commit()
+
+    def _write_files(self):
+        # Con el lock tomado; la transacción la cierra quien llama
+        if self._files:
+            self._db.executemany("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)", self._files)
+            self._files = []
+
+    def commit(self):
+        with self._lock:
+            self._write_files()
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._write_files()
+            self._db.commit()
+            self._db.close()
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+# --- Mantenimiento ---
+
+def stats(path):
+    db = sqlite3.connect(path)
+    models = db.execute("SELECT model, COUNT(*), SUM(persons) FROM poses GROUP BY model ORDER BY model").fetchall()
+    files = db.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+    missing = sum(not os.path.isfile(p) for (p,) in db.execute("SELECT path FROM files"))
+    orphans = db.execute("SELECT COUNT(*) FROM poses WHERE digest NOT IN (SELECT digest FROM files)").fetchone()[0]
+    db.close()
+    return {
+        "size_mb": round(os.path.getsize(path) / 1e6, 2),
+        "files": files,
+        "missing_files": missing,
+        "orphan_entries": orphans,
+        "models": {model: {"entries": entries, "persons": persons or 0} for model, entries, persons in models},
+    }
+
+
+def prune(path, keep_model=None):
+    """
+    Olvida las rutas de imágenes que ya no existen, borra las detecciones que
+    ninguna imagen usa (y las de otros modelos con `keep_model`) y compacta el archivo.
+    """
+    db = sqlite3.connect(path)
+    gone = [(p,) for (p,) in db.execute("SELECT path FROM files") if not os.path.isfile(p)]
+    db.executemany("DELETE FROM files WHERE path = ?", gone)
+    orphans = db.execute("DELETE FROM poses WHERE digest NOT IN (SELECT digest FROM files)").rowcount
+    other = db.execute("DELETE FROM poses WHERE model != ?", (keep_model,)).rowcount if keep_model else 0
+    db.commit()
+    db.execute("VACUUM")
+    db.close()
+    return {"files_removed": len(gone), "entries_removed": orphans + other}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mantenimiento del cache de keypoints de training.extract_keypoints")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("stats", help="Entradas por modelo, imágenes indexadas y tamaño").add_argument("cache")
+    prune_parser = commands.add_parser("prune", help="Borra entradas de imágenes eliminadas y compacta")
+    prune_parser.add_argument("cache")
+    prune_parser.add_argument("--keep-model", default=None, help="Borra también las entradas de los demás modelos")
+    args = parser.parse_args()
+
+    if args.command == "prune":
+        removed = prune(args.cache, args.keep_model)
+        print(f"🧹 {removed['files_removed']} imágenes eliminadas, {removed['entries_removed']} entradas borradas")
+    info = stats(args.cache)
+    print(f"📦 {args.cache}: {info['size_mb']} MB, {info['files']} imágenes indexadas "
+          f"({info['missing_files']} ya no existen, {info['orphan_entries']} entradas huérfanas)")
+    for model, entry in info["models"].items():
+        print(f"   {model}: {entry['entries']} imágenes, {entry['persons']} personas")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
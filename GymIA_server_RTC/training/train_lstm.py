@@ -0,0 +1,229 @@
+# Entrenamiento de los LSTM de los ejercicios (reemplaza las celdas de entrenamientolstm*.ipynb)
+# Las ventanas se arman dentro de tf.data a partir de los keypoints crudos, en paralelo y por delante del modelo
+#
+# Uso:
+#   python -m training.train_lstm --data-dir dataset/ --exercise sentadilla
+#   python -m training.train_lstm --data-dir /ruta/dataset_imagenes --exercise peso_muerto --split notebook
+
+import argparse
+import json
+import os
+import platform
+import time
+
+import numpy as np
+
+from app.exercises import load_exercise_config
+from training.dataset import MANIFEST, load_windows
+from training.windows import FEATURES, SPLIT_SEED, SPLITS
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "models")
+BATCH_SIZE = 32
+
+# Hiperparámetros de los notebooks de cada ejercicio
+HYPERPARAMS = {
+    "peso_muerto": {"lstm_dropout": 0.2, "dense_dropout": 0.5, "lr_factor": 0.5, "epochs": 120},
+    "sentadilla": {"lstm_dropout": 0.1, "dense_dropout": 0.3, "lr_factor": 0.3, "epochs": 70},
+}
+
+
+def build_model(keras, timesteps, classes, lstm_dropout, dense_dropout):
+    """Arquitectura de los notebooks: LSTM 64-128-64, BatchNormalization y densas 64-32"""
+    layers = keras.layers
+    model = keras.Sequential([
+        keras.Input(shape=(timesteps, FEATURES)),
+        layers.LSTM(64, return_sequences=True, dropout=lstm_dropout, recurrent_dropout=lstm_dropout),
+        layers.Dropout(0.2),
+        layers.LSTM(128, return_sequences=True, dropout=lstm_dropout, recurrent_dropout=lstm_dropout),
+        layers.Dropout(0.2),
+        layers.LSTM(64, return_sequences=False, dropout=lstm_dropout, recurrent_dropout=lstm_dropout),
+        layers.Dropout(0.2),
+        layers.BatchNormalization(),
+        layers.Dense(64, activation="relu"),
+        layers.Dropout(dense_dropout),
+        layers.Dense(32, activation="relu"),
+        layers.Dropout(dense_dropout),
+        layers.Dense(classes, activation="softmax"),
+    ])
+    model.compile(optimizer="adam", loss="sparse_categorical_crossentropy", metrics=["accuracy"])
+    return model
+
+
+def make_dataset(tf, frames, windows, indices, batch_size, shuffle=False, seed=None):
+    """
+    tf.data de las ventanas `indices`: se mezclan y agrupan solo las filas de
+    inicio, y cada lote se arma con un gather sobre los frames crudos en un map
+    paralelo. Las particiones sin mezclar (val/test) quedan en cache después
+    de la primera época.
+    """
+    offsets = tf.range(windows.timesteps, dtype=tf.int64)
+    indices = np.asarray(indices)
+    ds = tf.data.Dataset.from_tensor_slices((windows.starts[indices], windows.labels[indices]))
+    if shuffle:
+        ds = ds.shuffle(len(indices), seed=seed, reshuffle_each_iteration=True)
+    ds = ds.batch(batch_size)
+    ds = ds.map(lambda starts, labels: (tf.gather(frames, starts[:, None] + offsets), labels),
+                num_parallel_calls=tf.data.AUTOTUNE, deterministic=not shuffle)
+    if not shuffle:
+        ds = ds.cache()
+    return ds.prefetch(tf.data.AUTOTUNE)
+
+
+def throughput_callback(keras, samples):
+    """Callback que mide ventanas/s de entrenamiento por época (sin la validación)"""
+
+    class Throughput(keras.callbacks.Callback):
+        def __init__(self):
+            super().__init__()
+            self.epochs = []
+            self._start = self._validation = None
+
+        def on_epoch_begin(self, epoch, logs=None):
+            self._start = time.perf_counter()
+            self._validation = None
+
+        def on_test_begin(self, logs=None):
+            if self._start is not None and self._validation is None:
+                self._validation = time.perf_counter()
+
+        def on_epoch_end(self, epoch, logs=None):
+            end = time.perf_counter()
+            train_seconds = (self._validation or end) - self._start
+            self.epochs.append({
+                "epoch": epoch + 1,
+                "seconds": round(end - self._start, 3),
+                "train_seconds": round(train_seconds, 3),
+                "samples_per_sec": round(samples / max(train_seconds, 1e-9), 1),
+            })
+            print(f"⏱️  Época {epoch + 1}: {self.epochs[-1]['samples_per_sec']:.0f} ventanas/s "
+                  f"({train_seconds:.1f}s de entrenamiento, {end - self._start:.1f}s en total)")
+
+    return Throughput()
+
+
+def default_output(exercise):
+    return os.path.join(MODELS_DIR, f"lstm-{exercise}-{time.strftime('%Y%m%d-%H%M%S')}.h5")
+
+
+def metadata_path(output):
+    return os.path.splitext(output)[0] + ".json"
+
+
+def train(data_dir, exercise, output=None, epochs=None, batch_size=BATCH_SIZE, split="block", block=None,
+          seed=SPLIT_SEED, threads=0):
+    """
+    Entrena el LSTM de `exercise` con `timesteps` de app/exercises, guarda el
+    .h5 en `output` (por defecto models/) y su metadata en un .json al lado.
+    """
+    config = load_exercise_config()[exercise]
+    params = dict(HYPERPARAMS[exercise])
+    params["epochs"] = epochs or params["epochs"]
+    timesteps = config["timesteps"]
+    classes = config["class_labels"]
+    output = output or default_output(exercise)
+
+    windows = load_windows(data_dir, exercise, timesteps)
+    splits = windows.split(block=block, seed=seed) if split == "block" else windows.notebook_split(seed=seed)
+    for name in SPLITS:
+        if len(splits[name]) == 0:
+            raise ValueError(f"La partición {name} de {exercise} no tiene ventanas (¿pocos frames para {timesteps} timesteps?)")
+    print(f"📊 {exercise}: {len(windows)} ventanas de {timesteps} timesteps, partición {split}: "
+          + ", ".join(f"{name} {len(splits[name])}" for name in SPLITS))
+
+    import tensorflow as tf
+    import keras
+
+    if threads:
+        tf.config.threading.set_intra_op_parallelism_threads(threads)
+        tf.config.threading.set_inter_op_parallelism_threads(threads)
+    keras.utils.set_random_seed(seed)
+
+    # Los frames crudos se copian una vez al runtime de TF; las ventanas nunca se materializan
+    frames = tf.convert_to_tensor(np.asarray(windows.data, dtype=np.float32))
+    datasets = {name: make_dataset(tf, frames, windows, splits[name], batch_size, shuffle=name == "train", seed=seed)
+                for name in SPLITS}
+
+    model = build_model(keras, timesteps, len(classes), params["lstm_dropout"], params["dense_dropout"])
+    throughput = throughput_callback(keras, len(splits["train"]))
+    callbacks = [
+        keras.callbacks.EarlyStopping(monitor="val_loss", patience=8, restore_best_weights=True),
+        keras.callbacks.ReduceLROnPlateau(monitor="val_loss", factor=params["lr_factor"], patience=5, min_lr=1e-6),
+        throughput,
+    ]
+    start = time.perf_counter()
+    history = model.fit(datasets["train"], validation_data=datasets["val"], epochs=params["epochs"],
+                        callbacks=callbacks, shuffle=False, verbose=2)  # tf.data ya mezcla
+    elapsed = time.perf_counter() - start
+
+    probabilities = model.predict(datasets["test"], verbose=0)
+    predicted = np.argmax(probabilities, axis=1)
+    y_test = windows.labels[splits["test"]]
+    test_accuracy = float((predicted == y_test).mean())
+    per_class = {label: float((predicted[y_test == c] == c).mean()) if (y_test == c).any() else None
+                 for c, label in enumerate(classes)}
+    print(f"🎯 Precisión de prueba: {test_accuracy:.4f} ("
+          + ", ".join(f"{label} {acc:.3f}" for label, acc in per_class.items() if acc is not None) + ")")
+
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    model.save(output)
+    metadata = {
+        "exercise": exercise,
+        "timesteps": timesteps,
+        "features": FEATURES,
+        "classes": classes,
+        "data": {
+            "path": os.path.abspath(data_dir),
+            "format": "binario" if os.path.isfile(os.path.join(data_dir, MANIFEST)) else "csv",
+            "frames": int(len(windows.data)),
+            "sequences": int(len(windows.lengths)),
+            "windows": int(len(windows)),
+        },
+        "split": {
+            "method": split,
+            "block": (block or 5 * timesteps) if split == "block" else None,
+            "seed": seed,
+            "windows": {name: int(len(splits[name])) for name in SPLITS},
+            "class_counts": {name: windows.class_counts(splits[name]).tolist() for name in SPLITS},
+        },
+        "hyperparams": dict(params, batch_size=batch_size),
+        "epochs_run": len(history.history.get("loss", [])),
+        "history": {key: [float(v) for v in values] for key, values in history.history.items()},
+        "throughput": throughput.epochs,
+        "train_seconds": round(elapsed, 1),
+        "test_accuracy": test_accuracy,
+        "test_per_class_accuracy": per_class,
+        "versions": {"tensorflow": tf.__version__, "keras": keras.__version__, "python": platform.python_version()},
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    with open(metadata_path(output), "w") as f:
+        json.dump(metadata, f, indent=2, ensure_ascii=False)
+    print(f"💾 {output} (+ {os.path.basename(metadata_path(output))})")
+    return metadata
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Entrenamiento de los LSTM de los ejercicios con tf.data")
+    parser.add_argument("--data-dir", required=True, help="Dataset binario (training.dataset) o carpeta con los CSV por clase")
+    parser.add_argument("--exercise", required=True, choices=sorted(HYPERPARAMS))
+    parser.add_argument("--output", default=None, help="Archivo .h5 (por defecto models/lstm-<ejercicio>-<fecha>.h5)")
+    parser.add_argument("--epochs", type=int, default=None, help="Por defecto, las del notebook (70 sentadilla, 120 peso muerto)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--split", default="block", choices=["block", "notebook"],
+                        help="block: sin fuga entre ventanas solapadas; notebook: train_test_split de los notebooks")
+    parser.add_argument("--block", type=int, default=None, help="Frames por bloque de la partición (por defecto 5 × timesteps)")
+    parser.add_argument("--seed", type=int, default=SPLIT_SEED)
+    parser.add_argument("--threads", type=int, default=0, help="Hilos de TensorFlow (0 = todos los núcleos)")
+    args = parser.parse_args()
+
+    metadata = train(args.data_dir, args.exercise, args.output, args.epochs, args.batch_size, args.split,
+                     args.block, args.seed, args.threads)
+    rates = [epoch["samples_per_sec"] for epoch in metadata["throughput"][1:]] or \
+            [epoch["samples_per_sec"] for epoch in metadata["throughput"]]
+    print(f"📈 {metadata['epochs_run']} épocas en {metadata['train_seconds']}s, "
+          f"mediana {float(np.median(rates)):.0f} ventanas/s (sin la primera época, que incluye la compilación)")
+    print("📝 Para usarlo en el servidor: model_path del ejercicio en app/exercises.py")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
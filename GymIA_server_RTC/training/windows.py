@@ -0,0 +1,213 @@
+# Ventanas deslizantes de keypoints para entrenar y evaluar los LSTM sin materializarlas
+# Cada ventana es una vista de `timesteps` frames consecutivos sobre los datos crudos (float32)
+
+import argparse
+import math
+import os
+
+import numpy as np
+
+FEATURES = 34  # 17 keypoints (x, y) por frame
+
+# Archivos de keypoints de cada clase, en el orden de class_labels (como en los notebooks)
+DATASET_FILES = {
+    "peso_muerto": ["columna_incorrectos", "columna_correctos", "extension_incorrectos", "extension_correctos"],
+    "sentadilla": ["caderas_incorrectos", "caderas_correctos", "rodillas_incorrectos", "rodillas_correctos"],
+}
+VAL_SIZE = 0.15
+TEST_SIZE = 0.1
+SPLIT_SEED = 42
+SPLITS = ("train", "val", "test")
+
+
+def load_keypoints_csv(path):
+    """CSV de los notebooks: columna de índice + 34 columnas de keypoints"""
+    return np.loadtxt(path, delimiter=",", skiprows=1, dtype=np.float32, ndmin=2)[:, 1:]
+
+
+def sliding_windows(data, timesteps):
+    """Mismas ventanas que el bucle `for i in range(timesteps, n)` de los notebooks, como vista"""
+    if len(data) <= timesteps:
+        return np.empty((0, timesteps, data.shape[1]), dtype=data.dtype)
+    windows = np.lib.stride_tricks.sliding_window_view(data, timesteps, axis=0)  # (n - T + 1, 34, T)
+    return windows[:len(data) - timesteps].transpose(0, 2, 1)
+
+
+def train_test_split_indices(n, test_size, seed):
+    """
+    Índices de `sklearn.model_selection.train_test_split(..., random_state=seed)`
+    sobre `n` muestras (misma permutación de ShuffleSplit), sin scikit-learn.
+    """
+    n_test = math.ceil(test_size * n)
+    n_train = math.floor((1.0 - test_size) * n)
+    permutation = np.random.RandomState(seed).permutation(n)
+    return permutation[n_test:n_test + n_train], permutation[:n_test]
+
+
+class WindowDataset:
+    """
+    Ventanas de `timesteps` frames sobre secuencias de keypoints, sin copiarlas.
+
+    `data` tiene todas las secuencias una detrás de otra (puede ser un memmap) y
+    cada ventana se guarda solo como su fila de inicio: la memoria crece con los
+    frames crudos, no con ventanas × timesteps. `batch()` copia a float32
+    únicamente las ventanas pedidas. Ninguna ventana cruza de una secuencia a
+    otra; como en los notebooks, una secuencia de n frames da n - timesteps.
+    """
+
+    def __init__(self, data, lengths, labels, timesteps):
+        self.timesteps = int(timesteps)
+        self.data = data if data.dtype == np.float32 else np.asarray(data, dtype=np.float32)
+        self.lengths = np.asarray(lengths, dtype=np.int64)
+        self.sequence_labels = np.asarray(labels, dtype=np.int64)
+        if self.lengths.sum() != len(self.data) or len(self.lengths) != len(self.sequence_labels):
+            raise ValueError("lengths y labels deben describir todas las filas de data, una entrada por secuencia")
+
+        offsets = np.concatenate([[0], np.cumsum(self.lengths)[:-1]]).astype(np.int64)
+        counts = np.maximum(self.lengths - self.timesteps, 0)
+        self.sequence_ids = np.repeat(np.arange(len(counts), dtype=np.int32), counts)
+        self.starts = np.concatenate([np.arange(o, o + c, dtype=np.int64) for o, c in zip(offsets, counts)] or
+                                     [np.empty(0, dtype=np.int64)])
+        self.labels = self.sequence_labels[self.sequence_ids]
+        self._offsets = offsets
+        if len(self.data) >= self.timesteps:
+            self._view = np.lib.stride_tricks.sliding_window_view(self.data, self.timesteps, axis=0).transpose(0, 2, 1)
+        else:
+            self._view = np.empty((0, self.timesteps, self.data.shape[1]), dtype=np.float32)
+
+    @classmethod
+    def from_sequences(cls, sequences, labels, timesteps):
+        """Una secuencia (frames, 34) por entrada, con su clase"""
+        arrays = [np.asarray(s, dtype=np.float32).reshape(-1, FEATURES) for s in sequences]
+        data = np.concatenate(arrays) if arrays else np.empty((0, FEATURES), dtype=np.float32)
+        return cls(data, [len(a) for a in arrays], labels, timesteps)
+
+    @classmethod
+    def from_csv(cls, data_dir, exercise, timesteps):
+        """CSV de cada clase de DATASET_FILES; cada archivo es una secuencia, como en los notebooks"""
+        names = DATASET_FILES[exercise]
+        sequences = [load_keypoints_csv(os.path.join(data_dir, f"{name}.txt")) for name in names]
+        return cls.from_sequences(sequences, range(len(names)), timesteps)
+
+    def __len__(self):
+        return len(self.starts)
+
+    @property
+    def classes(self):
+        return int(self.sequence_labels.max()) + 1 if len(self.sequence_labels) else 0
+
+    def window(self, i):
+        """Ventana `i` como vista (timesteps, 34)"""
+        return self._view[self.starts[i]]
+
+    def batch(self, indices, out=None):
+        """Ventanas `indices` copiadas a un arreglo float32 (len(indices), timesteps, 34)"""
+        return np.take(self._view, self.starts[np.asarray(indices)], axis=0, out=out)
+
+    @property
+    def nbytes(self):
+        """Memoria del dataset: frames crudos más el índice de ventanas"""
+        return int(self.data.nbytes + self.starts.nbytes + self.sequence_ids.nbytes + self.labels.nbytes)
+
+    def class_counts(self, indices=None):
+        labels = self.labels if indices is None else self.labels[indices]
+        return np.bincount(labels, minlength=self.classes)
+
+    def split(self, val_size=VAL_SIZE, test_size=TEST_SIZE, block=None, seed=SPLIT_SEED):
+        """
+        Partición train/val/test sin fuga entre ventanas solapadas.
+
+        Cada secuencia se corta en bloques de `block` frames consecutivos
+        (por defecto 5 × timesteps) y los bloques se reparten en las
+        proporciones pedidas, por secuencia (y por lo tanto por clase). Solo se
+        usan las ventanas cuyos frames caen todos en bloques de la misma
+        partición: ningún frame de prueba aparece en una ventana de entrenamiento.
+        """
+        block = int(block or 5 * self.timesteps)
+        if block < self.timesteps:
+            raise ValueError(f"block ({block}) debe ser al menos timesteps ({self.timesteps})")
+        rng = np.random.default_rng(seed)
+        frame_split = np.empty(len(self.data), dtype=np.int8)
+        for offset, length in zip(self._offsets, self.lengths):
+            n_blocks = -(-int(length) // block)
+            # Con al menos 3 bloques, cada partición pedida recibe uno (toda clase queda representada)
+            minimum = 1 if n_blocks >= 3 else 0
+            n_test = max(int(round(n_blocks * test_size)), minimum if test_size > 0 else 0)
+            n_val = max(int(round(n_blocks * val_size)), minimum if val_size > 0 else 0)
+            assignment = np.zeros(n_blocks, dtype=np.int8)
+            order = rng.permutation(n_blocks)
+            assignment[order[:n_test]] = 2
+            assignment[order[n_test:n_test + n_val]] = 1
+            frame_split[offset:offset + length] = np.repeat(assignment, block)[:length]
+
+        # Tramos de frames consecutivos de la misma partición
+        runs = np.concatenate([[0], np.cumsum(frame_split[1:] != frame_split[:-1])])
+        ends = self.starts + self.timesteps - 1
+        valid = runs[self.starts] == runs[ends]
+        window_split = frame_split[self.starts]
+        return {name: np.flatnonzero(valid & (window_split == i)) for i, name in enumerate(SPLITS)}
+
+    def notebook_split(self, val_size=VAL_SIZE, test_size=TEST_SIZE, seed=SPLIT_SEED):
+        """
+        La partición de entrenamientolstm*.ipynb (dos train_test_split sobre
+        ventanas sueltas). Las ventanas vecinas comparten frames entre
+        particiones; sirve para comparar con los modelos ya entrenados.
+        """
+        temp, test = train_test_split_indices(len(self), test_size, seed)
+        train, val = train_test_split_indices(len(temp), val_size, seed)
+        return {"train": temp[train], "val": temp[val], "test": test}
+
+    def order(self, indices, balance=False, seed=None):
+        """
+        Orden aleatorio de `indices` para una época. Con `balance`, cada clase
+        aporta tantas ventanas como la más numerosa (las minoritarias se repiten
+        recorriéndolas en orden aleatorio) y las clases quedan mezcladas.
+        """
+        rng = np.random.default_rng(seed)
+        indices = np.asarray(indices)
+        if not balance or len(indices) == 0:
+            return rng.permutation(indices)
+        by_class = [indices[self.labels[indices] == c] for c in range(self.classes)]
+        by_class = [group for group in by_class if len(group)]
+        target = max(len(group) for group in by_class)
+        balanced = []
+        for group in by_class:
+            repeats = -(-target // len(group))
+            balanced.append(np.concatenate([rng.permutation(group) for _ in range(repeats)])[:target])
+        return rng.permutation(np.concatenate(balanced))
+
+    def batches(self, indices, batch_size=32, shuffle=True, balance=False, seed=None):
+        """Lotes (X float32, y) de `indices`, copiando solo un lote a la vez"""
+        order = self.order(indices, balance, seed) if shuffle else np.asarray(indices)
+        for start in range(0, len(order), batch_size):
+            chunk = order[start:start + batch_size]
+            yield self.batch(chunk), self.labels[chunk]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ventanas y particiones de los datos de entrenamiento LSTM")
+    parser.add_argument("--data-dir", required=True, help="Carpeta con los CSV de keypoints por clase (dataset_imagenes)")
+    parser.add_argument("--exercise", default="sentadilla", choices=sorted(DATASET_FILES))
+    parser.add_argument("--timesteps", type=int, default=None, help="Por defecto, el del ejercicio en app/exercises")
+    parser.add_argument("--block", type=int, default=None, help="Frames por bloque de la partición (por defecto 5 × timesteps)")
+    args = parser.parse_args()
+
+    timesteps = args.timesteps
+    if timesteps is None:
+        from app.exercises import load_exercise_config
+        timesteps = load_exercise_config()[args.exercise]["timesteps"]
+
+    dataset = WindowDataset.from_csv(args.data_dir, args.exercise, timesteps)
+    materialized = len(dataset) * timesteps * FEATURES * 8  # np.array(X) de los notebooks (float64)
+    print(f"📊 {args.exercise}: {len(dataset.data)} frames, {len(dataset)} ventanas de {timesteps} timesteps")
+    print(f"   Memoria: {dataset.nbytes / 1e6:.1f} MB (ventanas materializadas en float64: {materialized / 1e6:.1f} MB)")
+    splits = dataset.split(block=args.block)
+    for name in SPLITS:
+        print(f"   {name:5s} {len(splits[name]):7d} ventanas, por clase {dataset.class_counts(splits[name]).tolist()}")
+    dropped = len(dataset) - sum(len(s) for s in splits.values())
+    print(f"   {dropped} ventanas descartadas en los bordes entre particiones")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())